@@ -11,7 +11,7 @@ class UserAdmin(DjangoUserAdmin):
         ("Права доступа", {"fields": ("is_active", "is_staff", "is_superuser", "groups", "user_permissions")}),
         ("Даты", {"fields": ("last_login", "date_joined")}),
     )
-    list_display = ("username", "email", "role", "city", "is_staff")
+    list_display = ("username", "email", "role", "city", "followers_count", "is_staff")
     list_filter = ("role", "is_staff", "is_superuser", "is_active", "groups")
     filter_horizontal = ("groups", "user_permissions", "services")
 
@@ -0,0 +1,136 @@
+# accounts/autocomplete.py
+"""
+Подсказки пользователей по префиксу (навбар, @упоминания).
+
+Держим в памяти процесса отсортированный список ключей
+(ник, имя, фамилия, «имя фамилия» в нижнем регистре) и ищем префикс
+двоичным поиском — запрос к БД на каждое нажатие клавиши не нужен.
+Индекс строится лениво при первом обращении, обновляется сигналами
+(регистрация, правка профиля) и целиком перечитывается раз в
+AUTOCOMPLETE_REFRESH_SECONDS — чтобы подтянуть правки из других процессов.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from social.thumbnails import thumb_name
+
+from .models import User
+
+_FIELDS = ("id", "username", "first_name", "last_name", "avatar", "avatar_variants")
+
+
+def _keys(username, first_name, last_name):
+    keys = {username.lower()}
+    for part in (first_name, last_name, f"{first_name} {last_name}".strip()):
+        if part:
+            keys.add(part.lower().replace("ё", "е"))
+    return keys
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []      # отсортированные пары (ключ, user_id)
+        self._users = {}     # user_id -> (ключи, данные для ответа)
+
+    def __len__(self):
+        return len(self._users)
+
+    def _payload(self, row):
+        name = f"{row['first_name']} {row['last_name']}".strip()
+        # в подсказке аватар 32px — отдаём самую мелкую копию
+        avatar = thumb_name(row["avatar"], row.get("avatar_variants"))
+        return {"id": row["id"], "username": row["username"], "name": name,
+                "avatar": avatar or ""}
+
+    def load(self, rows):
+        keys, users = [], {}
+        for row in rows:
+            user_keys = _keys(row["username"], row["first_name"], row["last_name"])
+            users[row["id"]] = (user_keys, self._payload(row))
+            keys.extend((k, row["id"]) for k in user_keys)
+        keys.sort()
+        with self._lock:
+            self._keys, self._users = keys, users
+
+    def _drop(self, user_id):
+        old = self._users.pop(user_id, None)
+        if old:
+            for k in old[0]:
+                i = bisect_left(self._keys, (k, user_id))
+                if i < len(self._keys) and self._keys[i] == (k, user_id):
+                    del self._keys[i]
+
+    def upsert(self, row):
+        user_keys = _keys(row["username"], row["first_name"], row["last_name"])
+        with self._lock:
+            self._drop(row["id"])
+            self._users[row["id"]] = (user_keys, self._payload(row))
+            for k in user_keys:
+                insort(self._keys, (k, row["id"]))
+
+    def remove(self, user_id):
+        with self._lock:
+            self._drop(user_id)
+
+    def search(self, prefix, limit=10):
+        prefix = prefix.strip().lstrip("@").lower().replace("ё", "е")
+        if not prefix:
+            return []
+        results, seen = [], set()
+        with self._lock:
+            i = bisect_left(self._keys, (prefix,))
+            while i < len(self._keys) and len(results) < limit:
+                key, user_id = self._keys[i]
+                if not key.startswith(prefix):
+                    break
+                if user_id not in seen:
+                    seen.add(user_id)
+                    results.append(self._users[user_id][1])
+                i += 1
+        return results
+
+
+_index = PrefixIndex()
+_loaded_at = None
+
+
+def get_index():
+    global _loaded_at
+    ttl = getattr(settings, "AUTOCOMPLETE_REFRESH_SECONDS", 300)
+    if _loaded_at is None or time.monotonic() - _loaded_at > ttl:
+        _index.load(User.objects.filter(is_active=True).values(*_FIELDS).iterator())
+        _loaded_at = time.monotonic()
+    return _index
+
+
+def user_changed(user):
+    """Инкрементальное обновление (сигнал post_save). До первой загрузки — ничего не делаем."""
+    if _loaded_at is None:
+        return
+    if user.is_active:
+        _index.upsert({
+            "id": user.pk,
+            "username": user.username,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "avatar": user.avatar.name if user.avatar else "",
+            "avatar_variants": user.avatar_variants,
+        })
+    else:
+        _index.remove(user.pk)
+
+
+def user_removed(user_id):
+    if _loaded_at is not None:
+        _index.remove(user_id)
+
+
+def reset():
+    """Сбросить индекс (тесты, смена БД)."""
+    global _loaded_at
+    _loaded_at = None
+    _index.load([])
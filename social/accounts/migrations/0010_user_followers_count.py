@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:10
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_followers_count(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    Follow = apps.get_model('accounts', 'Follow')
+    counted = Subquery(
+        Follow.objects.filter(following=OuterRef('pk'))
+        .order_by().values('following').annotate(n=Count('pk')).values('n')
+    )
+    User.objects.update(followers_count=Coalesce(counted, 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_seed_all_servicetags_hardening'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Подписчиков'),
+        ),
+        migrations.RunPython(backfill_followers_count, reverse_code=migrations.RunPython.noop),
+    ]
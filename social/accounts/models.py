@@ -3,6 +3,8 @@ from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db.models import F, Q  # если используешь в других местах
 
+from social.thumbnails import ResponsiveImage
+
 class User(AbstractUser):
     class Roles(models.TextChoices):
         PROVIDER   = "provider",   "Банные услуги"
@@ -13,6 +15,8 @@ class User(AbstractUser):
     avatar = models.ImageField(
         upload_to="avatars/", blank=True, null=True, verbose_name="Фотография (аватар)"
     )
+    # уменьшенные копии аватара для srcset (social/thumbnails.py)
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False)
     bio = models.TextField(
         blank=True, max_length=500, verbose_name="О себе"
     )
@@ -25,6 +29,13 @@ class User(AbstractUser):
     services = models.ManyToManyField(
         "ServiceTag", blank=True, related_name="users", verbose_name="Специализации"
     )
+    # денормализованный счётчик подписчиков (ведётся сигналами Follow);
+    # по нему гибридная лента решает, раскладывать посты автора или тянуть при чтении
+    followers_count = models.PositiveIntegerField(
+        default=0, editable=False, db_index=True, verbose_name="Подписчиков"
+    )
+
+    avatar_responsive = ResponsiveImage("avatar", "avatar_variants")
 
     class Meta:
         verbose_name = "Пользователь"
@@ -33,6 +44,10 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    @property
+    def avatar_thumb(self):
+        return self.avatar_responsive.thumb if self.avatar else ""
+
 
 class ServiceTag(models.Model):
     code = models.CharField(max_length=32, unique=True, verbose_name="Код")
@@ -0,0 +1,52 @@
+# accounts/signals.py
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from network import imagejobs
+
+from . import autocomplete
+from .models import Follow, User
+
+
+@receiver(post_save, sender=Follow)
+def follow_count_up(sender, instance, created, **kwargs):
+    if created:
+        User.objects.filter(pk=instance.following_id).update(
+            followers_count=F("followers_count") + 1
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_count_down(sender, instance, **kwargs):
+    User.objects.filter(pk=instance.following_id, followers_count__gt=0).update(
+        followers_count=F("followers_count") - 1
+    )
+
+
+@receiver(pre_save, sender=User)
+def user_avatar_replaced(sender, instance, update_fields=None, **kwargs):
+    imagejobs.release_replaced(instance, "avatars", update_fields)
+
+
+@receiver(post_save, sender=User)
+def user_avatar_thumbnails(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or "avatar" in update_fields:
+        # раньше подсказок: при синхронной обработке им нужна уже нарезанная мелкая копия
+        imagejobs.schedule(instance, "avatars")
+
+
+@receiver(post_save, sender=User)
+def user_autocomplete_update(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {"username", "first_name", "last_name", "avatar", "is_active"} & set(update_fields):
+        autocomplete.user_changed(instance)
+
+
+@receiver(post_delete, sender=User)
+def user_autocomplete_remove(sender, instance, **kwargs):
+    autocomplete.user_removed(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_avatar_release(sender, instance, **kwargs):
+    imagejobs.release(instance, "avatars")
@@ -54,3 +54,31 @@ class AuthAndFollowTests(TestCase):
         resp = self.client.get(url)
         self.assertEqual(resp.status_code, 200)
         self.assertContains(resp, "@alice")
+
+    def test_user_autocomplete(self):
+        from accounts import autocomplete
+
+        autocomplete.reset()
+        self.u2.first_name, self.u2.last_name = "Борис", "Ёлкин"
+        self.u2.save()
+        url = reverse("user_autocomplete")
+
+        # маршрут подсказок не перекрывает профиль пользователя с таким именем
+        User.objects.create_user(username="autocomplete", password="pass123")
+        resp = self.client.get(reverse("profile_alias", args=["autocomplete"]))
+        self.assertEqual(resp.context["profile_user"].username, "autocomplete")
+        autocomplete.reset()
+
+        resp = self.client.get(url, {"q": "AL"})
+        self.assertEqual([r["username"] for r in resp.json()["results"]], ["alice"])
+        resp = self.client.get(url, {"q": "елк"})
+        self.assertEqual(resp.json()["results"][0]["url"], reverse("profile", args=["bob"]))
+
+        # индекс уже загружен — новые пользователи и правки попадают в него сигналами
+        User.objects.create_user(username="alina", password="pass123")
+        resp = self.client.get(url, {"q": "@ali"})
+        self.assertEqual([r["username"] for r in resp.json()["results"]], ["alice", "alina"])
+        self.u2.first_name = "Вадим"
+        self.u2.save()
+        self.assertEqual(self.client.get(url, {"q": "бор"}).json()["results"], [])
+        autocomplete.reset()
@@ -5,6 +5,8 @@ from . import views
 
 urlpatterns = [
     path('signup/', SignupView.as_view(), name='signup'),
+    # под вложенным префиксом: одиночный сегмент занят алиасом профиля ниже
+    path('api/users/autocomplete/', views.user_autocomplete, name='user_autocomplete'),
     path('u/<str:username>/', views.profile, name='profile'),
     path('<str:username>/', views.profile, name='profile_alias'),
     path('u/<str:username>/follow/', views.toggle_follow, name='toggle_follow'),
@@ -1,15 +1,20 @@
 from django.contrib import messages
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
 from django.views.generic import CreateView
 from django.db.models import Count
 
+from . import autocomplete
 from .forms import SignupForm, ProfileForm
 from .models import User, Follow
+from network import fragments, likedset
 from network.models import Post
-from notify.models import Notification
+from outbox import events
 
 
 class SignupView(CreateView):
@@ -31,20 +36,23 @@ def profile(request, username: str):
     """
     profile_user = get_object_or_404(User, username=username)
 
-    posts = (
+    posts = list(
         Post.objects
         .filter(author=profile_user)
         .select_related('author')
-        .prefetch_related('likes', 'comments')
         .all()
     )
 
     stats = {
-        'followers_count': Follow.objects.filter(following=profile_user).count(),
+        'followers_count': profile_user.followers_count,
         'following_count': Follow.objects.filter(follower=profile_user).count(),
-        'posts_count': posts.count(),
+        'posts_count': len(posts),
     }
 
+    # лайкнутые посты — из кэша (network/likedset.py), без запроса к Like
+    liked_post_ids = likedset.for_page(request.user, posts)
+    fragments.prefetch("post", posts)
+
     is_following = False
     if request.user.is_authenticated and request.user != profile_user:
         is_following = Follow.objects.filter(
@@ -89,6 +97,7 @@ def profile(request, username: str):
     return render(request, 'profile.html', {
         'profile_user': profile_user,
         'posts': posts,
+        'liked_post_ids': liked_post_ids,
         'stats': stats,
         'is_following': is_following,
         'role_label': role_label,                     # <-- добавили
@@ -107,9 +116,11 @@ def profile_edit(request, username):
         # Кнопка "Удалить фото"
         if request.POST.get("clear_avatar") == "1":
             if profile_user.avatar:
-                profile_user.avatar.delete(save=False)
-                profile_user.avatar = None
-                profile_user.save(update_fields=["avatar"])
+                # файл удалится после коммита, если на него больше никто не ссылается
+                with transaction.atomic():
+                    profile_user.avatar.delete(save=False)
+                    profile_user.avatar = None
+                    profile_user.save(update_fields=["avatar"])
                 messages.success(request, "Аватар удалён.")
             else:
                 messages.info(request, "Аватар уже отсутствует.")
@@ -148,7 +159,7 @@ def profile_edit(request, username):
 def toggle_follow(request, username: str):
     """
     Подписаться/отписаться на пользователя. Работает по POST.
-    Создаёт уведомление для целевого пользователя при новой подписке.
+    При новой подписке пишет событие в outbox — уведомление целевому пользователю.
     """
     if request.method != "POST":
         return redirect("profile", username=username)
@@ -158,21 +169,15 @@ def toggle_follow(request, username: str):
         messages.error(request, "Нельзя подписаться на себя.")
         return redirect("profile", username=username)
 
-    obj, created = Follow.objects.get_or_create(
-        follower=request.user, following=target
-    )
+    with transaction.atomic():
+        obj, created = Follow.objects.get_or_create(
+            follower=request.user, following=target
+        )
+        if created:
+            # уведомление о новой подписке — из outbox (outbox/events.py)
+            events.record("follow", user=target.id, actors=[request.user.id])
     if created:
         messages.success(request, f"Вы подписались на @{target.username}.")
-        # уведомление о новой подписке
-        try:
-            Notification.objects.create(
-                to_user=target,
-                verb="follow",
-                actor=request.user,
-            )
-        except Exception:
-            # Если notify не настроен/временно недоступен — не ломаем флоу
-            pass
     else:
         obj.delete()
         messages.info(request, f"Вы отписались от @{target.username}.")
@@ -181,6 +186,29 @@ def toggle_follow(request, username: str):
     return redirect(next_url)
 
 
+def user_autocomplete(request):
+    """
+    Подсказки для поиска и @упоминаний: ?q=<префикс ника или имени>.
+    JSON { results: [{username, name, url, avatar}] } из индекса в памяти.
+    """
+    try:
+        limit = max(1, min(int(request.GET.get("limit", 8)), 20))
+    except ValueError:
+        limit = 8
+    results = autocomplete.get_index().search(request.GET.get("q", ""), limit=limit)
+    return JsonResponse({
+        "results": [
+            {
+                "username": r["username"],
+                "name": r["name"],
+                "url": reverse("profile", args=[r["username"]]),
+                "avatar": default_storage.url(r["avatar"]) if r["avatar"] else "",
+            }
+            for r in results
+        ]
+    })
+
+
 def followers_list(request, username: str):
     """
     Список подписчиков пользователя.
@@ -0,0 +1,132 @@
+"""
+Замер гибридной ленты «Подписки» при разных FEED_FANOUT_FOLLOWER_THRESHOLD.
+
+Запуск из каталога с manage.py:
+    python benchmarks/bench_feed.py [--users 3000] [--posts 20] [--reads 50]
+
+Работает на отдельной in-memory SQLite (рабочую db.sqlite3 не трогает).
+Для каждого порога показывает:
+  - write amplification: сколько строк TimelineEntry пишет одна публикация
+    (в среднем по всем авторам и отдельно для «звезды»);
+  - время публикации поста «звездой»;
+  - латентность чтения первой страницы ленты подписчика (p50 / p95).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "social.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+from accounts.models import Follow, User  # noqa: E402
+from network.models import Post, TimelineEntry  # noqa: E402
+from network.timeline import timeline_page  # noqa: E402
+
+
+def build_graph(n_users):
+    """
+    Социальный граф: одна «звезда» (на неё подписаны все), десяток
+    «популярных» (по ~n/10 подписчиков) и обычные пользователи,
+    каждый подписан на 20 соседей.
+    """
+    User.objects.bulk_create(
+        [User(username=f"u{i}", password="!") for i in range(n_users)], batch_size=1000
+    )
+    ids = list(User.objects.order_by("id").values_list("id", flat=True))
+    star, popular, regular = ids[0], ids[1:11], ids[11:]
+
+    pairs = set()
+    for i, uid in enumerate(ids[1:], start=1):
+        pairs.add((uid, star))
+        if i % 10 == 0:
+            for p in popular:
+                if p != uid:
+                    pairs.add((uid, p))
+        for k in range(1, 21):
+            other = ids[(i + k) % len(ids)]
+            if other != uid:
+                pairs.add((uid, other))
+
+    # bulk_create сигналы не шлёт — followers_count выставляем сами
+    Follow.objects.bulk_create(
+        [Follow(follower_id=a, following_id=b) for a, b in pairs], batch_size=5000
+    )
+    counts = {}
+    for _, b in pairs:
+        counts[b] = counts.get(b, 0) + 1
+    for uid, n in counts.items():
+        User.objects.filter(pk=uid).update(followers_count=n)
+    return star, popular, regular
+
+
+def reset_content():
+    TimelineEntry.objects.all().delete()
+    Post.objects.all().delete()
+
+
+def publish(authors, posts_per_author):
+    """Публикует посты по кругу; возвращает (строк в лентах, секунд) по каждому автору."""
+    stats = {a: [0, 0.0] for a in authors}
+    for n in range(posts_per_author):
+        for author_id in authors:
+            before = TimelineEntry.objects.count()
+            t0 = time.perf_counter()
+            Post.objects.create(author_id=author_id, text=f"post {n} by {author_id}")
+            stats[author_id][1] += time.perf_counter() - t0
+            stats[author_id][0] += TimelineEntry.objects.count() - before
+    return stats
+
+
+def read_latency(readers, reads):
+    samples = []
+    for i in range(reads):
+        user = readers[i % len(readers)]
+        t0 = time.perf_counter()
+        timeline_page(user, None, 20)
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=3000)
+    parser.add_argument("--posts", type=int, default=20, help="постов на автора")
+    parser.add_argument("--reads", type=int, default=50)
+    args = parser.parse_args()
+
+    connection.creation.create_test_db(verbosity=0)
+    star, popular, regular = build_graph(args.users)
+    authors = [star, *popular, *regular[:40]]
+    readers = list(User.objects.filter(pk__in=regular[:args.reads]))
+
+    thresholds = [None, args.users // 2, args.users // 20, 25]
+    print(f"users={args.users}, authors={len(authors)}, posts/author={args.posts}")
+    print(f"{'threshold':>10} | {'rows/post':>9} | {'star rows/post':>14} | "
+          f"{'star publish ms':>15} | {'read p50 ms':>11} | {'read p95 ms':>11}")
+    for threshold in thresholds:
+        reset_content()
+        with override_settings(FEED_FANOUT_FOLLOWER_THRESHOLD=threshold):
+            stats = publish(authors, args.posts)
+            total_rows = sum(s[0] for s in stats.values())
+            rows_per_post = total_rows / (len(authors) * args.posts)
+            star_rows = stats[star][0] / args.posts
+            star_ms = stats[star][1] / args.posts * 1000
+            p50, p95 = read_latency(readers, args.reads)
+        label = "push only" if threshold is None else str(threshold)
+        print(f"{label:>10} | {rows_per_post:>9.1f} | {star_rows:>14.1f} | "
+              f"{star_ms:>15.2f} | {p50:>11.2f} | {p95:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Пропускная способность лайков: прямая запись против буфера (LIKES_WRITE_BEHIND).
+
+Запуск из каталога с manage.py:
+    python benchmarks/bench_likes.py [--ops 3000] [--users 300] [--posts 100]
+
+База — временный файл SQLite (как в проде: журнал, fsync, один писатель),
+рабочую db.sqlite3 не трогает. Клики идут прямо во view toggle_like_ajax
+через RequestFactory, без HTTP и middleware. Для буфера в замер входит и
+финальный сброс, так что сравниваются честные «лайков в секунду до БД».
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "social.settings")
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+_tmp = tempfile.mkdtemp(prefix="bench_likes_")
+settings.DATABASES["default"]["TEST"] = {"NAME": os.path.join(_tmp, "bench.sqlite3")}
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+from accounts.models import User  # noqa: E402
+from network import likebuffer, views  # noqa: E402
+from network.models import Like, Post  # noqa: E402
+from notify.models import Notification  # noqa: E402
+
+
+def seed(n_users, n_posts):
+    User.objects.bulk_create([User(username=f"u{i}", password="!") for i in range(n_users)])
+    users = list(User.objects.all())
+    Post.objects.bulk_create(
+        [Post(author=random.choice(users), text=f"post {i}") for i in range(n_posts)]
+    )
+    return users, list(Post.objects.values_list("id", flat=True))
+
+
+def reset():
+    Like.objects.all().delete()
+    Notification.objects.all().delete()
+    Post.objects.update(likes_count=0)
+
+
+def run(clicks, factory):
+    t0 = time.perf_counter()
+    for user, post_id in clicks:
+        request = factory.post(f"/post/{post_id}/like-ajax/")
+        request.user = user
+        views.toggle_like_ajax(request, post_id)
+    if likebuffer.enabled():
+        likebuffer.get_buffer().flush()
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=3000)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--posts", type=int, default=100)
+    args = parser.parse_args()
+
+    random.seed(42)
+    connection.creation.create_test_db(verbosity=0)
+    users, post_ids = seed(args.users, args.posts)
+    # «горячие» посты: треть кликов приходится на 5 постов
+    hot = post_ids[:5]
+    clicks = [
+        (random.choice(users), random.choice(hot) if random.random() < 0.33 else random.choice(post_ids))
+        for _ in range(args.ops)
+    ]
+    factory = RequestFactory()
+
+    print(f"ops={args.ops}, users={args.users}, posts={args.posts}, db={settings.DATABASES['default']['NAME']}")
+    print(f"{'mode':>22} | {'seconds':>8} | {'likes/s':>9} | {'likes in db':>11}")
+    modes = [
+        ("direct", {"LIKES_WRITE_BEHIND": False}),
+        ("buffer max=100", {"LIKES_WRITE_BEHIND": True, "LIKES_BUFFER_MAX": 100}),
+        ("buffer max=1000", {"LIKES_WRITE_BEHIND": True, "LIKES_BUFFER_MAX": 1000}),
+    ]
+    for label, overrides in modes:
+        reset()
+        likebuffer._buffer = None
+        with override_settings(LIKES_BUFFER_INTERVAL=3600, **overrides):
+            elapsed = run(clicks, factory)
+        print(f"{label:>22} | {elapsed:>8.2f} | {args.ops / elapsed:>9.0f} | {Like.objects.count():>11}")
+
+    connection.creation.destroy_test_db(settings.DATABASES["default"]["NAME"], verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,28 @@
 from django.contrib import admin
-from .models import Thread, Message
+from .models import Thread, Message, ThreadParticipant
 
 class MessageInline(admin.TabularInline):
     model = Message
     extra = 0
-    readonly_fields = ('created_at', 'read_at', 'sender')
+    readonly_fields = ('created_at', 'sender')
+
+class ThreadParticipantInline(admin.TabularInline):
+    model = ThreadParticipant
+    extra = 0
+    readonly_fields = ('user', 'last_read_message_id', 'last_read_at', 'unread_count')
+    can_delete = False
 
 @admin.register(Thread)
 class ThreadAdmin(admin.ModelAdmin):
     list_display = ('id', 'user1', 'user2', 'updated_at', 'created_at')
-    search_fields = ('user1__username', 'user2__username')
+    search_fields = ('participants_state__user__username',)
     list_filter = ('updated_at', 'created_at')
-    inlines = [MessageInline]
+    inlines = [ThreadParticipantInline, MessageInline]
 
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
-    list_display = ('id', 'thread', 'sender', 'short_text', 'created_at', 'read_at')
-    search_fields = ('text', 'sender__username', 'thread__user1__username', 'thread__user2__username')
+    list_display = ('id', 'thread', 'sender', 'short_text', 'created_at')
+    search_fields = ('text', 'sender__username', 'thread__participants_state__user__username')
     list_filter = ('created_at',)
     autocomplete_fields = ('thread', 'sender')
 
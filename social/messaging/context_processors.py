@@ -1,20 +1,21 @@
-from django.db.models import Q
-from .models import Message
+from django.utils.functional import SimpleLazyObject
+
+from social import badges
+from .participants import unread_total
+
 
 def unread_messages(request):
     """
     Возвращает:
       - unread_count: общее число непрочитанных входящих сообщений для текущего пользователя
       - has_unread: флаг наличия непрочитанных
+
+    Оба значения ленивые и берутся из кэша (social/badges.py): страница без
+    навбара их не считает.
     """
     if not request.user.is_authenticated:
         return {}
 
-    user = request.user
-    count = (
-        Message.objects
-        .filter(Q(thread__user1=user) | Q(thread__user2=user))  # диалоги где я участник
-        .filter(~Q(sender=user), read_at__isnull=True)          # входящие, ещё не прочитанные
-        .count()
-    )
-    return {"unread_count": count, "has_unread": count > 0}
+    user_id = request.user.id
+    count = badges.lazy("messages", user_id, lambda: unread_total(user_id))
+    return {"unread_count": count, "has_unread": SimpleLazyObject(lambda: count > 0)}
@@ -0,0 +1,20 @@
+# messaging/handlers.py
+"""
+Счётчики диалогов из outbox (outbox/events.py): событие "message" пишет
+сигнал Message post_save в транзакции отправки, обработчик двигает
+ThreadParticipant и публикует сообщение в SSE-канал диалога.
+
+Повтор события безопасен: participants.record_message пересчитывает, а
+не прибавляет.
+"""
+from outbox.events import handler
+from . import participants
+from .models import Message
+
+
+@handler("message")
+def message_sent(payload):
+    """payload: thread, message, sender."""
+    message = Message.objects.filter(pk=payload["message"]).first()
+    if message is not None:  # удалено до разбора — учитывать нечего
+        participants.record_message(message)
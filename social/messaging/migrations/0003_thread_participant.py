@@ -0,0 +1,68 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def backfill_participants(apps, schema_editor):
+    """Знак прочтения — последнее прочитанное входящее, непрочитанные — входящие после него."""
+    Thread = apps.get_model('messaging', 'Thread')
+    Message = apps.get_model('messaging', 'Message')
+    ThreadParticipant = apps.get_model('messaging', 'ThreadParticipant')
+    for thread in Thread.objects.iterator():
+        messages = Message.objects.filter(thread=thread)
+        last = messages.order_by('-id').first()
+        if last is not None:
+            Thread.objects.filter(pk=thread.pk).update(last_message=last)
+        for user_id in (thread.user1_id, thread.user2_id):
+            incoming = messages.exclude(sender_id=user_id)
+            read = incoming.filter(read_at__isnull=False).aggregate(id=Max('id'), at=Max('read_at'))
+            watermark = read['id'] or 0
+            ThreadParticipant.objects.create(
+                thread=thread,
+                user_id=user_id,
+                last_read_message_id=watermark,
+                last_read_at=read['at'],
+                unread_count=incoming.filter(id__gt=watermark).count(),
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0002_message_is_read'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thread',
+            name='last_message',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.message'),
+        ),
+        migrations.CreateModel(
+            name='ThreadParticipant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read_message_id', models.BigIntegerField(default=0)),
+                ('last_read_at', models.DateTimeField(blank=True, null=True)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('thread', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participants_state', to='messaging.thread')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='thread_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'thread'), name='unique_thread_participant')],
+            },
+        ),
+        migrations.RunPython(backfill_participants, reverse_code=migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='message',
+            name='is_read',
+        ),
+        migrations.RemoveField(
+            model_name='message',
+            name='read_at',
+        ),
+    ]
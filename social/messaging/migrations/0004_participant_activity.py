@@ -0,0 +1,70 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:52
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def merge_duplicate_threads(apps, schema_editor):
+    """Перед unique_thread_pair: сообщения дублей пары — в самый ранний тред."""
+    Thread = apps.get_model('messaging', 'Thread')
+    Message = apps.get_model('messaging', 'Message')
+    ThreadParticipant = apps.get_model('messaging', 'ThreadParticipant')
+
+    keepers = {}
+    for thread in Thread.objects.order_by('pk'):
+        pair = tuple(sorted((thread.user1_id, thread.user2_id)))
+        keeper = keepers.setdefault(pair, thread)
+        if keeper.pk == thread.pk:
+            if (thread.user1_id, thread.user2_id) != pair:
+                Thread.objects.filter(pk=thread.pk).update(user1_id=pair[0], user2_id=pair[1])
+            continue
+        Message.objects.filter(thread=thread).update(thread=keeper)
+        Thread.objects.filter(pk=thread.pk).delete()
+        last = Message.objects.filter(thread=keeper).order_by('-id').first()
+        Thread.objects.filter(pk=keeper.pk).update(last_message=last)
+        for state in ThreadParticipant.objects.filter(thread=keeper):
+            state.unread_count = (
+                Message.objects.filter(thread=keeper, id__gt=state.last_read_message_id)
+                .exclude(sender_id=state.user_id).count()
+            )
+            state.save(update_fields=['unread_count'])
+
+
+def backfill_last_activity(apps, schema_editor):
+    Thread = apps.get_model('messaging', 'Thread')
+    ThreadParticipant = apps.get_model('messaging', 'ThreadParticipant')
+    ThreadParticipant.objects.update(
+        last_activity=Subquery(Thread.objects.filter(pk=OuterRef('thread_id')).values('updated_at')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0003_thread_participant'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='thread',
+            name='messaging_t_user1_i_ff4737_idx',
+        ),
+        migrations.AddField(
+            model_name='threadparticipant',
+            name='last_activity',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(merge_duplicate_threads, reverse_code=migrations.RunPython.noop),
+        migrations.RunPython(backfill_last_activity, reverse_code=migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='threadparticipant',
+            index=models.Index(fields=['user', '-last_activity'], name='participant_activity_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='thread',
+            constraint=models.UniqueConstraint(fields=('user1', 'user2'), name='unique_thread_pair'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 User = settings.AUTH_USER_MODEL
 
@@ -8,19 +9,28 @@ User = settings.AUTH_USER_MODEL
 class Thread(models.Model):
     """
     Диалог 1:1 между двумя пользователями.
-    Гарантируем уникальность пары (min(user1_id, user2_id), max(...)).
+    Гарантируем уникальность пары (min(user1_id, user2_id), max(...)):
+    save() нормализует порядок, ограничение unique_thread_pair не даёт
+    двум параллельным запросам завести второй тред той же пары.
+    «Мои диалоги» ищутся не по user1/user2, а по ThreadParticipant.
     """
     user1 = models.ForeignKey(User, on_delete=models.CASCADE, related_name='threads_as_user1')
     user2 = models.ForeignKey(User, on_delete=models.CASCADE, related_name='threads_as_user2')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)  # обновляется при новых сообщениях
+    # последнее сообщение — превью в списке диалогов без подзапроса
+    last_message = models.ForeignKey(
+        'Message', null=True, blank=True, on_delete=models.SET_NULL, related_name='+', editable=False
+    )
 
     class Meta:
         ordering = ['-updated_at']
         indexes = [
-            models.Index(fields=['user1', 'user2']),
             models.Index(fields=['updated_at']),
         ]
+        constraints = [
+            models.UniqueConstraint(fields=['user1', 'user2'], name='unique_thread_pair'),
+        ]
 
     def clean(self):
         if self.user1_id == self.user2_id:
@@ -47,8 +57,6 @@ class Message(models.Model):
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     text = models.TextField(max_length=2000)
     created_at = models.DateTimeField(auto_now_add=True)
-    read_at = models.DateTimeField(null=True, blank=True)
-    is_read = models.BooleanField(default=False)
 
     class Meta:
         ordering = ['created_at']
@@ -58,3 +66,39 @@ class Message(models.Model):
 
     def __str__(self):
         return f"m#{self.id} by {self.sender} in t#{self.thread_id}"
+
+
+class ThreadParticipant(models.Model):
+    """
+    Состояние диалога для одного из участников.
+
+    Прочитанность хранится водяным знаком: прочитано всё до
+    last_read_message_id включительно (id сообщений растут вместе со
+    временем). Сообщение m прочитано получателем ⇔ m.id <= его знака;
+    отдельных флагов у сообщений нет. unread_count — входящие после знака,
+    двигается на единицу при отправке и обнуляется при открытии диалога
+    (messaging/participants.py).
+    """
+    thread = models.ForeignKey(Thread, on_delete=models.CASCADE, related_name='participants_state')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='thread_states')
+    last_read_message_id = models.BigIntegerField(default=0)
+    last_read_at = models.DateTimeField(null=True, blank=True)
+    unread_count = models.PositiveIntegerField(default=0)
+    # время последнего сообщения в диалоге — порядок списка «мои диалоги»
+    last_activity = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            # (user, thread): заодно проверка «участник ли я этого треда»
+            models.UniqueConstraint(fields=['user', 'thread'], name='unique_thread_participant'),
+        ]
+        indexes = [
+            # «мои диалоги, свежие сверху» — один диапазон по индексу
+            models.Index(fields=['user', '-last_activity'], name='participant_activity_idx'),
+        ]
+
+    def has_read(self, message):
+        return message.pk <= self.last_read_message_id
+
+    def __str__(self):
+        return f"{self.user} в t#{self.thread_id}: {self.unread_count} непрочитанных"
@@ -0,0 +1,148 @@
+# messaging/participants.py
+"""
+Состояние диалога у участников (ThreadParticipant): знак прочтения,
+счётчик непрочитанных, последнее сообщение у треда.
+
+Новое сообщение учитывает обработчик события "message" из outbox
+(messaging/handlers.py) — после коммита, с повтором при сбое. Доставка
+«хотя бы один раз», поэтому record_message повтор переносит: последнее
+сообщение треда и знак отправителя только растут, а unread_count
+получателя пересчитывается по входящим после его знака (это только
+непрочитанный хвост диалога, по индексу). Открытие диалога переносит
+знак на последнее сообщение и обнуляет счётчик. Дочитывание страницами
+(thread_newer) переносит знак только до показанного сообщения, а
+счётчик пересчитывает по остатку после него. Список диалогов читает
+готовые значения одним запросом — диапазоном по индексу
+(user, last_activity DESC).
+
+Оба события публикуются после коммита в канал диалога (social/pubsub.py)
+для открытых SSE-потоков thread_events.
+"""
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from social import badges, pubsub
+from .models import Message, Thread, ThreadParticipant
+
+
+def channel(thread_id):
+    """Канал social.pubsub для событий диалога (новые сообщения, квитанции)."""
+    return f"thread:{thread_id}"
+
+
+def create_for(thread):
+    """Новый тред: строки состояния для обоих участников."""
+    ThreadParticipant.objects.bulk_create(
+        [
+            ThreadParticipant(thread=thread, user_id=uid, last_activity=thread.created_at)
+            for uid in (thread.user1_id, thread.user2_id)
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _incoming_after(boundary):
+    """
+    Подзапрос для UPDATE ThreadParticipant: сколько входящих в треде
+    после `boundary` (id сообщения или выражение по строке состояния).
+    """
+    return Coalesce(
+        Subquery(
+            Message.objects.filter(thread_id=OuterRef("thread_id"), pk__gt=boundary)
+            .exclude(sender_id=OuterRef("user_id"))
+            .order_by()
+            .values("thread_id")
+            .annotate(n=Count("pk"))
+            .values("n")[:1]
+        ),
+        0,
+    )
+
+
+def record_message(message):
+    """
+    Новое сообщение: у получателя пересчитываются непрочитанные, отправитель
+    свой тред прочитал (ответил — значит, видел), тред запоминает последнее
+    сообщение. Повторный вызов с тем же сообщением ничего не портит.
+    """
+    sent_at = message.created_at
+    with transaction.atomic():
+        Thread.objects.filter(pk=message.thread_id).filter(
+            Q(last_message__isnull=True) | Q(last_message_id__lt=message.pk)
+        ).update(last_message=message, updated_at=sent_at)
+        states = ThreadParticipant.objects.filter(thread_id=message.thread_id)
+        states.exclude(user_id=message.sender_id).update(
+            unread_count=_incoming_after(OuterRef("last_read_message_id")),
+            last_activity=Greatest("last_activity", Value(sent_at)),
+        )
+        states.filter(user_id=message.sender_id, last_read_message_id__lt=message.pk).update(
+            last_read_message_id=message.pk,
+            last_read_at=timezone.now(),
+            unread_count=_incoming_after(message.pk),
+            last_activity=Greatest("last_activity", Value(sent_at)),
+        )
+    badges.forget("messages", [uid for uid in _users(message) if uid != message.sender_id])
+    pubsub.publish(
+        channel(message.thread_id),
+        {"type": "message", "id": message.pk, "sender_id": message.sender_id},
+    )
+
+
+def _users(message):
+    if Message.thread.is_cached(message):
+        return (message.thread.user1_id, message.thread.user2_id)
+    return Thread.objects.filter(pk=message.thread_id).values_list("user1_id", "user2_id").first() or ()
+
+
+def mark_read(thread, user, up_to=None):
+    """
+    Открыт диалог: знак прочтения — на последнее сообщение треда, или
+    только до `up_to` (id последнего показанного), если клиент получил
+    не всё. Возвращает True, если что-то было непрочитано.
+    """
+    if up_to is None:
+        last_id = Coalesce(
+            Subquery(Thread.objects.filter(pk=OuterRef("thread_id")).values("last_message_id")[:1]),
+            F("last_read_message_id"),
+        )
+        changed = (
+            ThreadParticipant.objects.filter(thread=thread, user=user, unread_count__gt=0)
+            .update(last_read_message_id=last_id, last_read_at=timezone.now(), unread_count=0)
+        )
+    else:
+        # остаток — входящие после up_to; подзапросом в том же UPDATE, чтобы
+        # не потерять сообщение, пришедшее между подсчётом и записью
+        changed = (
+            ThreadParticipant.objects.filter(thread=thread, user=user, unread_count__gt=0)
+            .filter(Q(last_read_message_id__isnull=True) | Q(last_read_message_id__lt=up_to))
+            .update(
+                last_read_message_id=up_to,
+                last_read_at=timezone.now(),
+                unread_count=_incoming_after(up_to),
+            )
+        )
+    if changed:
+        badges.forget("messages", [user.pk])
+        # квитанция «прочитано» — второй стороне, если у неё открыт диалог
+        up_to = state(thread, user).last_read_message_id
+        pubsub.publish(channel(thread.pk), {"type": "read", "user_id": user.pk, "up_to": up_to})
+    return bool(changed)
+
+
+def threads_of(user):
+    """Треды пользователя: через ThreadParticipant, без OR по user1/user2."""
+    return Thread.objects.filter(participants_state__user=user)
+
+
+def state(thread, user):
+    return ThreadParticipant.objects.filter(thread=thread, user=user).first()
+
+
+def unread_total(user_id):
+    """Непрочитанные входящие по всем диалогам — сумма готовых счётчиков."""
+    return sum(
+        ThreadParticipant.objects.filter(user_id=user_id, unread_count__gt=0)
+        .values_list("unread_count", flat=True)
+    )
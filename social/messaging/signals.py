@@ -0,0 +1,34 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from outbox import events
+from social import badges
+from . import participants
+from .models import Message, Thread
+
+
+@receiver(post_save, sender=Thread)
+def thread_created(sender, instance, created, **kwargs):
+    if created:
+        participants.create_for(instance)
+
+
+@receiver(post_save, sender=Message)
+def message_sent(sender, instance, created, **kwargs):
+    # счётчики, значок и SSE — обработчик outbox (messaging/handlers.py);
+    # событие пишется в транзакции сохранения, если она есть (thread_detail)
+    if created:
+        events.record(
+            "message", thread=instance.thread_id, message=instance.pk, sender=instance.sender_id
+        )
+
+
+@receiver(post_delete, sender=Message)
+def message_badge(sender, instance, **kwargs):
+    # значок «Сообщения» у получателя (у отправителя входящие не менялись)
+    if Message.thread.is_cached(instance):
+        users = (instance.thread.user1_id, instance.thread.user2_id)
+    else:
+        users = Thread.objects.filter(pk=instance.thread_id).values_list("user1_id", "user2_id").first()
+    if users:
+        badges.forget("messages", [u for u in users if u != instance.sender_id])
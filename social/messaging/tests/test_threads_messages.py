@@ -1,7 +1,10 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
-from messaging.models import Thread, Message
+from django.test import RequestFactory
+from messaging.context_processors import unread_messages
+from messaging.models import Thread, Message, ThreadParticipant
+from social import badges
 
 User = get_user_model()
 
@@ -11,6 +14,11 @@ class MessagingTests(TestCase):
         self.a = User.objects.create_user(username="alice", password="pass123")
         self.b = User.objects.create_user(username="bob", password="pass123")
 
+    def send(self, thread, sender, text):
+        # счётчики — обработчик события "message", он выполняется после коммита
+        with self.captureOnCommitCallbacks(execute=True):
+            return Message.objects.create(thread=thread, sender=sender, text=text)
+
     def test_start_thread_and_send_message(self):
         self.client.login(username="alice", password="pass123")
         # start/open thread
@@ -28,10 +36,179 @@ class MessagingTests(TestCase):
         # создаём тред и входящее сообщение для bob
         u1, u2 = (self.a, self.b) if self.a.id < self.b.id else (self.b, self.a)
         thread = Thread.objects.create(user1=u1, user2=u2)
-        Message.objects.create(thread=thread, sender=self.a, text="ping")
+        self.send(thread, self.a, "ping")
 
         # bob открывает диалог → помечаем как прочитано
         self.client.login(username="bob", password="pass123")
         resp = self.client.get(reverse("thread_detail", args=[thread.pk]))
         self.assertEqual(resp.status_code, 200)
-        self.assertIsNotNone(thread.messages.first().read_at)
+        state = ThreadParticipant.objects.get(thread=thread, user=self.b)
+        self.assertEqual(state.last_read_message_id, thread.messages.first().pk)
+        self.assertEqual(state.unread_count, 0)
+
+    def test_unread_badge_is_lazy_and_invalidated(self):
+        badges.forget("messages", [self.a.id, self.b.id])  # id переживают откат транзакции теста
+        u1, u2 = (self.a, self.b) if self.a.id < self.b.id else (self.b, self.a)
+        thread = Thread.objects.create(user1=u1, user2=u2)
+
+        request = RequestFactory().get("/")
+        request.user = self.b
+        with self.assertNumQueries(0):
+            ctx = unread_messages(request)  # ничего не считает, пока не спросят
+        with self.assertNumQueries(1):
+            self.assertEqual(ctx["unread_count"], 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_messages(request)["unread_count"], 0)  # из кэша
+
+        self.send(thread, self.a, "ping")
+        self.assertEqual(unread_messages(request)["unread_count"], 1)
+        self.assertTrue(unread_messages(request)["has_unread"])
+
+        self.client.login(username="bob", password="pass123")
+        self.client.get(reverse("thread_detail", args=[thread.pk]))
+        self.assertEqual(unread_messages(request)["unread_count"], 0)
+
+    def test_inbox_reads_participant_state(self):
+        u1, u2 = (self.a, self.b) if self.a.id < self.b.id else (self.b, self.a)
+        thread = Thread.objects.create(user1=u1, user2=u2)
+        first = self.send(thread, self.a, "первое")
+        self.send(thread, self.a, "второе")
+
+        state = ThreadParticipant.objects.get(thread=thread, user=self.b)
+        self.assertEqual((state.unread_count, state.last_read_message_id), (2, 0))
+        thread.refresh_from_db()
+        self.assertEqual(thread.last_message.text, "второе")
+
+        self.client.login(username="bob", password="pass123")
+        resp = self.client.get(reverse("inbox"))
+        self.assertContains(resp, "✉ 2")
+        self.assertContains(resp, "второе")
+
+        self.client.get(reverse("thread_detail", args=[thread.pk]))
+        state.refresh_from_db()
+        self.assertEqual(state.unread_count, 0)
+        self.assertTrue(state.has_read(first))
+
+        # ответ bob: у alice +1, а её сообщения для неё отмечены ✔✔
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("thread_detail", args=[thread.pk]), {"text": "ответ"})
+        self.assertEqual(ThreadParticipant.objects.get(thread=thread, user=self.a).unread_count, 1)
+        self.client.login(username="alice", password="pass123")
+        resp = self.client.get(reverse("thread_detail", args=[thread.pk]))
+        self.assertContains(resp, "✔✔", count=2)
+
+    def test_message_event_redelivery_does_not_double_count(self):
+        from outbox import events
+        from outbox.models import OutboxEvent
+
+        u1, u2 = (self.a, self.b) if self.a.id < self.b.id else (self.b, self.a)
+        thread = Thread.objects.create(user1=u1, user2=u2)
+        self.client.login(username="alice", password="pass123")
+        self.client.post(reverse("thread_detail", args=[thread.pk]), {"text": "hi"})
+        event = OutboxEvent.objects.get(kind="message")  # коммита не было — счётчик не тронут
+        self.assertEqual(ThreadParticipant.objects.get(thread=thread, user=self.b).unread_count, 0)
+
+        for _ in range(2):  # повтор после сбоя воркера до отметки done
+            OutboxEvent.objects.filter(pk=event.pk).update(status=OutboxEvent.Status.PENDING, handled=[])
+            events.dispatch_now(event.pk)
+        state = ThreadParticipant.objects.get(thread=thread, user=self.b)
+        self.assertEqual(state.unread_count, 1)
+        thread.refresh_from_db()
+        self.assertEqual(thread.last_message.text, "hi")
+
+    @override_settings(MESSAGES_PAGE_SIZE=3)
+    def test_history_pages_older_and_newer(self):
+        u1, u2 = (self.a, self.b) if self.a.id < self.b.id else (self.b, self.a)
+        thread = Thread.objects.create(user1=u1, user2=u2)
+        msgs = [self.send(thread, self.a, f"m{i}") for i in range(7)]
+
+        self.client.login(username="bob", password="pass123")
+        resp = self.client.get(reverse("thread_detail", args=[thread.pk]))
+        self.assertEqual([m.text for m in resp.context["msgs"]], ["m4", "m5", "m6"])
+
+        seen, cursor = [], resp.context["older_cursor"]
+        while cursor:
+            data = self.client.get(reverse("thread_older", args=[thread.pk]), {"cursor": cursor}).json()
+            seen.append(data["rendered_html"])
+            cursor = data["next_cursor"]
+        self.assertEqual(len(seen), 2)
+        self.assertIn("m3", seen[0])
+        self.assertIn("m0", seen[1])
+
+        self.send(thread, self.a, "свежее")
+        data = self.client.get(reverse("thread_newer", args=[thread.pk]), {"after": msgs[-1].pk}).json()
+        self.assertIn("свежее", data["rendered_html"])
+        self.assertNotIn("m6", data["rendered_html"])
+        self.assertEqual(ThreadParticipant.objects.get(thread=thread, user=self.b).unread_count, 0)
+
+        # страница newer короче непрочитанного — знак только до последнего показанного
+        fresh = [self.send(thread, self.a, f"n{i}") for i in range(3)]
+        data = self.client.get(
+            reverse("thread_newer", args=[thread.pk]), {"after": fresh[0].pk - 1, "limit": 2}
+        ).json()
+        self.assertEqual(data["last_id"], fresh[1].pk)
+        state = ThreadParticipant.objects.get(thread=thread, user=self.b)
+        self.assertEqual((state.last_read_message_id, state.unread_count), (fresh[1].pk, 1))
+
+        # чужой диалог не отдаётся
+        carol = User.objects.create_user(username="carol", password="pass123")
+        self.client.force_login(carol)
+        self.assertEqual(self.client.get(reverse("thread_older", args=[thread.pk])).status_code, 404)
+
+    async def test_thread_events_stream(self):
+        from asgiref.sync import sync_to_async
+        from social import pubsub
+
+        u1, u2 = (self.a, self.b) if self.a.id < self.b.id else (self.b, self.a)
+        thread = await Thread.objects.acreate(user1=u1, user2=u2)
+        await self.async_client.aforce_login(self.b)
+
+        resp = await self.async_client.get(reverse("thread_events", args=[thread.pk]))
+        self.assertEqual(resp["Content-Type"], "text/event-stream")
+        events = aiter(resp.streaming_content)
+        self.assertTrue((await anext(events)).startswith(b"retry:"))  # подписка оформлена
+
+        def send():
+            with self.captureOnCommitCallbacks(execute=True):  # publish — после коммита
+                return Message.objects.create(thread=thread, sender=self.a, text="hi")
+
+        msg = await sync_to_async(send)()
+        chunk = (await anext(events)).decode()
+        self.assertIn("event: message", chunk)
+        self.assertIn(f'"id": {msg.pk}', chunk)
+
+        await events.aclose()
+
+        # событие чужого диалога сюда не попадает: следующим идёт пинг
+        with self.settings(SSE_HEARTBEAT_SECONDS=0.05):
+            resp = await self.async_client.get(reverse("thread_events", args=[thread.pk]))
+            events = aiter(resp.streaming_content)
+            await anext(events)
+            pubsub.get_broker().publish(f"thread:{thread.pk + 1}", {"type": "message"})
+            self.assertEqual(await anext(events), b": ping\n\n")
+            await events.aclose()
+
+        # чужой диалог — 404
+        carol = await sync_to_async(User.objects.create_user)(username="carol", password="pass123")
+        await self.async_client.aforce_login(carol)
+        resp = await self.async_client.get(reverse("thread_events", args=[thread.pk]))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_inbox_ordered_by_activity_and_unique_pair(self):
+        from django.db import IntegrityError, transaction
+
+        carol = User.objects.create_user(username="carol", password="pass123")
+        self.client.login(username="alice", password="pass123")
+        self.client.get(reverse("start_thread", args=["bob"]))
+        self.client.get(reverse("start_thread", args=["carol"]))
+        self.client.get(reverse("start_thread", args=["bob"]))  # тот же тред
+        self.assertEqual(Thread.objects.count(), 2)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Thread.objects.create(user1=self.b, user2=self.a)  # save() нормализует пару
+
+        with_bob = Thread.objects.get(user1__in=[self.a, self.b], user2__in=[self.a, self.b])
+        self.send(with_bob, self.b, "свежее")
+        resp = self.client.get(reverse("inbox"))
+        self.assertEqual(
+            [s.thread.other(self.a) for s in resp.context["states"]], [self.b, carol]
+        )
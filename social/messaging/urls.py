@@ -5,4 +5,7 @@ urlpatterns = [
     path('', views.inbox, name='inbox'),
     path('start/<str:username>/', views.start_thread, name='start_thread'),
     path('t/<int:pk>/', views.thread_detail, name='thread_detail'),
+    path('t/<int:pk>/older/', views.thread_older, name='thread_older'),
+    path('t/<int:pk>/newer/', views.thread_newer, name='thread_newer'),
+    path('t/<int:pk>/events/', views.thread_events, name='thread_events'),
 ]
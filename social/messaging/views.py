@@ -1,31 +1,29 @@
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q, Count
+from django.db import transaction
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.utils.timezone import now
+from django.template.loader import render_to_string
 
 from accounts.models import User
-from .models import Thread, Message
+from network.pagination import get_page_size, keyset_page
+from social import pubsub
+from . import participants
+from .models import Thread, ThreadParticipant
 from .forms import MessageForm
 
 
-
 @login_required
 def inbox(request):
-    threads = (
-        Thread.objects
-        .filter(Q(user1=request.user) | Q(user2=request.user))
-        .select_related('user1', 'user2')
-        .annotate(
-            unread_count=Count(
-                'messages',
-                filter=Q(messages__read_at__isnull=True) & ~Q(messages__sender=request.user),
-                distinct=True,
-            )
-        )
-        .order_by('-updated_at')
+    # готовые счётчики и превью из ThreadParticipant — без агрегации по сообщениям
+    states = (
+        ThreadParticipant.objects
+        .filter(user=request.user)
+        .select_related('thread__user1', 'thread__user2', 'thread__last_message')
+        .order_by('-last_activity')
     )
-    return render(request, 'messaging/inbox.html', {'threads': threads})
+    return render(request, 'messaging/inbox.html', {'states': states})
 
 
 @login_required
@@ -38,11 +36,10 @@ def start_thread(request, username):
         messages.error(request, "Нельзя писать самому себе.")
         return redirect("profile", username=username)
 
-    # нормализуем порядок id для поиска существующего треда
+    # нормализованная пара + unique_thread_pair: при гонке двух запросов
+    # второй INSERT упадёт, и get_or_create вернёт тред первого
     u1, u2 = (request.user, target) if request.user.id < target.id else (target, request.user)
-    thread = Thread.objects.filter(user1=u1, user2=u2).first()
-    if not thread:
-        thread = Thread.objects.create(user1=u1, user2=u2)
+    thread, _ = Thread.objects.get_or_create(user1=u1, user2=u2)
 
     return redirect("thread_detail", pk=thread.pk)
 
@@ -57,17 +54,12 @@ def thread_detail(request, pk):
         Thread.objects.select_related("user1", "user2"),
         pk=pk
     )
-    if request.user not in thread.participants():
+    if request.user.pk not in (thread.user1_id, thread.user2_id):
         messages.error(request, "Доступ к этому диалогу запрещён.")
         return redirect("inbox")
 
-    # Загружаем сообщения
-    msgs = thread.messages.select_related("sender").all()
-
-    # Отмечаем входящие как прочитанные
-    unread = msgs.filter(~Q(sender=request.user), read_at__isnull=True)
-    if unread.exists():
-        unread.update(read_at=now())
+    # Отмечаем входящие как прочитанные: переносим знак прочтения
+    participants.mark_read(thread, request.user)
 
     # Отправка нового сообщения
     if request.method == "POST":
@@ -76,25 +68,115 @@ def thread_detail(request, pk):
             msg = form.save(commit=False)
             msg.thread = thread
             msg.sender = request.user
-            msg.save()
-            # Обновим updated_at у треда (Message.save это не делает)
-            Thread.objects.filter(pk=thread.pk).update(updated_at=now())
+            with transaction.atomic():
+                # сообщение и событие "message" — одним коммитом; счётчики,
+                # значок и SSE — обработчик outbox (messaging/handlers.py)
+                msg.save()
             return redirect("thread_detail", pk=thread.pk)
     else:
         form = MessageForm()
 
+    # последние N сообщений диапазоном по индексу (thread, created_at);
+    # более ранние — thread_older по курсору, новые — thread_newer
+    msgs, older_cursor = _history_page(thread, None, _page_size(request))
     other = thread.other(request.user)
     return render(
         request,
         "messaging/thread_detail.html",
         {
             "thread": thread,
-            "msgs": msgs,   #
+            "msgs": msgs,
+            "older_cursor": older_cursor,
+            "last_id": msgs[-1].pk if msgs else 0,
             "form": form,
             "other": other,
+            "other_read_id": _read_up_to(thread, other),
         },
     )
 
 
+def _page_size(request):
+    return get_page_size(request, getattr(settings, "MESSAGES_PAGE_SIZE", 30))
+
+
+def _history_page(thread, cursor, size):
+    """
+    `size` сообщений перед курсором (None — самые свежие) в хронологическом
+    порядке и курсор для следующей порции более ранних (или None).
+    """
+    items, older_cursor = keyset_page(thread.messages.select_related("sender"), cursor, size)
+    items.reverse()
+    return items, older_cursor
+
+
+def _read_up_to(thread, other):
+    """✔✔ у своих сообщений — те, что не дальше знака прочтения собеседника."""
+    state = participants.state(thread, other)
+    return state.last_read_message_id if state else 0
+
+
+def _participant_thread(request, pk):
+    return get_object_or_404(
+        participants.threads_of(request.user).select_related("user1", "user2"), pk=pk
+    )
+
+
+def _render_messages(request, thread, msgs):
+    context = {"other_read_id": _read_up_to(thread, thread.other(request.user))}
+    return "".join(
+        render_to_string("partials/message_item.html", {**context, "m": m}, request=request)
+        for m in msgs
+    )
+
+
+@login_required
+def thread_older(request, pk):
+    """
+    Более ранние сообщения: ?cursor=<курсор самого раннего показанного>.
+    JSON { rendered_html, next_cursor }.
+    """
+    thread = _participant_thread(request, pk)
+    msgs, next_cursor = _history_page(thread, request.GET.get("cursor"), _page_size(request))
+    return JsonResponse(
+        {"rendered_html": _render_messages(request, thread, msgs), "next_cursor": next_cursor}
+    )
 
 
+@login_required
+def thread_newer(request, pk):
+    """
+    Сообщения после ?after=<id последнего показанного> (по возрастанию).
+    Показанные входящие сразу считаются прочитанными.
+    JSON { rendered_html, last_id, read_up_to }.
+    """
+    thread = _participant_thread(request, pk)
+    try:
+        after = int(request.GET.get("after") or 0)
+    except ValueError:
+        after = 0
+    size = _page_size(request)
+    msgs = list(thread.messages.select_related("sender").filter(pk__gt=after).order_by("pk")[:size])
+    if msgs:
+        # прочитано только показанное: следующая страница ещё не у клиента
+        participants.mark_read(thread, request.user, up_to=msgs[-1].pk)
+    return JsonResponse(
+        {
+            "rendered_html": _render_messages(request, thread, msgs),
+            "last_id": msgs[-1].pk if msgs else after,
+            "read_up_to": _read_up_to(thread, thread.other(request.user)),
+        }
+    )
+
+
+@login_required
+async def thread_events(request, pk):
+    """
+    SSE-поток диалога: `message` (id нового сообщения — клиент забирает его
+    через thread_newer), `read` (квитанция: собеседник прочитал всё до
+    up_to), `resync` (клиент не успевал — дочитать через thread_newer).
+    """
+    user = await request.auser()
+    thread = await participants.threads_of(user).filter(pk=pk).afirst()
+    if thread is None:
+        raise Http404
+    return pubsub.event_stream_response(request, [participants.channel(thread.pk)])
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Post, Comment, Like
+from .models import Post, Comment, Like, ImageJob
 
 class CommentInline(admin.TabularInline):
     model = Comment
@@ -9,7 +9,7 @@ class CommentInline(admin.TabularInline):
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
-    list_display = ('id', 'author', 'short_text', 'created_at')  # 👈 список колонок
+    list_display = ('id', 'author', 'short_text', 'likes_count', 'comments_count', 'created_at')  # 👈 список колонок
     search_fields = ('text', 'author__username')
     list_filter = ('created_at', 'author')
     inlines = [CommentInline]
@@ -28,3 +28,9 @@ class CommentAdmin(admin.ModelAdmin):
 class LikeAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'post', 'created_at')
     list_filter = ('created_at', 'user')
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'object_id', 'status', 'attempts', 'updated_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('created_at', 'updated_at')
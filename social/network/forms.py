@@ -10,7 +10,7 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ("text", "image")
         widgets = {
-            "text": forms.Textarea(attrs={"rows": 3, "class": "form-control", "placeholder": "Что нового?"}),
+            "text": forms.Textarea(attrs={"rows": 3, "class": "form-control", "placeholder": "Что нового?", "data-mention": ""}),
         }
 
 class CommentForm(forms.ModelForm):
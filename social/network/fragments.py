@@ -0,0 +1,91 @@
+# network/fragments.py
+"""
+Кэш отрисованных фрагментов карточек (партиалы post_card, comment_item).
+
+Общая для всех зрителей часть карточки — шапка, текст, картинка —
+рендерится один раз и кладётся в кэш (алиас FRAGMENT_CACHE) под ключом
+с версией объекта:
+
+    frag:post:<id>:<версия>:<md5 от прочих значений ключа>
+
+Версия — метка времени в наносекундах под ключом frag:v:post:<id>; её
+меняет bump() при сохранении объекта (правка, новая картинка, готовые
+копии для srcset). Старые фрагменты не удаляются, а просто перестают
+читаться и вытесняются кэшем. Пропавшая из кэша версия заводится заново
+с новой меткой, поэтому устаревший фрагмент не всплывёт.
+
+То, что зависит от зрителя (сердечко, «Изменить»/«Удалить», CSRF-токен,
+форма ответа), и счётчики лайков/комментариев (их правит буфер лайков)
+рендерятся вне фрагмента на каждый запрос — лайк и комментарий кэш не
+сбрасывают.
+
+С локальным кэшем (LocMem по умолчанию) правка в одном процессе видна
+в другом не позже чем через FRAGMENT_CACHE_TTL; с общим кэшем — сразу.
+FRAGMENT_CACHE_TTL = 0 выключает кэш.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+
+def _cache():
+    return caches[getattr(settings, "FRAGMENT_CACHE", "default")]
+
+
+def _ttl():
+    return getattr(settings, "FRAGMENT_CACHE_TTL", 600)
+
+
+def _version_key(kind, pk):
+    return f"frag:v:{kind}:{pk}"
+
+
+def bump(kind, pk):
+    """Объект изменился: фрагменты со старой версией больше не читаются."""
+    _cache().set(_version_key(kind, pk), time.time_ns(), None)
+
+
+def prefetch(kind, objs):
+    """Версии для целой страницы одним запросом к кэшу (obj._fragment_version)."""
+    if not _ttl():
+        return
+    objs = [o for o in objs if o.pk is not None]
+    keys = {_version_key(kind, o.pk): o for o in objs}
+    found = _cache().get_many(list(keys))
+    for key, obj in keys.items():
+        obj._fragment_version = found.get(key) or _new_version(key)
+
+
+def _new_version(key):
+    cache = _cache()
+    # add, а не set: соседний запрос мог успеть завести версию
+    cache.add(key, time.time_ns(), None)
+    return cache.get(key)
+
+
+def version(kind, obj):
+    v = getattr(obj, "_fragment_version", None)
+    if v is None:
+        key = _version_key(kind, obj.pk)
+        v = obj._fragment_version = _cache().get(key) or _new_version(key)
+    return v
+
+
+def cached(kind, obj, vary, render):
+    """Фрагмент объекта из кэша или render() с записью в кэш."""
+    ttl = _ttl()
+    if not ttl or obj is None or obj.pk is None:
+        return render()
+    # даты в карточке выводятся в активном часовом поясе
+    extra = [timezone.get_current_timezone_name(), *vary]
+    digest = hashlib.md5(repr(extra).encode(), usedforsecurity=False).hexdigest()
+    key = f"frag:{kind}:{obj.pk}:{version(kind, obj)}:{digest}"
+    cache = _cache()
+    html = cache.get(key)
+    if html is None:
+        html = render()
+        cache.set(key, html, ttl)
+    return html
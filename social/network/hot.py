@@ -0,0 +1,268 @@
+# network/hot.py
+"""
+Лента «Горячее»: посты по убыванию hot_score.
+
+hot_score = log10(max(лайки + HOT_COMMENT_WEIGHT·комментарии, 1))
+            + created_at / HOT_SCORE_TIME_SCALE
+
+(формула Reddit): каждые HOT_SCORE_TIME_SCALE секунд «свежести» весят
+столько же, сколько десятикратный рост реакций. Время входит в оценку
+через дату публикации, а не через возраст, поэтому оценка не устаревает
+и пересчитывается только на событиях (лайк, комментарий) — из
+_bump_counters и сброса буфера лайков, одним UPDATE по посту.
+
+Кандидаты — посты не старше HOT_FEED_WINDOW_DAYS: у остальных hot_score
+обнуляется (NULL) командой compact_hot_feed, и частичный индекс
+post_hot_idx остаётся маленьким при любом числе постов. Первые страницы
+отдаются из памяти процесса: HotIndex держит top-K (HOT_FEED_CANDIDATES)
+в отсортированном списке и перечитывается раз в HOT_FEED_REFRESH_SECONDS,
+чтобы подтянуть события из других процессов.
+"""
+import base64
+import math
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Post
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def window_start():
+    return timezone.now() - timedelta(days=_setting("HOT_FEED_WINDOW_DAYS", 7))
+
+
+def score(likes, comments, created_at):
+    engagement = likes + _setting("HOT_COMMENT_WEIGHT", 2) * comments
+    return math.log10(max(engagement, 1)) + created_at.timestamp() / _setting(
+        "HOT_SCORE_TIME_SCALE", 45000
+    )
+
+
+# ---------- курсор ----------
+
+def encode_cursor(hot_score, pk):
+    raw = f"{hot_score!r}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(hot_score, pk) или None — битый курсор значит «с начала»."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        s, pk = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return float(s), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+# ---------- top-K в памяти ----------
+
+class HotIndex:
+    """
+    Ограниченный top-K: отсортированный список ключей (-score, -id),
+    то есть порядок ленты. complete=True — в памяти все кандидаты, и
+    за пределами списка в БД ничего нет.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._keys = []
+        self._scores = {}  # post_id -> score
+        self.complete = True
+
+    def __len__(self):
+        return len(self._keys)
+
+    def load(self, rows):
+        """rows — (post_id, score) по убыванию, не больше capacity + 1."""
+        rows = list(rows)
+        complete = len(rows) <= self.capacity
+        rows = rows[: self.capacity]
+        with self._lock:
+            self._keys = [(-s, -pk) for pk, s in rows]
+            self._scores = dict(rows)
+            self.complete = complete
+
+    def _drop(self, post_id):
+        old = self._scores.pop(post_id, None)
+        if old is not None:
+            i = bisect_left(self._keys, (-old, -post_id))
+            if i < len(self._keys) and self._keys[i] == (-old, -post_id):
+                del self._keys[i]
+
+    def update(self, post_id, hot_score):
+        with self._lock:
+            self._drop(post_id)
+            if hot_score is None:
+                return
+            key = (-hot_score, -post_id)
+            if not self.complete or len(self._keys) >= self.capacity:
+                # в памяти только лучшие: пост хуже худшего остаётся в БД,
+                # иначе между ним и списком мог бы оказаться пропуск
+                if not self._keys or key > self._keys[-1]:
+                    self.complete = False
+                    return
+            insort(self._keys, key)
+            self._scores[post_id] = hot_score
+            if len(self._keys) > self.capacity:
+                evicted = self._keys.pop()
+                del self._scores[-evicted[1]]
+                self.complete = False
+
+    def remove(self, post_id):
+        with self._lock:
+            self._drop(post_id)
+
+    def page(self, position, limit):
+        """До `limit` пар (post_id, score) строго после позиции (score, id)."""
+        with self._lock:
+            start = 0 if position is None else bisect_right(self._keys, (-position[0], -position[1]))
+            return [(-pk, -s) for s, pk in self._keys[start: start + limit]]
+
+
+_index = HotIndex(_setting("HOT_FEED_CANDIDATES", 1000))
+_loaded_at = None
+
+
+def _candidates():
+    return Post.objects.filter(hot_score__isnull=False, created_at__gte=window_start())
+
+
+def get_index():
+    global _loaded_at
+    ttl = _setting("HOT_FEED_REFRESH_SECONDS", 60)
+    if _loaded_at is None or time.monotonic() - _loaded_at > ttl:
+        _index.capacity = _setting("HOT_FEED_CANDIDATES", 1000)
+        _index.load(
+            _candidates()
+            .order_by("-hot_score", "-id")
+            .values_list("id", "hot_score")[: _index.capacity + 1]
+        )
+        _loaded_at = time.monotonic()
+    return _index
+
+
+def reset():
+    """Сбросить индекс (тесты, смена БД)."""
+    global _loaded_at
+    _loaded_at = None
+    _index.load([])
+
+
+# ---------- события ----------
+
+def touch(post_id):
+    """Пересчитать hot_score поста по текущим счётчикам (после лайка/комментария)."""
+    row = (
+        Post.objects.filter(pk=post_id)
+        .values_list("likes_count", "comments_count", "created_at")
+        .first()
+    )
+    if row is None:
+        return
+    likes, comments, created_at = row
+    hot_score = score(likes, comments, created_at) if created_at >= window_start() else None
+    Post.objects.filter(pk=post_id).update(hot_score=hot_score)
+    _after_commit(_index_update, post_id, hot_score)
+
+
+def post_created(post):
+    """Новый пост: оценка без реакций, без лишнего SELECT."""
+    hot_score = score(0, 0, post.created_at)
+    Post.objects.filter(pk=post.pk).update(hot_score=hot_score)
+    post.hot_score = hot_score
+    _after_commit(_index_update, post.pk, hot_score)
+
+
+def post_removed(post_id):
+    _after_commit(_index_remove, post_id)
+
+
+def _after_commit(func, *args):
+    # top-K в памяти правим только после коммита: при откате лайка или
+    # комментария в нём не должна остаться оценка, которой нет в БД
+    transaction.on_commit(lambda: func(*args))
+
+
+def _index_update(post_id, hot_score):
+    if _loaded_at is not None:
+        _index.update(post_id, hot_score)
+
+
+def _index_remove(post_id):
+    if _loaded_at is not None:
+        _index.remove(post_id)
+
+
+# ---------- чтение ----------
+
+def hot_page(cursor, size):
+    """
+    Страница «Горячего» после `cursor`. Пока хватает top-K — из памяти,
+    дальше — диапазон по частичному индексу post_hot_idx.
+    Возвращает (posts, next_cursor).
+    """
+    position = decode_cursor(cursor)
+    index = get_index()
+    rows = index.page(position, size + 1)
+    if len(rows) <= size and not index.complete:
+        rows = _db_page(position, size + 1)
+
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+    by_id = Post.objects.select_related("author").in_bulk([pk for pk, _ in rows])
+    return [by_id[pk] for pk, _ in rows if pk in by_id], next_cursor
+
+
+def _db_page(position, limit):
+    qs = _candidates()
+    if position is not None:
+        s, pk = position
+        qs = qs.filter(hot_score__lte=s).exclude(hot_score=s, id__gte=pk)
+    return list(qs.order_by("-hot_score", "-id").values_list("id", "hot_score")[:limit])
+
+
+# ---------- компактизация ----------
+
+def compact(batch_size=1000):
+    """
+    Обнулить hot_score у постов, вышедших из окна, и пересчитать оценки
+    оставшихся по счётчикам. Возвращает (выбыло, пересчитано).
+    """
+    cutoff = window_start()
+    expired = Post.objects.filter(hot_score__isnull=False, created_at__lt=cutoff).update(hot_score=None)
+
+    recomputed, last_pk = 0, 0
+    while True:
+        batch = list(
+            Post.objects.filter(created_at__gte=cutoff, pk__gt=last_pk)
+            .order_by("pk")
+            .only("pk", "likes_count", "comments_count", "created_at", "hot_score")[:batch_size]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        changed = []
+        for p in batch:
+            new = score(p.likes_count, p.comments_count, p.created_at)
+            if new != p.hot_score:
+                p.hot_score = new
+                changed.append(p)
+        Post.objects.bulk_update(changed, ["hot_score"])
+        recomputed += len(changed)
+    reset()
+    return expired, recomputed
@@ -0,0 +1,169 @@
+# network/imagejobs.py
+"""
+Очередь обработки картинок (посты, аватары).
+
+Запрос на загрузку только сохраняет файл и ставит ImageJob (в той же
+транзакции, что и пост), а декодирование, проверку, снятие EXIF и
+нарезку копий делает `manage.py image_worker`: забирает задачи пачкой и
+отдаёт social.thumbnails.render пулу процессов. Пока задача в очереди,
+карточка показывает заглушку (см. thumbnails.mark_pending).
+
+IMAGE_PROCESSING_ASYNC=False — всё как раньше, синхронно в запросе.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.models import User
+from social import thumbnails
+from . import fragments
+from .models import ImageJob, Post
+
+# kind -> (модель, поле файла, поле копий)
+TARGETS = {
+    "posts": (Post, "image", "image_variants"),
+    "avatars": (User, "avatar", "avatar_variants"),
+}
+
+
+def is_async():
+    return getattr(settings, "IMAGE_PROCESSING_ASYNC", True)
+
+
+def schedule(instance, kind):
+    """Сигнал post_save: файл сменился — в очередь (или обработать сразу)."""
+    _, field, variants_field = TARGETS[kind]
+    fieldfile = getattr(instance, field)
+    variants = getattr(instance, variants_field) or {}
+    if not is_async() or not fieldfile:
+        thumbnails.refresh(instance, field, variants_field, kind)
+        return
+    if not thumbnails.is_stale(fieldfile, variants) or variants.get("pending") == fieldfile.name:
+        return  # уже обработан или уже в очереди
+
+    thumbnails.delete_variants(fieldfile.storage, variants)
+    thumbnails.mark_pending(instance, field, variants_field)
+    queued = ImageJob.objects.filter(
+        kind=kind, object_id=instance.pk, status=ImageJob.Status.PENDING
+    ).update(source=fieldfile.name)
+    if not queued:
+        ImageJob.objects.create(kind=kind, object_id=instance.pk, source=fieldfile.name)
+
+
+def changed(kind, pk):
+    """Картинку обработали: карточка поста в кэше фрагментов устарела."""
+    if kind == "posts":
+        fragments.bump("post", pk)
+
+
+def release(instance, kind):
+    """Сигнал post_delete: файл объекта больше не нужен (если на него не ссылаются другие)."""
+    _, field, variants_field = TARGETS[kind]
+    thumbnails.release(instance, field, variants_field)
+
+
+def release_replaced(instance, kind, update_fields=None):
+    """
+    Сигнал pre_save: картинку заменили или убрали (post_edit, profile_edit) —
+    старый оригинал больше не нужен этому объекту. Хранилище удалит его после
+    коммита, если на него не ссылается никто другой; копии для srcset
+    убирает schedule()/refresh() по старым *_variants.
+    """
+    model, field, _ = TARGETS[kind]
+    if instance.pk is None or (update_fields is not None and field not in update_fields):
+        return
+    old = model._default_manager.filter(pk=instance.pk).values_list(field, flat=True).first()
+    fieldfile = getattr(instance, field)
+    if old and old != fieldfile.name:
+        fieldfile.storage.delete(old)
+
+
+# ---------- воркер ----------
+
+def requeue_stale():
+    """Вернуть в очередь задачи, зависшие в processing (воркер упал)."""
+    timeout = getattr(settings, "IMAGE_JOB_TIMEOUT", 300)
+    return ImageJob.objects.filter(
+        status=ImageJob.Status.PROCESSING,
+        updated_at__lt=timezone.now() - timedelta(seconds=timeout),
+    ).update(status=ImageJob.Status.PENDING, updated_at=timezone.now())
+
+
+def claim(limit):
+    """
+    Забрать до `limit` задач. Каждая переводится в processing условным
+    UPDATE … WHERE status='pending', так что несколько воркеров не
+    возьмут одну задачу дважды.
+    """
+    claimed = []
+    pending = ImageJob.objects.filter(status=ImageJob.Status.PENDING).order_by("id")
+    for job_id in pending.values_list("id", flat=True)[:limit]:
+        taken = ImageJob.objects.filter(pk=job_id, status=ImageJob.Status.PENDING).update(
+            status=ImageJob.Status.PROCESSING,
+            attempts=F("attempts") + 1,
+            updated_at=timezone.now(),
+        )
+        if taken:
+            claimed.append(job_id)
+    return list(ImageJob.objects.filter(pk__in=claimed).order_by("id"))
+
+
+def _finish(job, status, error=""):
+    job.status, job.error = status, error
+    job.save(update_fields=["status", "error", "updated_at"])
+
+
+def prepare(job):
+    """
+    Объект задачи и байты файла для render() или None, если задача
+    устарела (объект удалён, картинку успели заменить) — тогда она закрыта.
+    """
+    model, field, _ = TARGETS[job.kind]
+    instance = model.objects.filter(pk=job.object_id).first()
+    if instance is None or getattr(instance, field).name != job.source:
+        _finish(job, ImageJob.Status.DONE, "устарела")
+        return None
+    fieldfile = getattr(instance, field)
+    with fieldfile.storage.open(fieldfile.name, "rb") as f:
+        return instance, f.read()
+
+
+def render_args(job):
+    """Аргументы thumbnails.render для задачи (кроме байтов файла)."""
+    return thumbnails.widths_for(job.kind), thumbnails.image_quality()
+
+
+def complete(job, instance, rendered):
+    _, field, variants_field = TARGETS[job.kind]
+    # пока рендерили, картинку могли заменить — тогда результат не нужен
+    current = type(instance).objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+    if current != job.source:
+        _finish(job, ImageJob.Status.DONE, "устарела")
+        return
+    with transaction.atomic():  # старый оригинал удалится после коммита (social/storage.py)
+        thumbnails.apply(
+            instance, field, variants_field, *thumbnails.store(getattr(instance, field), rendered)
+        )
+        _finish(job, ImageJob.Status.DONE)
+    changed(job.kind, job.object_id)
+
+
+def fail(job, instance, exc):
+    """
+    ValueError — файл не картинка: удаляем его. Иначе (в т. ч. файл не
+    прочитался в prepare или результат не записался в complete,
+    instance=None) — повтор до IMAGE_JOB_MAX_ATTEMPTS.
+    """
+    _, field, variants_field = TARGETS[job.kind]
+    if isinstance(exc, ValueError) and instance is not None:
+        with transaction.atomic():
+            thumbnails.discard(instance, field, variants_field)
+            _finish(job, ImageJob.Status.FAILED, str(exc))
+        changed(job.kind, job.object_id)
+    elif job.attempts >= getattr(settings, "IMAGE_JOB_MAX_ATTEMPTS", 3):
+        _finish(job, ImageJob.Status.FAILED, repr(exc))
+    else:
+        _finish(job, ImageJob.Status.PENDING, repr(exc))
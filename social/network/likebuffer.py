@@ -0,0 +1,242 @@
+# network/likebuffer.py
+"""
+Буфер лайков с отложенной записью (write-behind), включается LIKES_WRITE_BEHIND.
+
+Клик по сердечку не пишет в БД, а только запоминает намерение
+«лайк / не лайк» для пары (user, post). Повторные клики по той же паре
+схлопываются, а пара, вернувшаяся в исходное состояние, из буфера
+выпадает. Раз в LIKES_BUFFER_INTERVAL секунд (или при LIKES_BUFFER_MAX
+парах) буфер сбрасывается одной транзакцией: bulk_create лайков,
+одно DELETE на снятые, один UPDATE счётчиков и по событию outbox на пост
+(уведомление автору заводит outbox_worker).
+
+Буфер живёт в памяти процесса: пользователь видит свои клики сразу,
+пока его запросы обслуживает тот же процесс; остальные — после сброса.
+"""
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, Q, Value, When
+
+from outbox import events
+from . import hot, likedset
+from .models import Like, Post
+
+log = logging.getLogger(__name__)
+
+
+def enabled():
+    return getattr(settings, "LIKES_WRITE_BEHIND", False)
+
+
+class LikeBuffer:
+    def __init__(self, max_pending=None, interval=None):
+        self.max_pending = max_pending or getattr(settings, "LIKES_BUFFER_MAX", 500)
+        self.interval = interval or getattr(settings, "LIKES_BUFFER_INTERVAL", 1.0)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}                 # (user_id, post_id) -> (было в БД, хотим)
+        self._flushing = {}                # то же, но уже пишется в БД (до коммита)
+        self._deltas = defaultdict(int)    # post_id -> ожидаемый сдвиг likes_count (с _flushing)
+        self._flushed = 0                  # сколько сбросов закончилось (в т. ч. с ошибкой)
+        self._timer = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    # ----- запись намерений -----
+
+    def toggle(self, user_id, post_id):
+        """
+        Переключает лайк и возвращает (liked, likes_count) так, как их
+        увидит пользователь после сброса буфера.
+        """
+        key = (user_id, post_id)
+        in_db = seen = None
+        while True:
+            with self._lock:
+                # состояние читается и намерение пишется под одним замком: два
+                # быстрых клика по одной паре не прочитают одно и то же
+                state = self._state(key)
+                if state is None and seen == self._flushed:
+                    state = (in_db, in_db)  # пока спрашивали БД, сбросов не было
+                if state is not None:
+                    liked = not state[1]
+                    full = self._record(key, state[0], liked)
+                    break
+                seen = self._flushed
+            # запрос к БД — без замка, чтобы клики остальных его не ждали;
+            # если за это время закончился сброс, ответ мог устареть — спросим снова
+            in_db = Like.objects.filter(user_id=user_id, post_id=post_id).exists()
+        if full:
+            self.flush()
+
+        stored = Post.objects.filter(pk=post_id).values_list("likes_count", flat=True).first() or 0
+        return liked, max(0, stored + self.pending_delta(post_id))
+
+    def _state(self, key):
+        """(база, хотим) для пары или None — в буфере её нет, смотреть в БД. Под замком."""
+        if key in self._pending:
+            return self._pending[key]
+        if key in self._flushing:
+            # пишется прямо сейчас: новый клик считаем от того, что будет в БД
+            desired = self._flushing[key][1]
+            return desired, desired
+        return None
+
+    def _record(self, key, base, desired):
+        """Запомнить намерение (под замком). True — буфер полон, пора сбросить."""
+        post_id = key[1]
+        old = self._pending.pop(key, (base, base))
+        self._deltas[post_id] -= int(old[1]) - int(old[0])
+        if desired != base:
+            self._pending[key] = (base, desired)
+            self._deltas[post_id] += int(desired) - int(base)
+        if not self._deltas[post_id]:
+            del self._deltas[post_id]
+        full = len(self._pending) >= self.max_pending
+        if not full and self._pending and self._timer is None:
+            self._timer = threading.Timer(self.interval, self._flush_in_thread)
+            self._timer.daemon = True
+            self._timer.start()
+        return full
+
+    # ----- чтение с учётом буфера -----
+
+    def pending_delta(self, post_id):
+        with self._lock:
+            return self._deltas.get(post_id, 0)
+
+    def overlay(self, user_id, posts, liked_post_ids):
+        """
+        Накладывает несброшенные клики на страницу: правит p.likes_count
+        и возвращает набор лайкнутых пользователем постов.
+        """
+        liked = set(liked_post_ids)
+        with self._lock:
+            for p in posts:
+                p.likes_count = max(0, p.likes_count + self._deltas.get(p.id, 0))
+                state = self._pending.get((user_id, p.id)) or self._flushing.get((user_id, p.id))
+                if state is None:
+                    continue
+                if state[1]:
+                    liked.add(p.id)
+                else:
+                    liked.discard(p.id)
+        return liked
+
+    # ----- сброс -----
+
+    def _flush_in_thread(self):
+        try:
+            self.flush()
+        except Exception:
+            log.exception("Like buffer flush failed")
+        finally:
+            connection.close()  # у таймерного потока своё соединение
+
+    def flush(self):
+        """
+        Пишет накопленное в БД. Возвращает (создано, удалено). Пока идёт
+        запись, пары лежат в _flushing, а их сдвиги — в _deltas: забываем
+        их только после коммита, а при ошибке возвращаем в буфер.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                pending, self._pending = self._pending, {}
+                self._flushing = pending
+            if not pending:
+                return 0, 0
+            try:
+                result = self._write(pending)
+            except Exception:
+                with self._lock:
+                    self._flushing = {}
+                    self._flushed += 1
+                    for key, (base, desired) in pending.items():
+                        newer = self._pending.pop(key, None)
+                        if newer is not None:
+                            desired = newer[1]  # кликнули ещё раз, пока писали
+                        if desired != base:
+                            self._pending[key] = (base, desired)
+                    # _deltas не трогаем: в них и несохранённое, и новые клики
+                raise
+            with self._lock:
+                self._flushing = {}
+                self._flushed += 1
+                for (_, post_id), (base, desired) in pending.items():
+                    self._deltas[post_id] -= int(desired) - int(base)
+                    if not self._deltas[post_id]:
+                        del self._deltas[post_id]
+            return result
+
+    def _write(self, pending):
+        pairs = list(pending)
+        with transaction.atomic():
+            existing = set(
+                Like.objects.filter(
+                    user_id__in={u for u, _ in pairs}, post_id__in={p for _, p in pairs}
+                ).values_list("user_id", "post_id")
+            )
+            to_create = [k for k, (_, want) in pending.items() if want and k not in existing]
+            to_delete = [k for k, (_, want) in pending.items() if not want and k in existing]
+
+            Like.objects.bulk_create(
+                [Like(user_id=u, post_id=p) for u, p in to_create], ignore_conflicts=True
+            )
+            if to_delete:
+                Like.objects.filter(
+                    reduce(or_, (Q(user_id=u, post_id=p) for u, p in to_delete))
+                ).delete()
+
+            deltas = defaultdict(int)
+            for _, p in to_create:
+                deltas[p] += 1
+            for _, p in to_delete:
+                deltas[p] -= 1
+            deltas = {p: d for p, d in deltas.items() if d}
+            if deltas:
+                Post.objects.filter(pk__in=deltas).update(
+                    likes_count=F("likes_count") + Case(
+                        *[When(pk=p, then=Value(d)) for p, d in deltas.items()],
+                        default=Value(0),
+                    )
+                )
+
+            authors = dict(
+                Post.objects.filter(pk__in={p for _, p in to_create}).values_list("id", "author_id")
+            )
+            # одно событие (и одна склеенная группа уведомлений) на пост, а не на лайк
+            likers = defaultdict(list)
+            for u, p in to_create:
+                if p in authors and authors[p] != u:
+                    likers[p].append(u)
+            for p, users in likers.items():
+                events.record("like", author=authors[p], post=p, actors=users)
+        # bulk_create идёт мимо сигналов Like — массивы лайков перечитаем
+        likedset.forget(u for u, _ in to_create + to_delete)
+        for p in deltas:
+            hot.touch(p)
+        return len(to_create), len(to_delete)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = LikeBuffer()
+            atexit.register(_buffer.flush)
+        return _buffer
@@ -0,0 +1,104 @@
+# network/likedset.py
+"""
+Кэш «какие посты лайкнул пользователь».
+
+Для каждого пользователя в кэше (алиас LIKED_SET_CACHE) лежит
+отсортированный массив id постов array('Q') в байтах — 8 байт на лайк.
+Вопрос «что из этой страницы я лайкнул» — одно чтение из кэша и
+двоичный поиск по каждому id страницы, без запроса к Like.
+
+Массив загружается целиком при первом обращении. Лайк или его снятие
+(сигналы Like, сброс буфера лайков) массив не правит, а выбрасывает —
+сразу и ещё раз после коммита: правка на месте — неатомарное
+чтение-изменение-запись, и при гонке или откате транзакции в кэше
+осталось бы неверное. Следующее чтение загрузит массив из БД. TTL
+(LIKED_SET_TTL) ограничивает расхождение, если кэш локальный для процесса.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import Like
+
+
+def _cache():
+    return caches[getattr(settings, "LIKED_SET_CACHE", "default")]
+
+
+def _key(user_id):
+    return f"liked:q:{user_id}"  # q — формат array('Q'); старые записи ('I') не читаем
+
+
+def _ttl():
+    return getattr(settings, "LIKED_SET_TTL", 300)
+
+
+def _load(user_id):
+    ids = array(
+        "Q",
+        Like.objects.filter(user_id=user_id).order_by("post_id").values_list("post_id", flat=True),
+    )
+    # add, а не set: не затираем массив, который успел поправить соседний запрос
+    _cache().add(_key(user_id), ids.tobytes(), _ttl())
+    return ids
+
+
+def _get(user_id):
+    raw = _cache().get(_key(user_id))
+    if raw is None:
+        return None
+    ids = array("Q")
+    ids.frombytes(raw)
+    return ids
+
+
+def liked_ids(user_id, post_ids):
+    """Подмножество `post_ids`, которое лайкнул пользователь."""
+    post_ids = list(post_ids)
+    if not post_ids:
+        return set()
+    ids = _get(user_id)
+    if ids is None:
+        ids = _load(user_id)
+    found = set()
+    for pid in post_ids:
+        i = bisect_left(ids, pid)
+        if i < len(ids) and ids[i] == pid:
+            found.add(pid)
+    return found
+
+
+def forget(user_ids):
+    """Выбросить массивы пользователей: сразу и после коммита текущей транзакции."""
+    keys = [_key(u) for u in set(user_ids)]
+    if not keys:
+        return
+    cache = _cache()
+    cache.delete_many(keys)
+    # между удалением и коммитом чтение могло загрузить ещё старые лайки
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def for_page(user, posts):
+    """
+    Набор лайкнутых `user` постов из `posts` для отрисовки карточек.
+    С включённым буфером лайков накладывает несброшенные клики
+    (в том числе на p.likes_count).
+    """
+    if not user.is_authenticated:
+        return set()
+    posts = list(posts)
+    liked = liked_ids(user.id, [p.id for p in posts])
+    from . import likebuffer  # likebuffer сам импортирует этот модуль
+
+    if likebuffer.enabled():
+        liked = likebuffer.get_buffer().overlay(user.id, posts, liked)
+    return liked
+
+
+def reset():
+    """Очистить кэш (тесты)."""
+    _cache().clear()
@@ -0,0 +1,62 @@
+import os
+import posixpath
+import time
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from social import storage as media_storage
+
+
+
+def _key(name):
+    """Общий ключ оригинала и его производных файлов."""
+    parsed = media_storage.parse(name)
+    if parsed is not None:
+        directory, h, _ = parsed
+        return posixpath.join(directory, h[:2], h[2:4], h)
+    name = media_storage.VARIANT_RE.sub("", name)
+    return os.path.splitext(name)[0]
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет из MEDIA_ROOT файлы, на которые не ссылается ни одна строка из "
+        "MEDIA_REFERENCES (сироты после замены картинок, сбоев, старых версий)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Только показать.")
+        parser.add_argument(
+            "--min-age", type=int, default=3600,
+            help="Не трогать файлы моложе N секунд (загрузки, которые ещё не записались в БД).",
+        )
+
+    def handle(self, *args, dry_run, min_age, **options):
+        referenced, roots = set(), set()
+        for model, field in media_storage.references():
+            upload_to = model._meta.get_field(field).upload_to
+            if isinstance(upload_to, str) and upload_to:
+                roots.add(upload_to.strip("/"))
+            names = model._default_manager.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+            for name in names.values_list(field, flat=True).iterator():
+                referenced.add(_key(name))
+
+        cutoff = time.time() - min_age
+        found = removed = 0
+        for root in sorted(roots):
+            top = default_storage.path(root)
+            for dirpath, _, filenames in os.walk(top):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    name = os.path.relpath(path, default_storage.path("")).replace(os.sep, "/")
+                    if _key(name) in referenced or os.path.getmtime(path) > cutoff:
+                        continue
+                    found += 1
+                    if dry_run:
+                        self.stdout.write(name)
+                    else:
+                        os.remove(path)
+                        removed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Сирот найдено: {found}, удалено: {removed}"))
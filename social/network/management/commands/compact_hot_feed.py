@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from network import hot
+
+
+class Command(BaseCommand):
+    help = (
+        "Ленту «Горячее» — в порядок: посты старше HOT_FEED_WINDOW_DAYS выбывают из "
+        "кандидатов, оценки остальных пересчитываются по счётчикам. Запускать по cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        expired, recomputed = hot.compact(batch_size=batch_size)
+        self.stdout.write(
+            self.style.SUCCESS(f"Выбыло из кандидатов: {expired}, пересчитано оценок: {recomputed}")
+        )
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from network import imagejobs
+from network.imagejobs import TARGETS
+from social import thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        "Нарезает уменьшенные копии (THUMBNAIL_WIDTHS, JPEG/PNG + WebP) для уже "
+        "загруженных картинок постов и аватаров, у которых их нет или они устарели. "
+        "Синхронно; то, что стоит в очереди image_worker, пропускает."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--only", choices=sorted(TARGETS), help="Только посты или только аватары.")
+        parser.add_argument(
+            "--force", action="store_true", help="Перенарезать всё (например, после смены ширин)."
+        )
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, only, force, batch_size, **options):
+        for kind, (model, field, variants_field) in TARGETS.items():
+            if only and kind != only:
+                continue
+            checked = made = 0
+            qs = model.objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+            for obj in qs.only("pk", field, variants_field).order_by("pk").iterator(chunk_size=batch_size):
+                checked += 1
+                variants = getattr(obj, variants_field)
+                if variants.get("pending") == getattr(obj, field).name:
+                    continue  # ждёт image_worker
+                if force:
+                    setattr(obj, variants_field, {**variants, "src": None})
+                if thumbnails.refresh(obj, field, variants_field, kind):
+                    made += 1
+                    imagejobs.changed(kind, obj.pk)
+            self.stdout.write(self.style.SUCCESS(f"{kind}: проверено {checked}, нарезано {made}"))
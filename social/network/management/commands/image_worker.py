@@ -0,0 +1,93 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from network import imagejobs
+from social import thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        "Обрабатывает очередь картинок (ImageJob): проверка, снятие EXIF, копии для srcset. "
+        "Декодирование и ресайз — в пуле процессов, запись в БД и хранилище — здесь."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=getattr(settings, "IMAGE_WORKER_PROCESSES", 2),
+            help="Процессов в пуле; 0 — обрабатывать в этом же процессе.",
+        )
+        parser.add_argument("--batch-size", type=int, default=20)
+        parser.add_argument("--poll", type=float, default=1.0, help="Пауза при пустой очереди, сек.")
+        parser.add_argument("--once", action="store_true", help="Разобрать очередь и выйти.")
+
+    def handle(self, *args, workers, batch_size, poll, once, **options):
+        pool = None
+        if workers > 0:
+            # spawn: детям не достаются открытые соединения с БД родителя
+            pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        done = failed = 0
+        try:
+            while True:
+                imagejobs.requeue_stale()
+                jobs = imagejobs.claim(batch_size)
+                if not jobs:
+                    if once:
+                        break
+                    time.sleep(poll)
+                    continue
+                for job, instance, result in self._run(pool, jobs):
+                    if isinstance(result, Exception):
+                        imagejobs.fail(job, instance, result)
+                        failed += 1
+                        continue
+                    try:
+                        imagejobs.complete(job, instance, result)
+                    except Exception as exc:
+                        # сбой записи (хранилище, БД) — повтор задачи, а не падение воркера;
+                        # instance=None: файл исправен, удалять его нельзя
+                        imagejobs.fail(job, None, exc)
+                        failed += 1
+                    else:
+                        done += 1
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        self.stdout.write(self.style.SUCCESS(f"Обработано: {done}, с ошибкой: {failed}"))
+
+    def _run(self, pool, jobs):
+        """Пары (задача, объект) → результат render() или исключение."""
+        prepared = []
+        for job in jobs:
+            try:
+                ready = imagejobs.prepare(job)
+            except Exception as exc:
+                # файл пропал или не читается — повтор до IMAGE_JOB_MAX_ATTEMPTS, а не падение воркера
+                yield job, None, exc
+                continue
+            if ready is not None:
+                prepared.append((job, *ready))
+
+        if pool is None:
+            for job, instance, data in prepared:
+                try:
+                    yield job, instance, thumbnails.render(data, *imagejobs.render_args(job))
+                except Exception as exc:
+                    yield job, instance, exc
+            return
+
+        futures = {
+            pool.submit(thumbnails.render, data, *imagejobs.render_args(job)): (job, instance)
+            for job, instance, data in prepared
+        }
+        for future in as_completed(futures):
+            job, instance = futures[future]
+            try:
+                yield job, instance, future.result()
+            except Exception as exc:
+                yield job, instance, exc
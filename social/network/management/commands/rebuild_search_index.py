@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from network import search
+
+
+class Command(BaseCommand):
+    help = "Переиндексирует посты и пользователей в полнотекстовом поиске (FTS5)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        if not search.fts_enabled():
+            self.stdout.write("FTS5 используется только на SQLite — индексировать нечего.")
+            return
+        search.rebuild(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS("Поисковый индекс перестроен."))
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from network.models import Comment, Like, Post
+
+
+def _counted(model):
+    """Подзапрос COUNT(*) по строкам `model`, ссылающимся на пост."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(post=OuterRef("pk"))
+            .order_by()
+            .values("post")
+            .annotate(n=Count("pk"))
+            .values("n")
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает Post.likes_count / Post.comments_count и чинит расхождения (пачками)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Только показать расхождения, ничего не писать."
+        )
+
+    def handle(self, *args, batch_size, dry_run, **options):
+        checked = fixed = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .annotate(real_likes=_counted(Like), real_comments=_counted(Comment))
+                .only("pk", "likes_count", "comments_count")[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            checked += len(batch)
+
+            broken = [
+                p for p in batch
+                if (p.likes_count, p.comments_count) != (p.real_likes, p.real_comments)
+            ]
+            for p in broken:
+                p.likes_count, p.comments_count = p.real_likes, p.real_comments
+            if broken and not dry_run:
+                Post.objects.bulk_update(broken, ["likes_count", "comments_count"])
+            fixed += len(broken)
+
+        verb = "найдено" if dry_run else "исправлено"
+        self.stdout.write(self.style.SUCCESS(f"Проверено постов: {checked}, {verb}: {fixed}"))
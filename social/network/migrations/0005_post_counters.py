@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:08
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model('network', 'Post')
+    Like = apps.get_model('network', 'Like')
+    Comment = apps.get_model('network', 'Comment')
+
+    def counted(model):
+        return Coalesce(Subquery(
+            model.objects.filter(post=OuterRef('pk'))
+            .order_by().values('post').annotate(n=Count('pk')).values('n')
+        ), 0)
+
+    Post.objects.update(likes_count=counted(Like), comments_count=counted(Comment))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0004_post_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, reverse_code=migrations.RunPython.noop),
+    ]
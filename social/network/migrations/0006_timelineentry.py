@@ -0,0 +1,47 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BACKFILL_LIMIT = 200
+
+
+def backfill_timelines(apps, schema_editor):
+    Follow = apps.get_model('accounts', 'Follow')
+    Post = apps.get_model('network', 'Post')
+    TimelineEntry = apps.get_model('network', 'TimelineEntry')
+    for follower_id, author_id in Follow.objects.values_list('follower_id', 'following_id').iterator():
+        posts = Post.objects.filter(author_id=author_id).order_by('-created_at', '-id')[:BACKFILL_LIMIT]
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=follower_id, post_id=p.id, author_id=author_id, created_at=p.created_at)
+             for p in posts],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0005_post_counters'),
+        ('accounts', '0009_seed_all_servicetags_hardening'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='network.post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-created_at', '-post'], name='timeline_read_idx'), models.Index(fields=['user', 'author'], name='timeline_prune_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'post'), name='unique_timeline_entry')],
+            },
+        ),
+        migrations.RunPython(backfill_timelines, reverse_code=migrations.RunPython.noop),
+    ]
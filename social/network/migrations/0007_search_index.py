@@ -0,0 +1,174 @@
+import re
+
+from django.db import migrations
+
+# Замороженная копия стеммера из network/search.py на момент миграции:
+# правки живого кода не должны менять то, что делает старая миграция.
+# Переиндексировать по новым правилам — `manage.py rebuild_search_index`.
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# ---------- стеммер (Snowball Russian, без словарей исключений) ----------
+
+_VOWELS = set("аеиоуыэюя")
+
+_PERFECTIVE_GERUND_1 = ("вшись", "вши", "в")  # после а/я
+_PERFECTIVE_GERUND_2 = ("ывшись", "ившись", "ывши", "ивши", "ыв", "ив")
+_REFLEXIVE = ("ся", "сь")
+_ADJECTIVE = (
+    "ими", "ыми", "его", "ого", "ему", "ому",
+    "ее", "ие", "ые", "ое", "ей", "ий", "ый", "ой", "ем", "им", "ым", "ом",
+    "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+)
+_PARTICIPLE_1 = ("ем", "нн", "вш", "ющ", "щ")  # после а/я
+_PARTICIPLE_2 = ("ивш", "ывш", "ующ")
+_VERB_1 = (  # после а/я
+    "ете", "йте", "ешь", "нно",
+    "ла", "на", "ли", "ем", "ло", "но", "ет", "ют", "ны", "ть", "й", "л", "н",
+)
+_VERB_2 = (
+    "ейте", "уйте", "ила", "ыла", "ена", "ите", "или", "ыли", "ило", "ыло", "ено",
+    "ует", "уют", "ены", "ить", "ыть", "ишь",
+    "ей", "уй", "ил", "ыл", "им", "ым", "ен", "ят", "ит", "ыт", "ую", "ю",
+)
+_NOUN = (
+    "иями", "ями", "ами", "ией", "иям", "ием", "иях",
+    "ев", "ов", "ие", "ье", "еи", "ии", "ей", "ой", "ий", "ям", "ем", "ам", "ом",
+    "ах", "ях", "ию", "ью", "ия", "ья",
+    "а", "е", "и", "й", "о", "у", "ы", "ь", "ю", "я",
+)
+_SUPERLATIVE = ("ейше", "ейш")
+_DERIVATIONAL = ("ость", "ост")
+
+
+def _regions(word):
+    """Начала областей RV и R2 (по правилам Snowball)."""
+    rv = next((i + 1 for i, ch in enumerate(word) if ch in _VOWELS), len(word))
+
+    def after_vc(start):
+        for i in range(start + 1, len(word)):
+            if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = after_vc(0)
+    return rv, after_vc(r1)
+
+
+def _strip(rv, endings, preceded=False):
+    """Отрезает самое длинное подходящее окончание в области RV (или None)."""
+    for ending in endings:  # списки упорядочены от длинных к коротким
+        if rv.endswith(ending):
+            stem = rv[: -len(ending)]
+            if preceded and not stem.endswith(("а", "я")):
+                continue
+            return stem
+    return None
+
+
+def _strip_any(rv, group1, group2):
+    stem = _strip(rv, group2)
+    if stem is None:
+        stem = _strip(rv, group1, preceded=True)
+    return stem
+
+
+def stem(word):
+    word = word.lower().replace("ё", "е")
+    if not any(ch in _VOWELS for ch in word):
+        return word  # латиница, цифры, ники — как есть
+    rv_start, r2_start = _regions(word)
+    head, rv = word[:rv_start], word[rv_start:]
+
+    # шаг 1
+    stemmed = _strip_any(rv, _PERFECTIVE_GERUND_1, _PERFECTIVE_GERUND_2)
+    if stemmed is None:
+        if rv.endswith(_REFLEXIVE):
+            rv = rv[:-2]
+        stemmed = _strip(rv, _ADJECTIVE)
+        if stemmed is not None:
+            stemmed = _strip_any(stemmed, _PARTICIPLE_1, _PARTICIPLE_2) or stemmed
+        else:
+            stemmed = _strip_any(rv, _VERB_1, _VERB_2)
+            if stemmed is None:
+                stemmed = _strip(rv, _NOUN)
+        if stemmed is None:
+            stemmed = rv
+    rv = stemmed
+
+    # шаг 2
+    if rv.endswith("и"):
+        rv = rv[:-1]
+
+    # шаг 3: словообразовательный суффикс — только в R2
+    r2 = (head + rv)[r2_start:]
+    for ending in _DERIVATIONAL:
+        if r2.endswith(ending):
+            rv = rv[: -len(ending)]
+            break
+
+    # шаг 4
+    if rv.endswith("нн"):
+        rv = rv[:-1]
+    else:
+        superlative = _strip(rv, _SUPERLATIVE)
+        if superlative is not None:
+            rv = superlative[:-1] if superlative.endswith("нн") else superlative
+        elif rv.endswith("ь"):
+            rv = rv[:-1]
+    return head + rv
+
+
+def normalize(text):
+    """Текст → строка основ слов через пробел (то, что кладём в FTS)."""
+    return " ".join(stem(w) for w in _WORD_RE.findall(text or ""))
+
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS network_post_fts USING fts5("
+    "body, author, tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS network_user_fts USING fts5("
+    "username, name, city, tokenize = 'unicode61 remove_diacritics 2')",
+]
+
+
+def create_fts(apps, schema_editor):
+    # FTS5 есть только у SQLite; на других СУБД поиск работает через icontains
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+    User = apps.get_model('accounts', 'User')
+    Post = apps.get_model('network', 'Post')
+    with schema_editor.connection.cursor() as cursor:
+        usernames = {}
+        for u in User.objects.order_by('pk').iterator():
+            usernames[u.pk] = normalize(u.username)
+            cursor.execute(
+                "INSERT INTO network_user_fts (rowid, username, name, city) VALUES (%s, %s, %s, %s)",
+                [u.pk, usernames[u.pk], normalize(f"{u.first_name} {u.last_name}"), normalize(u.city)],
+            )
+        for p in Post.objects.order_by('pk').iterator():
+            cursor.execute(
+                "INSERT INTO network_post_fts (rowid, body, author) VALUES (%s, %s, %s)",
+                [p.pk, normalize(p.text), usernames.get(p.author_id, '')],
+            )
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS network_post_fts")
+    schema_editor.execute("DROP TABLE IF EXISTS network_user_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0006_timelineentry'),
+        ('accounts', '0010_user_followers_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, reverse_code=drop_fts),
+    ]
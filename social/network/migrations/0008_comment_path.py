@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+PATH_STEP = 10
+
+
+def backfill_paths(apps, schema_editor):
+    Comment = apps.get_model('network', 'Comment')
+    rows = list(Comment.objects.values_list('pk', 'parent_id'))
+    children = {}
+    for pk, parent_id in rows:
+        children.setdefault(parent_id, []).append(pk)
+
+    paths = {}
+    level = [(pk, '') for pk in sorted(children.get(None, []))]
+    while level:
+        next_level = []
+        for pk, parent_path in level:
+            paths[pk] = parent_path + str(pk).zfill(PATH_STEP)
+            next_level.extend((child, paths[pk]) for child in sorted(children.get(pk, [])))
+        level = next_level
+
+    batch = []
+    for pk, path in paths.items():
+        batch.append(Comment(pk=pk, path=path, depth=len(path) // PATH_STEP - 1))
+    Comment.objects.bulk_update(batch, ['path', 'depth'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0007_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=1024),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='comment_tree_idx'),
+        ),
+        migrations.RunPython(backfill_paths, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:17
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_replies_count(apps, schema_editor):
+    Comment = apps.get_model('network', 'Comment')
+    counted = Subquery(
+        Comment.objects.filter(parent=OuterRef('pk'))
+        .order_by().values('parent').annotate(n=Count('pk')).values('n')
+    )
+    Comment.objects.update(replies_count=Coalesce(counted, 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0008_comment_path'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='replies_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'parent', 'path'], name='comment_children_idx'),
+        ),
+        migrations.RunPython(backfill_replies_count, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:25
+
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# Замороженная копия формулы из network/hot.py на момент миграции;
+# пересчитать по текущей — `manage.py compact_hot_feed`.
+def window_start():
+    return timezone.now() - timedelta(days=getattr(settings, "HOT_FEED_WINDOW_DAYS", 7))
+
+
+def score(likes, comments, created_at):
+    engagement = likes + getattr(settings, "HOT_COMMENT_WEIGHT", 2) * comments
+    return math.log10(max(engagement, 1)) + created_at.timestamp() / getattr(
+        settings, "HOT_SCORE_TIME_SCALE", 45000
+    )
+
+
+def backfill_hot_scores(apps, schema_editor):
+    Post = apps.get_model('network', 'Post')
+    posts = list(
+        Post.objects.filter(created_at__gte=window_start())
+        .only('pk', 'likes_count', 'comments_count', 'created_at')
+    )
+    for p in posts:
+        p.hot_score = score(p.likes_count, p.comments_count, p.created_at)
+    Post.objects.bulk_update(posts, ['hot_score'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0009_comment_replies_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='hot_score',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('hot_score__isnull', False)), fields=['-hot_score', '-id'], name='post_hot_idx'),
+        ),
+        migrations.RunPython(backfill_hot_scores, reverse_code=migrations.RunPython.noop),
+    ]
@@ -1,21 +1,44 @@
 from django.db import models
 from django.conf import settings
 
+from social.thumbnails import ResponsiveImage
+
 class Post(models.Model):
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='posts')
     text = models.CharField(max_length=1000)
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    # уменьшенные копии image для srcset (social/thumbnails.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # денормализованные счётчики: меняются F-выражениями во views,
+    # чинятся командой `manage.py recount_post_counters`
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    # оценка для ленты «Горячее» (network/hot.py); NULL — пост вне окна кандидатов
+    hot_score = models.FloatField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # keyset-пагинация ленты: (created_at, id) по убыванию
+            models.Index(fields=['-created_at', '-id'], name='post_feed_idx'),
+            models.Index(fields=['author', '-created_at', '-id'], name='post_author_feed_idx'),
+            # частичный: в нём только кандидаты «Горячего», размер не растёт с числом постов
+            models.Index(
+                fields=['-hot_score', '-id'],
+                name='post_hot_idx',
+                condition=models.Q(hot_score__isnull=False),
+            ),
+        ]
+
+    image_responsive = ResponsiveImage('image', 'image_variants')
 
     def __str__(self):
         return f"{self.author.username}: {self.text[:30]}"
 
     @property
-    def likes_count(self):
-        return self.likes.count()
+    def image_thumb(self):
+        return self.image_responsive.thumb if self.image else ""
 
 
 class Like(models.Model):
@@ -32,19 +55,109 @@ class Like(models.Model):
 
 
 class Comment(models.Model):
+    """
+    Комментарий или ответ любой вложенности.
+    path — материализованный путь: id всех предков и свой id, каждый
+    дополнен нулями до PATH_STEP знаков. Сортировка по path даёт обход
+    дерева в глубину, поэтому всё дерево поста читается одним запросом.
+    В path (max_length 1024) помещается MAX_DEPTH + 1 уровней; ответ
+    глубже add_reply вешает на предка — рядом с комментарием, а не под ним.
+    """
+    PATH_STEP = 10
+    MAX_DEPTH = 1024 // PATH_STEP - 1
+
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='comments')
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     parent = models.ForeignKey('self', on_delete=models.CASCADE, related_name='replies',
                                null=True, blank=True)  # ← новое поле
     text = models.CharField(max_length=500)
     created_at = models.DateTimeField(auto_now_add=True)
+    path = models.CharField(max_length=1024, blank=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    # прямых ответов на этот комментарий (для «Показать ещё N ответов»)
+    replies_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['created_at']  # старые сверху
+        indexes = [
+            models.Index(fields=['post', 'path'], name='comment_tree_idx'),
+            models.Index(fields=['post', 'parent', 'path'], name='comment_children_idx'),
+        ]
 
     def __str__(self):
         return f"c#{self.id} by {self.author} on p#{self.post_id}"
 
+    def save(self, *args, **kwargs):
+        creating = self._state.adding
+        super().save(*args, **kwargs)
+        if creating and not self.path:
+            # id известен только после INSERT — путь дописываем вторым UPDATE
+            parent_path = self.parent.path if self.parent_id else ""
+            self.path = parent_path + str(self.pk).zfill(self.PATH_STEP)
+            self.depth = len(self.path) // self.PATH_STEP - 1
+            Comment.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+
+    def subtree(self):
+        """Сам комментарий и все его ответы (диапазон по индексу (post, path))."""
+        return Comment.objects.filter(post_id=self.post_id, path__startswith=self.path)
+
     @property
     def is_reply(self):
         return self.parent_id is not None
+
+
+class TimelineEntry(models.Model):
+    """
+    Материализованная лента «Подписки» (fan-out on write):
+    строка = пост автора, на которого подписан user.
+    Заполняется сигналами (см. network/signals.py), читается одним
+    диапазонным проходом по индексу (user, created_at, post).
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='timeline')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField()  # копия post.created_at — ключ сортировки
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-post'], name='timeline_read_idx'),
+            models.Index(fields=['user', 'author'], name='timeline_prune_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} <- p#{self.post_id}"
+
+
+class ImageJob(models.Model):
+    """
+    Задача на обработку загруженной картинки (проверка, снятие EXIF,
+    копии для srcset) — очередь в БД для `manage.py image_worker`.
+    kind — ключ network.imagejobs.TARGETS ('posts', 'avatars'),
+    source — имя файла на момент постановки: если картинку успели
+    заменить, задача устарела.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        PROCESSING = 'processing', 'Обрабатывается'
+        DONE = 'done', 'Готово'
+        FAILED = 'failed', 'Ошибка'
+
+    kind = models.CharField(max_length=20)
+    object_id = models.PositiveIntegerField()
+    source = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='imagejob_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}#{self.object_id} [{self.status}]"
@@ -0,0 +1,75 @@
+# network/pagination.py
+"""
+Keyset-пагинация (курсор по паре (created_at, id)).
+
+В отличие от OFFSET, стоимость страницы не зависит от того, насколько
+далеко пользователь пролистал ленту: каждая страница — это диапазонный
+проход по индексу (created_at DESC, id DESC) начиная с курсора.
+"""
+import base64
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+
+
+def get_page_size(request=None, default=None):
+    """Размер страницы ленты: ?limit=… (с ограничением сверху) или FEED_PAGE_SIZE."""
+    size = default or getattr(settings, "FEED_PAGE_SIZE", 20)
+    max_size = getattr(settings, "FEED_MAX_PAGE_SIZE", 100)
+    if request is not None:
+        try:
+            size = int(request.GET.get("limit") or size)
+        except (TypeError, ValueError):
+            pass
+    return max(1, min(size, max_size))
+
+
+def encode_cursor(created_at, pk):
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Возвращает (created_at, pk) или None, если курсор пустой/битый.
+    Битый курсор трактуем как «с начала», а не как ошибку.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, pk = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(ts), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def after_cursor(qs, position, time_field="created_at", pk_field="id"):
+    """
+    Строки `qs` строго «после» позиции (created_at, pk) в порядке убывания,
+    уже отсортированные по (time_field, pk_field) DESC.
+    """
+    if position is not None:
+        ts, pk = position
+        qs = qs.filter(
+            Q(**{f"{time_field}__lt": ts})
+            | Q(**{time_field: ts, f"{pk_field}__lt": pk})
+        )
+    return qs.order_by(f"-{time_field}", f"-{pk_field}")
+
+
+def keyset_page(qs, cursor, size, time_field="created_at", pk_field="id"):
+    """
+    Одна страница `qs` по убыванию (time_field, pk_field), начиная после `cursor`.
+    Возвращает (items, next_cursor); next_cursor=None — дальше ничего нет.
+    """
+    qs = after_cursor(qs, decode_cursor(cursor), time_field, pk_field)
+    # берём на одну запись больше — так узнаём, есть ли следующая страница
+    items = list(qs[: size + 1])
+    next_cursor = None
+    if len(items) > size:
+        items = items[:size]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, time_field), getattr(last, pk_field))
+    return items, next_cursor
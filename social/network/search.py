@@ -0,0 +1,267 @@
+# network/search.py
+"""
+Полнотекстовый поиск по постам и пользователям.
+
+На SQLite — виртуальные таблицы FTS5 (создаются миграцией
+0007_search_index, синхронизируются сигналами), ранжирование bm25 и
+префиксные запросы. В индекс кладём не исходный текст, а основы слов
+(облегчённый русский стеммер Snowball ниже), поэтому «веники» находит
+«веник» и «веником». На других СУБД — прежний поиск через icontains.
+"""
+import re
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models import Q
+
+from accounts.models import User
+from .models import Post
+
+POST_TABLE = "network_post_fts"
+USER_TABLE = "network_user_fts"
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# ---------- стеммер (Snowball Russian, без словарей исключений) ----------
+
+_VOWELS = set("аеиоуыэюя")
+
+_PERFECTIVE_GERUND_1 = ("вшись", "вши", "в")  # после а/я
+_PERFECTIVE_GERUND_2 = ("ывшись", "ившись", "ывши", "ивши", "ыв", "ив")
+_REFLEXIVE = ("ся", "сь")
+_ADJECTIVE = (
+    "ими", "ыми", "его", "ого", "ему", "ому",
+    "ее", "ие", "ые", "ое", "ей", "ий", "ый", "ой", "ем", "им", "ым", "ом",
+    "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+)
+_PARTICIPLE_1 = ("ем", "нн", "вш", "ющ", "щ")  # после а/я
+_PARTICIPLE_2 = ("ивш", "ывш", "ующ")
+_VERB_1 = (  # после а/я
+    "ете", "йте", "ешь", "нно",
+    "ла", "на", "ли", "ем", "ло", "но", "ет", "ют", "ны", "ть", "й", "л", "н",
+)
+_VERB_2 = (
+    "ейте", "уйте", "ила", "ыла", "ена", "ите", "или", "ыли", "ило", "ыло", "ено",
+    "ует", "уют", "ены", "ить", "ыть", "ишь",
+    "ей", "уй", "ил", "ыл", "им", "ым", "ен", "ят", "ит", "ыт", "ую", "ю",
+)
+_NOUN = (
+    "иями", "ями", "ами", "ией", "иям", "ием", "иях",
+    "ев", "ов", "ие", "ье", "еи", "ии", "ей", "ой", "ий", "ям", "ем", "ам", "ом",
+    "ах", "ях", "ию", "ью", "ия", "ья",
+    "а", "е", "и", "й", "о", "у", "ы", "ь", "ю", "я",
+)
+_SUPERLATIVE = ("ейше", "ейш")
+_DERIVATIONAL = ("ость", "ост")
+
+
+def _regions(word):
+    """Начала областей RV и R2 (по правилам Snowball)."""
+    rv = next((i + 1 for i, ch in enumerate(word) if ch in _VOWELS), len(word))
+
+    def after_vc(start):
+        for i in range(start + 1, len(word)):
+            if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = after_vc(0)
+    return rv, after_vc(r1)
+
+
+def _strip(rv, endings, preceded=False):
+    """Отрезает самое длинное подходящее окончание в области RV (или None)."""
+    for ending in endings:  # списки упорядочены от длинных к коротким
+        if rv.endswith(ending):
+            stem = rv[: -len(ending)]
+            if preceded and not stem.endswith(("а", "я")):
+                continue
+            return stem
+    return None
+
+
+def _strip_any(rv, group1, group2):
+    stem = _strip(rv, group2)
+    if stem is None:
+        stem = _strip(rv, group1, preceded=True)
+    return stem
+
+
+def stem(word):
+    word = word.lower().replace("ё", "е")
+    if not any(ch in _VOWELS for ch in word):
+        return word  # латиница, цифры, ники — как есть
+    rv_start, r2_start = _regions(word)
+    head, rv = word[:rv_start], word[rv_start:]
+
+    # шаг 1
+    stemmed = _strip_any(rv, _PERFECTIVE_GERUND_1, _PERFECTIVE_GERUND_2)
+    if stemmed is None:
+        if rv.endswith(_REFLEXIVE):
+            rv = rv[:-2]
+        stemmed = _strip(rv, _ADJECTIVE)
+        if stemmed is not None:
+            stemmed = _strip_any(stemmed, _PARTICIPLE_1, _PARTICIPLE_2) or stemmed
+        else:
+            stemmed = _strip_any(rv, _VERB_1, _VERB_2)
+            if stemmed is None:
+                stemmed = _strip(rv, _NOUN)
+        if stemmed is None:
+            stemmed = rv
+    rv = stemmed
+
+    # шаг 2
+    if rv.endswith("и"):
+        rv = rv[:-1]
+
+    # шаг 3: словообразовательный суффикс — только в R2
+    r2 = (head + rv)[r2_start:]
+    for ending in _DERIVATIONAL:
+        if r2.endswith(ending):
+            rv = rv[: -len(ending)]
+            break
+
+    # шаг 4
+    if rv.endswith("нн"):
+        rv = rv[:-1]
+    else:
+        superlative = _strip(rv, _SUPERLATIVE)
+        if superlative is not None:
+            rv = superlative[:-1] if superlative.endswith("нн") else superlative
+        elif rv.endswith("ь"):
+            rv = rv[:-1]
+    return head + rv
+
+
+def normalize(text):
+    """Текст → строка основ слов через пробел (то, что кладём в FTS)."""
+    return " ".join(stem(w) for w in _WORD_RE.findall(text or ""))
+
+
+def match_expression(q):
+    """Запрос пользователя → MATCH-выражение FTS5: все основы, каждая как префикс."""
+    stems = [stem(w) for w in _WORD_RE.findall(q)]
+    return " ".join(f'"{s}"*' for s in stems if s)
+
+
+# ---------- индекс ----------
+
+def fts_enabled():
+    return connection.vendor == "sqlite"
+
+
+def _execute(sql, params=()):
+    if not fts_enabled():
+        return
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+    except DatabaseError:
+        # FTS5 не собран в этой сборке SQLite / таблицы ещё нет — поиск уйдёт в fallback
+        pass
+
+
+def index_post(post, author_username=None):
+    username = author_username or post.author.username
+    _execute(f"DELETE FROM {POST_TABLE} WHERE rowid = %s", [post.pk])
+    _execute(
+        f"INSERT INTO {POST_TABLE} (rowid, body, author) VALUES (%s, %s, %s)",
+        [post.pk, normalize(post.text), normalize(username)],
+    )
+
+
+def unindex_post(post_id):
+    _execute(f"DELETE FROM {POST_TABLE} WHERE rowid = %s", [post_id])
+
+
+def index_user(user):
+    _execute(f"DELETE FROM {USER_TABLE} WHERE rowid = %s", [user.pk])
+    _execute(
+        f"INSERT INTO {USER_TABLE} (rowid, username, name, city) VALUES (%s, %s, %s, %s)",
+        [
+            user.pk,
+            normalize(user.username),
+            normalize(f"{user.first_name} {user.last_name}"),
+            normalize(user.city),
+        ],
+    )
+    # ник автора проиндексирован и в его постах
+    _execute(
+        f"UPDATE {POST_TABLE} SET author = %s WHERE rowid IN "
+        f"(SELECT id FROM {Post._meta.db_table} WHERE author_id = %s)",
+        [normalize(user.username), user.pk],
+    )
+
+
+def unindex_user(user_id):
+    _execute(f"DELETE FROM {USER_TABLE} WHERE rowid = %s", [user_id])
+
+
+def rebuild(batch_size=1000):
+    """Полная переиндексация (команда rebuild_search_index и миграция)."""
+    _execute(f"DELETE FROM {POST_TABLE}")
+    _execute(f"DELETE FROM {USER_TABLE}")
+    for user in User.objects.order_by("pk").iterator(chunk_size=batch_size):
+        index_user(user)
+    posts = Post.objects.select_related("author").order_by("pk")
+    for post in posts.iterator(chunk_size=batch_size):
+        index_post(post)
+
+
+# ---------- запросы ----------
+
+def _ranked_ids(table, q, offset, limit):
+    expr = match_expression(q)
+    if not expr:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {table} WHERE {table} MATCH %s "
+            f"ORDER BY bm25({table}), rowid DESC LIMIT %s OFFSET %s",
+            [expr, limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _in_order(qs, ids):
+    by_id = qs.in_bulk(ids)
+    return [by_id[i] for i in ids if i in by_id]
+
+
+def search_posts(q, offset=0, limit=20):
+    """Посты по релевантности. Возвращает (posts, has_next)."""
+    if fts_enabled():
+        try:
+            ids = _ranked_ids(POST_TABLE, q, offset, limit + 1)
+            return _in_order(Post.objects.select_related("author"), ids[:limit]), len(ids) > limit
+        except DatabaseError:
+            pass
+    posts = list(
+        Post.objects.filter(Q(text__icontains=q) | Q(author__username__icontains=q))
+        .select_related("author")
+        .order_by("-created_at", "-id")[offset: offset + limit + 1]
+    )
+    return posts[:limit], len(posts) > limit
+
+
+def search_users(q, offset=0, limit=20):
+    """Пользователи по релевантности. Возвращает (users, has_next)."""
+    if fts_enabled():
+        try:
+            ids = _ranked_ids(USER_TABLE, q, offset, limit + 1)
+            return _in_order(User.objects.all(), ids[:limit]), len(ids) > limit
+        except DatabaseError:
+            pass
+    users = list(
+        User.objects.filter(
+            Q(username__icontains=q)
+            | Q(first_name__icontains=q)
+            | Q(last_name__icontains=q)
+            | Q(city__icontains=q)
+        ).order_by("username")[offset: offset + limit + 1]
+    )
+    return users[:limit], len(users) > limit
+
+
+def page_size():
+    return getattr(settings, "SEARCH_PAGE_SIZE", 20)
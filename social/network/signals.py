@@ -0,0 +1,73 @@
+# network/signals.py
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from accounts.models import Follow, User
+from . import fragments, hot, imagejobs, likedset, search, timeline
+from .models import Comment, Like, Post
+
+# поля пользователя, которые попадают в поисковый индекс
+USER_SEARCH_FIELDS = {"username", "first_name", "last_name", "city"}
+
+
+@receiver(pre_save, sender=Post)
+def post_image_replaced(sender, instance, update_fields=None, **kwargs):
+    imagejobs.release_replaced(instance, "posts", update_fields)
+
+
+@receiver(post_save, sender=Post)
+def post_fan_out(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out(instance)
+        hot.post_created(instance)
+    search.index_post(instance)
+    # новая/заменённая картинка — в очередь на обработку (network/imagejobs.py)
+    imagejobs.schedule(instance, "posts")
+    fragments.bump("post", instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_unindex(sender, instance, **kwargs):
+    # TimelineEntry удаляются каскадом по FK, FTS-таблица — вручную
+    search.unindex_post(instance.pk)
+    hot.post_removed(instance.pk)
+    imagejobs.release(instance, "posts")
+
+
+@receiver(post_save, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    fragments.bump("comment", instance.pk)
+
+
+@receiver(post_save, sender=User)
+def user_index(sender, instance, update_fields=None, **kwargs):
+    # save(update_fields=["last_login"]) при входе индекс не трогает
+    if update_fields is None or USER_SEARCH_FIELDS & set(update_fields):
+        search.index_user(instance)
+
+
+@receiver(post_delete, sender=User)
+def user_unindex(sender, instance, **kwargs):
+    search.unindex_user(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def follow_backfill(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance.follower_id, instance.following_id)
+
+
+@receiver(post_delete, sender=Follow)
+def unfollow_prune(sender, instance, **kwargs):
+    timeline.prune(instance.follower_id, instance.following_id)
+
+
+@receiver(post_save, sender=Like)
+def like_cached(sender, instance, created, **kwargs):
+    if created:
+        likedset.forget([instance.user_id])
+
+
+@receiver(post_delete, sender=Like)
+def unlike_cached(sender, instance, **kwargs):
+    likedset.forget([instance.user_id])
@@ -0,0 +1,40 @@
+# network/templatetags/fragment_cache.py
+from django import template
+
+from network import fragments
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, kind, obj, vary):
+        self.nodelist = nodelist
+        self.kind = kind
+        self.obj = obj
+        self.vary = vary
+
+    def render(self, context):
+        return fragments.cached(
+            self.kind.resolve(context),
+            self.obj.resolve(context),
+            [v.resolve(context) for v in self.vary],
+            lambda: self.nodelist.render(context),
+        )
+
+
+@register.tag
+def fragment(parser, token):
+    """
+    {% fragment "post" p p.author.username %} … {% endfragment %}
+
+    Кэширует содержимое по версии объекта (network/fragments.py); значения
+    после объекта тоже входят в ключ. Внутри — только то, что одинаково
+    для всех зрителей.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' ожидает вид и объект")
+    nodelist = parser.parse(("endfragment",))
+    parser.delete_first_token()
+    kind, obj, *vary = (parser.compile_filter(b) for b in bits[1:])
+    return FragmentNode(nodelist, kind, obj, vary)
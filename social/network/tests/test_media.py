@@ -0,0 +1,99 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+
+
+def staff_only(request, name):
+    return request.user.is_staff
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.root, MEDIA_PRIVATE_PREFIXES=("private/",))
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.data = bytes(range(256)) * 4
+        h = hashlib.sha256(self.data).hexdigest()
+        self.hashed = f"posts/{h[:2]}/{h[2:4]}/{h}.jpg"
+        self.h = h
+        self.derived = f"posts/{h[:2]}/{h[2:4]}/{h}.w320.webp"
+        for name in (self.hashed, self.derived, "avatars/old.jpg", "private/doc.pdf"):
+            path = os.path.join(self.root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(self.data)
+
+    def test_full_and_conditional(self):
+        resp = self.client.get(f"/media/{self.hashed}")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(b"".join(resp.streaming_content), self.data)
+        self.assertEqual(resp["ETag"], f'"{self.h}"')
+        self.assertIn("immutable", resp["Cache-Control"])
+        self.assertEqual(resp["Content-Type"], "image/jpeg")
+
+        resp = self.client.get(f"/media/{self.hashed}", HTTP_IF_NONE_MATCH=f'"{self.h}"')
+        self.assertEqual(resp.status_code, 304)
+
+        # копия для srcset перезаписывается на месте (--force, смена качества)
+        derived = self.client.get(f"/media/{self.derived}")
+        self.assertNotIn("immutable", derived["Cache-Control"])
+        self.assertNotEqual(derived["ETag"], f'"{self.h}"')
+
+        legacy = self.client.get("/media/avatars/old.jpg")
+        self.assertNotIn("immutable", legacy["Cache-Control"])
+        resp = self.client.get(
+            "/media/avatars/old.jpg", HTTP_IF_MODIFIED_SINCE=legacy["Last-Modified"]
+        )
+        self.assertEqual(resp.status_code, 304)
+
+    def test_range_requests(self):
+        resp = self.client.get(f"/media/{self.hashed}", HTTP_RANGE="bytes=10-19")
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(b"".join(resp.streaming_content), self.data[10:20])
+        self.assertEqual(resp["Content-Range"], f"bytes 10-19/{len(self.data)}")
+
+        resp = self.client.get(f"/media/{self.hashed}", HTTP_RANGE="bytes=-5")
+        self.assertEqual(b"".join(resp.streaming_content), self.data[-5:])
+
+        resp = self.client.get(f"/media/{self.hashed}", HTTP_RANGE="bytes=5000-")
+        self.assertEqual(resp.status_code, 416)
+
+        # файл сменился (чужой ETag в If-Range) — отдаём целиком
+        resp = self.client.get(f"/media/{self.hashed}", HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"old"')
+        self.assertEqual(resp.status_code, 200)
+
+    @override_settings(MEDIA_SENDFILE="x-accel")
+    def test_accel_redirect(self):
+        resp = self.client.get(f"/media/{self.hashed}")
+        self.assertEqual(resp["X-Accel-Redirect"], f"/protected-media/{self.hashed}")
+        self.assertEqual(resp.content, b"")
+
+        # старая загрузка с кириллицей и пробелом: заголовок в %XX
+        name = "avatars/фото профиля.jpg"
+        with open(os.path.join(self.root, name), "wb") as f:
+            f.write(self.data)
+        encoded = "avatars/%D1%84%D0%BE%D1%82%D0%BE%20%D0%BF%D1%80%D0%BE%D1%84%D0%B8%D0%BB%D1%8F.jpg"
+        resp = self.client.get(f"/media/{name}")
+        self.assertEqual(resp["X-Accel-Redirect"], f"/protected-media/{encoded}")
+        with self.settings(MEDIA_SENDFILE="x-sendfile"):
+            resp = self.client.get(f"/media/{name}")
+        self.assertTrue(resp["X-Sendfile"].endswith(f"/{encoded}"))
+
+    def test_private_media_and_traversal(self):
+        self.assertEqual(self.client.get("/media/private/doc.pdf").status_code, 404)
+        self.assertEqual(self.client.get("/media/../settings.py").status_code, 404)
+
+        from accounts.models import User
+
+        User.objects.create_user("boss", password="pass123", is_staff=True)
+        self.client.login(username="boss", password="pass123")
+        with override_settings(MEDIA_ACCESS_HOOK="network.tests.test_media.staff_only"):
+            resp = self.client.get("/media/private/doc.pdf")
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp["Cache-Control"].startswith("private"))
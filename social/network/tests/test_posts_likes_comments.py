@@ -1,7 +1,10 @@
 import io
 import tempfile
 import shutil
+from unittest import mock
+from django.db import connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -22,6 +25,14 @@ def tiny_png():
     )
 
 
+def jpeg(width, height, exif=None):
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 120, 40)).save(buf, "JPEG", exif=exif or b"")
+    return buf.getvalue()
+
+
 @override_settings(MEDIA_ROOT=tempfile.gettempdir())
 class PostLikeCommentTests(TestCase):
     @classmethod
@@ -30,6 +41,10 @@ class PostLikeCommentTests(TestCase):
         cls.u2 = User.objects.create_user(username="bob", password="pass123")
 
     def setUp(self):
+        from network import hot, likedset
+
+        likedset.reset()  # id пользователей живут дольше отката транзакции теста
+        hot.reset()
         self.client.login(username="alice", password="pass123")
 
     def test_create_post_with_image(self):
@@ -85,3 +100,587 @@ class PostLikeCommentTests(TestCase):
         )
         self.assertEqual(resp.status_code, 200)
         self.assertTrue(Comment.objects.filter(post=p, parent=c, text="answer").exists())
+
+        # на пределе глубины ответ встаёт рядом, а не под комментарием
+        deepest = c
+        for i in range(Comment.MAX_DEPTH):
+            deepest = Comment.objects.create(author=self.u2, post=p, parent=deepest, text=f"d{i}")
+        self.assertEqual(deepest.depth, Comment.MAX_DEPTH)
+        self.client.post(reverse("add_reply", args=[deepest.pk]), {"text": "too deep"})
+        reply = Comment.objects.get(text="too deep")
+        self.assertEqual((reply.parent_id, reply.depth), (deepest.parent_id, Comment.MAX_DEPTH))
+
+    @override_settings(FEED_PAGE_SIZE=2)
+    def test_home_feed_keyset_pagination(self):
+        for i in range(5):
+            Post.objects.create(author=self.u2, text=f"post {i}")
+        resp = self.client.get(reverse("home"))
+        self.assertEqual([p.text for p in resp.context["posts"]], ["post 4", "post 3"])
+        cursor = resp.context["next_cursor"]
+        self.assertTrue(cursor)
+
+        seen = []
+        while cursor:
+            resp = self.client.get(reverse("feed_more"), {"cursor": cursor})
+            self.assertEqual(resp.status_code, 200)
+            data = resp.json()
+            for i in range(5):
+                if f"post {i}</p>" in data["rendered_html"]:
+                    seen.append(i)
+            cursor = data["next_cursor"]
+        self.assertEqual(sorted(seen), [0, 1, 2])
+
+    @override_settings(FEED_PAGE_SIZE=1)
+    def test_feed_more_subscriptions(self):
+        Post.objects.create(author=self.u2, text="bob old")
+        Post.objects.create(author=self.u1, text="own post")
+        Post.objects.create(author=self.u2, text="bob new")
+        Follow.objects.create(follower=self.u1, following=self.u2)
+
+        resp = self.client.get(reverse("home") + "?feed=sub")
+        self.assertContains(resp, "bob new")
+        resp = self.client.get(
+            reverse("feed_more"), {"feed": "sub", "cursor": resp.context["next_cursor"]}
+        )
+        data = resp.json()
+        self.assertIn("bob old", data["rendered_html"])
+        self.assertNotIn("own post", data["rendered_html"])
+        self.assertIsNone(data["next_cursor"])
+
+    def test_counters_follow_likes_and_comments(self):
+        p = Post.objects.create(author=self.u2, text="count me")
+        like_url = reverse("toggle_like_ajax", args=[p.pk])
+        resp = self.client.post(like_url, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertEqual(resp.json()["likes_count"], 1)
+
+        self.client.post(reverse("add_comment", args=[p.pk]), {"text": "root"})
+        root = Comment.objects.get(post=p, text="root")
+        self.client.post(reverse("add_reply", args=[root.pk]), {"text": "r1"})
+        reply = Comment.objects.get(post=p, text="r1")
+        self.client.post(reverse("add_reply", args=[reply.pk]), {"text": "r2"})
+        p.refresh_from_db()
+        self.assertEqual((p.likes_count, p.comments_count), (1, 3))
+
+        # удаление корня уносит каскадом всю ветку
+        self.client.post(reverse("comment_delete", args=[root.pk]))
+        resp = self.client.post(like_url, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertEqual(resp.json()["likes_count"], 0)
+        p.refresh_from_db()
+        self.assertEqual((p.likes_count, p.comments_count), (0, 0))
+
+    def test_recount_post_counters_command(self):
+        from django.core.management import call_command
+
+        p = Post.objects.create(author=self.u2, text="drifted")
+        Like.objects.create(user=self.u1, post=p)
+        Comment.objects.create(author=self.u1, post=p, text="x")
+        Post.objects.filter(pk=p.pk).update(likes_count=7)
+
+        call_command("recount_post_counters", "--batch-size=1", stdout=io.StringIO())
+        p.refresh_from_db()
+        self.assertEqual((p.likes_count, p.comments_count), (1, 1))
+
+    def test_timeline_fan_out_and_prune(self):
+        from network.models import TimelineEntry
+
+        Follow.objects.create(follower=self.u1, following=self.u2)
+        self.client.logout()
+        self.client.login(username="bob", password="pass123")
+        self.client.post(reverse("post_create"), {"text": "fresh from bob"})
+        post = Post.objects.get(text="fresh from bob")
+        self.assertTrue(TimelineEntry.objects.filter(user=self.u1, post=post).exists())
+
+        # отписка через view чистит ленту
+        self.client.logout()
+        self.client.login(username="alice", password="pass123")
+        self.client.post(reverse("toggle_follow", args=[self.u2.username]))
+        self.assertFalse(TimelineEntry.objects.filter(user=self.u1).exists())
+        resp = self.client.get(reverse("home") + "?feed=sub")
+        self.assertNotContains(resp, "fresh from bob")
+
+        # повторная подписка — бэкфилл, удаление поста — каскад
+        self.client.post(reverse("toggle_follow", args=[self.u2.username]))
+        resp = self.client.get(reverse("home") + "?feed=sub")
+        self.assertContains(resp, "fresh from bob")
+        post.delete()
+        self.assertFalse(TimelineEntry.objects.filter(user=self.u1).exists())
+
+    @override_settings(FEED_FANOUT_FOLLOWER_THRESHOLD=2, FEED_PAGE_SIZE=1)
+    def test_hybrid_feed_merges_pulled_authors(self):
+        from network.models import TimelineEntry
+
+        carol = User.objects.create_user(username="carol", password="pass123")
+        dave = User.objects.create_user(username="dave", password="pass123")
+        Follow.objects.create(follower=self.u1, following=self.u2)
+        Follow.objects.create(follower=dave, following=self.u2)  # у bob 2 подписчика → pull
+        Follow.objects.create(follower=self.u1, following=carol)  # у carol 1 → push
+        self.u2.refresh_from_db()
+        self.assertEqual(self.u2.followers_count, 2)
+
+        Post.objects.create(author=self.u2, text="bob 1")
+        Post.objects.create(author=carol, text="carol 1")
+        Post.objects.create(author=self.u2, text="bob 2")
+        self.assertFalse(TimelineEntry.objects.filter(author=self.u2).exists())
+        self.assertTrue(TimelineEntry.objects.filter(user=self.u1, author=carol).exists())
+
+        texts, params = [], {"feed": "sub"}
+        resp = self.client.get(reverse("home"), params)
+        texts += [p.text for p in resp.context["posts"]]
+        cursor = resp.context["next_cursor"]
+        while cursor:
+            data = self.client.get(reverse("feed_more"), {**params, "cursor": cursor}).json()
+            texts += [t for t in ("bob 1", "carol 1", "bob 2") if f"{t}</p>" in data["rendered_html"]]
+            cursor = data["next_cursor"]
+        self.assertEqual(texts, ["bob 2", "carol 1", "bob 1"])
+
+    def test_search_full_text(self):
+        Post.objects.create(author=self.u2, text="Продаю берёзовые веники")
+        Post.objects.create(author=self.u2, text="Про баню")
+        self.u2.city = "Тверь"
+        self.u2.save()
+
+        # склонение + префикс: «веником» → «веник*», «берез» ← «берёзовые»
+        resp = self.client.get(reverse("search"), {"q": "веником берез"})
+        self.assertEqual([p.text for p in resp.context["posts"]], ["Продаю берёзовые веники"])
+        # пользователь по городу и префиксу ника
+        resp = self.client.get(reverse("search"), {"q": "Твери"})
+        self.assertEqual([u.username for u in resp.context["users"]], ["bob"])
+        resp = self.client.get(reverse("search"), {"q": "bo"})
+        self.assertEqual(len(resp.context["posts"]), 2)
+
+    @override_settings(SEARCH_PAGE_SIZE=1)
+    def test_search_pagination_and_unindex(self):
+        first = Post.objects.create(author=self.u2, text="баня раз")
+        Post.objects.create(author=self.u2, text="баня два")
+        resp = self.client.get(reverse("search"), {"q": "бани"})
+        self.assertTrue(resp.context["has_next"])
+        resp = self.client.get(reverse("search"), {"q": "бани", "page": 2})
+        self.assertEqual(len(resp.context["posts"]), 1)
+        self.assertFalse(resp.context["has_next"])
+
+        first.delete()
+        resp = self.client.get(reverse("search"), {"q": "раз"})
+        self.assertEqual(list(resp.context["posts"]), [])
+
+    @override_settings(COMMENT_INLINE_DEPTH=20)
+    def test_comment_tree_single_query(self):
+        p = Post.objects.create(author=self.u2, text="thread")
+        root = Comment.objects.create(author=self.u2, post=p, text="root")
+        node = root
+        for depth in range(1, 5):
+            node = Comment.objects.create(author=self.u1, post=p, parent=node, text=f"d{depth}")
+        self.assertEqual(node.depth, 4)
+        self.assertTrue(node.path.startswith(root.path))
+        Comment.objects.create(author=self.u1, post=p, text="second root")
+
+        resp = self.client.get(reverse("post_detail", args=[p.pk]))
+        self.assertContains(resp, "d4")
+        roots = resp.context["comments"]
+        self.assertEqual([c.text for c in roots], ["root", "second root"])
+        self.assertEqual(roots[0].children[0].children[0].text, "d2")
+
+        # глубина дерева не влияет на число запросов
+        with CaptureQueriesContext(connection) as shallow:
+            self.client.get(reverse("post_detail", args=[p.pk]))
+        for depth in range(5, 9):
+            node = Comment.objects.create(author=self.u1, post=p, parent=node, text=f"d{depth}")
+        with CaptureQueriesContext(connection) as deep:
+            resp = self.client.get(reverse("post_detail", args=[p.pk]))
+        self.assertContains(resp, "d8")
+        self.assertEqual(len(deep), len(shallow))
+
+    @override_settings(COMMENTS_PAGE_SIZE=2, COMMENT_REPLIES_SHOWN=2, COMMENT_INLINE_DEPTH=1)
+    def test_comment_threads_paginated_and_collapsed(self):
+        p = Post.objects.create(author=self.u2, text="popular")
+        roots = [Comment.objects.create(author=self.u2, post=p, text=f"root {i}") for i in range(3)]
+        for i in range(4):
+            self.client.post(reverse("add_reply", args=[roots[0].pk]), {"text": f"reply {i}"})
+        deep = Comment.objects.get(text="reply 0")
+        self.client.post(reverse("add_reply", args=[deep.pk]), {"text": "deep reply"})
+        roots[0].refresh_from_db()
+        self.assertEqual(roots[0].replies_count, 4)
+
+        resp = self.client.get(reverse("post_detail", args=[p.pk]))
+        first = resp.context["comments"]
+        self.assertEqual([c.text for c in first], ["root 0", "root 1"])
+        self.assertEqual([c.text for c in first[0].children], ["reply 0", "reply 1"])
+        self.assertEqual(first[0].more_replies, 2)
+        self.assertEqual(first[0].children[0].more_replies, 1)  # глубже INLINE_DEPTH
+        self.assertNotContains(resp, "deep reply")
+        # счётчик ведут views: 4 ответа + 1 глубокий (корни созданы через ORM)
+        self.assertEqual(resp.context["post"].comments_count, 5)
+
+        # следующая страница корней
+        data = self.client.get(
+            reverse("post_comments", args=[p.pk]), {"after": resp.context["comments_after"]}
+        ).json()
+        self.assertIn("root 2", data["rendered_html"])
+        self.assertIsNone(data["next_after"])
+
+        # свёрнутые ответы догружаются по курсору
+        data = self.client.get(
+            reverse("comment_replies", args=[roots[0].pk]), {"after": first[0].children_after}
+        ).json()
+        self.assertIn("reply 2", data["rendered_html"])
+        self.assertIn("reply 3", data["rendered_html"])
+        self.assertNotIn("reply 1", data["rendered_html"])
+        data = self.client.get(reverse("comment_replies", args=[deep.pk])).json()
+        self.assertIn("deep reply", data["rendered_html"])
+
+        self.client.post(reverse("comment_delete", args=[deep.pk]))
+        roots[0].refresh_from_db()
+        self.assertEqual(roots[0].replies_count, 3)
+
+    @override_settings(LIKES_WRITE_BEHIND=True)
+    def test_like_write_behind_buffer(self):
+        from django.core.management import call_command
+        from network.likebuffer import LikeBuffer
+        from notify.models import Notification
+
+        buf = LikeBuffer(max_pending=100, interval=3600)
+        p = Post.objects.create(author=self.u2, text="buffered")
+        with mock.patch("network.likebuffer.get_buffer", return_value=buf):
+            url = reverse("toggle_like_ajax", args=[p.pk])
+            data = self.client.post(url, HTTP_X_REQUESTED_WITH="XMLHttpRequest").json()
+            self.assertEqual(data, {"liked": True, "likes_count": 1})
+            self.assertFalse(Like.objects.exists())  # ещё в буфере
+
+            # собственная лента уже показывает лайк
+            resp = self.client.get(reverse("home"))
+            self.assertIn(p.id, resp.context["liked_post_ids"])
+            self.assertEqual(resp.context["posts"][0].likes_count, 1)
+
+            # лайк-анлайк-лайк схлопывается в одну запись
+            self.client.post(url, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+            self.assertEqual(len(buf), 0)
+            self.client.post(url, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+            self.assertEqual(buf.flush(), (1, 0))
+
+        p.refresh_from_db()
+        self.assertEqual(p.likes_count, 1)
+        self.assertTrue(Like.objects.filter(user=self.u1, post=p).exists())
+        call_command("outbox_worker", "--once", "--workers=0", stdout=io.StringIO())
+        self.assertEqual(Notification.objects.filter(to_user=self.u2, verb="like").count(), 1)
+
+        # снятие лайка — bulk delete при сбросе
+        buf.toggle(self.u1.id, p.pk)
+        self.assertEqual(buf.flush(), (0, 1))
+        p.refresh_from_db()
+        self.assertEqual(p.likes_count, 0)
+
+        # запись упала — клики остаются в буфере, счётчик для читателей тот же
+        buf.toggle(self.u1.id, p.pk)
+        with mock.patch.object(buf, "_write", side_effect=RuntimeError("db down")):
+            with self.assertRaises(RuntimeError):
+                buf.flush()
+        self.assertEqual((len(buf), buf.pending_delta(p.pk)), (1, 1))
+        self.assertEqual(buf.flush(), (1, 0))
+        self.assertEqual(buf.pending_delta(p.pk), 0)
+
+        # БД спрашивается без замка; если за это время закончился сброс — повторно
+        from django.db.models.query import QuerySet
+
+        real_exists, asked = QuerySet.exists, []
+
+        def racing_exists(qs):
+            self.assertFalse(buf._lock.locked())
+            answer = real_exists(qs)
+            if not asked:
+                Like.objects.filter(user=self.u1, post=p).delete()  # сброс другого потока
+                buf._flushed += 1
+            asked.append(answer)
+            return answer
+
+        with mock.patch.object(QuerySet, "exists", racing_exists):
+            liked, _ = buf.toggle(self.u1.id, p.pk)
+        self.assertEqual(asked, [True, False])
+        self.assertTrue(liked)  # по свежему ответу, а не по устаревшему
+
+    def test_liked_set_cache_on_pages(self):
+        from network import likedset
+
+        p1 = Post.objects.create(author=self.u2, text="liked one")
+        p2 = Post.objects.create(author=self.u2, text="other one")
+        self.client.post(reverse("toggle_like_ajax", args=[p1.pk]))
+
+        resp = self.client.get(reverse("home"))  # массив лайков попадает в кэш
+        self.assertEqual(resp.context["liked_post_ids"], {p1.pk})
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse("home"))
+        self.assertEqual(resp.context["liked_post_ids"], {p1.pk})
+        self.assertFalse([q for q in ctx.captured_queries if "network_like" in q["sql"]])
+
+        # эндпоинт лайка выбрасывает массив — следующее чтение загрузит свежий
+        self.client.post(reverse("toggle_like_ajax", args=[p2.pk]))
+        self.assertIsNone(likedset._get(self.u1.id))
+        self.client.post(reverse("toggle_like_ajax", args=[p1.pk]))
+        resp = self.client.get(reverse("home"))
+        self.assertEqual(resp.context["liked_post_ids"], {p2.pk})
+
+        resp = self.client.get(reverse("profile", args=["bob"]))
+        self.assertEqual(resp.context["liked_post_ids"], {p2.pk})
+        self.assertContains(resp, "bi-heart-fill", count=1)
+        resp = self.client.get(reverse("search"), {"q": "one"})
+        self.assertEqual(resp.context["liked_post_ids"], {p2.pk})
+        self.assertContains(resp, "bi-heart-fill", count=1)
+
+    @override_settings(HOT_FEED_CANDIDATES=2)  # хвост ленты — из БД
+    def test_hot_feed_ranking_and_compaction(self):
+        from datetime import timedelta
+        from django.core.management import call_command
+        from django.utils import timezone
+        from network import hot
+
+        quiet = Post.objects.create(author=self.u2, text="quiet post")
+        popular = Post.objects.create(author=self.u2, text="popular post")
+        fresh = Post.objects.create(author=self.u2, text="fresh post")
+        stale = Post.objects.create(author=self.u2, text="stale post")
+        Post.objects.filter(pk=stale.pk).update(created_at=timezone.now() - timedelta(days=30))
+
+        # оценка растёт на событиях, без пересчёта на запросе
+        self.client.post(reverse("toggle_like_ajax", args=[popular.pk]))
+        self.client.post(reverse("add_comment", args=[popular.pk]), {"text": "wow"})
+        popular.refresh_from_db()
+        self.assertEqual(popular.hot_score, hot.score(1, 1, popular.created_at))
+
+        resp = self.client.get(reverse("home"), {"feed": "hot", "limit": 2})
+        self.assertEqual([p.pk for p in resp.context["posts"]], [popular.pk, fresh.pk])
+
+        # компактизация выкидывает пост за окном из кандидатов (и из частичного индекса)
+        out = io.StringIO()
+        call_command("compact_hot_feed", stdout=out)
+        self.assertIn("Выбыло из кандидатов: 1", out.getvalue())
+        stale.refresh_from_db()
+        self.assertIsNone(stale.hot_score)
+        data = self.client.get(
+            reverse("feed_more"), {"feed": "hot", "limit": 2, "cursor": resp.context["next_cursor"]}
+        ).json()
+        self.assertIn("quiet post", data["rendered_html"])
+        self.assertNotIn("stale post", data["rendered_html"])
+        self.assertIsNone(data["next_cursor"])
+
+    def test_hot_index_keeps_top_k(self):
+        from network.hot import HotIndex
+
+        index = HotIndex(capacity=2)
+        index.load([(1, 3.0), (2, 2.0), (3, 1.0)])  # третий не влез — в БД есть ещё
+        self.assertFalse(index.complete)
+        index.update(3, 2.5)
+        self.assertEqual(index.page(None, 10), [(1, 3.0), (3, 2.5)])
+        index.update(4, 0.5)  # хуже худшего — в память не попадает
+        self.assertEqual(index.page((3.0, 1), 10), [(3, 2.5)])
+
+    def test_hot_index_updated_only_after_commit(self):
+        from django.db import transaction
+        from network import hot
+
+        p = Post.objects.create(author=self.u2, text="rolled back")
+        index = hot.get_index()
+        before = index.page(None, 10)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Post.objects.filter(pk=p.pk).update(likes_count=50)
+            hot.touch(p.pk)
+            raise RuntimeError("откат")
+        self.assertEqual(index.page(None, 10), before)  # оценки, которой нет в БД, нет и в памяти
+
+        Post.objects.filter(pk=p.pk).update(likes_count=50)
+        with self.captureOnCommitCallbacks(execute=True):
+            hot.touch(p.pk)
+        p.refresh_from_db()
+        self.assertIn((p.pk, p.hot_score), index.page(None, 10))
+
+    def test_image_thumbnails_and_srcset(self):
+        from django.core.files.storage import default_storage
+        from django.core.management import call_command
+        from PIL import Image
+        from network.models import ImageJob
+
+        exif = Image.Exif()
+        exif[0x010F] = "SecretCam"  # Make
+        img = SimpleUploadedFile("wide.jpg", jpeg(800, 400, exif), content_type="image/jpeg")
+        self.client.post(reverse("post_create"), {"text": "with thumbs", "image": img})
+        p = Post.objects.get(text="with thumbs")
+
+        # в запросе картинку не трогаем: задача в очереди, в ленте заглушка
+        self.assertEqual(p.image_variants, {"pending": p.image.name})
+        self.assertTrue(ImageJob.objects.filter(object_id=p.pk, status="pending").exists())
+        self.assertContains(self.client.get(reverse("home")), "Картинка обрабатывается")
+        # и ссылки на необработанный оригинал (с EXIF) нигде не отдаются
+        self.assertEqual((p.image_thumb, p.image_responsive.src, p.image_responsive.srcset), ("", "", ""))
+        self.u1.avatar = p.image.name
+        self.u1.avatar_variants = {"pending": p.image.name}
+        self.assertEqual(self.u1.avatar_thumb, "")
+
+        call_command("image_worker", "--once", "--workers=1", stdout=io.StringIO())
+        p.refresh_from_db()
+        self.assertEqual(ImageJob.objects.get(object_id=p.pk).status, "done")
+        with default_storage.open(p.image.name) as f:
+            self.assertFalse(Image.open(f).getexif())  # EXIF снят
+
+        variants = p.image_variants
+        self.assertEqual(variants["src"], p.image.name)
+        self.assertEqual(sorted(variants["sizes"], key=int), ["320", "640"])  # 1080 > 800
+        for files in variants["sizes"].values():
+            self.assertEqual(set(files), {"jpg", "webp"})
+            self.assertTrue(all(default_storage.exists(n) for n in files.values()))
+        self.assertTrue(p.image_thumb.endswith(".w320.jpg"))
+
+        resp = self.client.get(reverse("home"))
+        self.assertContains(resp, 'type="image/webp"')
+        self.assertContains(resp, f"{p.image.url} 800w")
+
+        # команда догоняет картинки без копий
+        Post.objects.filter(pk=p.pk).update(image_variants={})
+        out = io.StringIO()
+        call_command("generate_thumbnails", "--only=posts", stdout=out)
+        self.assertIn("нарезано 1", out.getvalue())
+        p.refresh_from_db()
+        self.assertEqual(p.image_variants, variants)
+
+    def test_image_worker_rejects_broken_upload(self):
+        from django.core.management import call_command
+        from network.models import ImageJob
+
+        junk = SimpleUploadedFile("junk.jpg", b"not an image", content_type="image/jpeg")
+        self.client.post(reverse("post_create"), {"text": "broken", "image": junk})
+        call_command("image_worker", "--once", "--workers=0", stdout=io.StringIO())
+
+        p = Post.objects.get(text="broken")
+        self.assertFalse(p.image)
+        self.assertEqual(ImageJob.objects.get(object_id=p.pk).status, "failed")
+
+    def test_image_worker_survives_missing_file(self):
+        import os
+        from django.core.management import call_command
+        from network.models import ImageJob
+
+        upload = SimpleUploadedFile("gone.jpg", jpeg(400, 200), content_type="image/jpeg")
+        self.client.post(reverse("post_create"), {"text": "gone", "image": upload})
+        p = Post.objects.get(text="gone")
+        os.remove(p.image.path)
+
+        # воркер не падает: задача повторяется до IMAGE_JOB_MAX_ATTEMPTS и закрывается
+        out = io.StringIO()
+        with override_settings(IMAGE_JOB_MAX_ATTEMPTS=2):
+            call_command("image_worker", "--once", "--workers=0", stdout=out)
+        self.assertIn("с ошибкой: 2", out.getvalue())
+        job = ImageJob.objects.get(object_id=p.pk)
+        self.assertEqual((job.status, job.attempts), ("failed", 2))
+        self.assertIn("FileNotFoundError", job.error)
+
+    def test_image_worker_survives_store_error(self):
+        from django.core.management import call_command
+        from network.models import ImageJob
+
+        upload = SimpleUploadedFile("disk.jpg", jpeg(400, 200), content_type="image/jpeg")
+        self.client.post(reverse("post_create"), {"text": "disk", "image": upload})
+        p = Post.objects.get(text="disk")
+
+        out = io.StringIO()
+        with mock.patch("social.thumbnails.store", side_effect=OSError("нет места")):
+            call_command("image_worker", "--once", "--workers=0", stdout=out)
+        self.assertIn("с ошибкой: 3", out.getvalue())  # все попытки — в одном --once
+        job = ImageJob.objects.get(object_id=p.pk)
+        self.assertEqual(job.status, "failed")
+        self.assertIn("нет места", job.error)
+        p.refresh_from_db()
+        self.assertTrue(p.image)  # исправный файл не удалён
+
+    def test_content_addressed_media_dedup_and_cleanup(self):
+        import os
+        import time
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from django.core.management import call_command
+        from social.storage import parse
+
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media, IMAGE_PROCESSING_ASYNC=False):
+            data = jpeg(800, 400)
+            with self.captureOnCommitCallbacks(execute=True):
+                for text in ("copy 1", "copy 2"):
+                    img = SimpleUploadedFile("same.jpg", data, content_type="image/jpeg")
+                    self.client.post(reverse("post_create"), {"text": text, "image": img})
+            p1, p2 = Post.objects.get(text="copy 1"), Post.objects.get(text="copy 2")
+
+            # одно содержимое — одно имя и один файл в шард-каталоге
+            self.assertEqual(p1.image.name, p2.image.name)
+            directory, h, _ = parse(p1.image.name)
+            shard = default_storage.path(f"{directory}/{h[:2]}/{h[2:4]}")
+            self.assertEqual(len(os.listdir(shard)), 5)  # оригинал + 2 ширины × (jpg, webp)
+
+            # пока на файл ссылается второй пост, удаление первого его не трогает
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse("post_delete", args=[p1.pk]))
+            self.assertTrue(default_storage.exists(p2.image.name))
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse("post_delete", args=[p2.pk]))
+            self.assertEqual(os.listdir(shard), [])
+
+            # замена картинки в post_edit освобождает старый файл
+            with self.captureOnCommitCallbacks(execute=True):
+                img = SimpleUploadedFile("a.jpg", data, content_type="image/jpeg")
+                self.client.post(reverse("post_create"), {"text": "edit me", "image": img})
+            p3 = Post.objects.get(text="edit me")
+            old = p3.image.name
+            with self.captureOnCommitCallbacks(execute=True):
+                img = SimpleUploadedFile("b.jpg", jpeg(640, 320), content_type="image/jpeg")
+                self.client.post(reverse("post_edit", args=[p3.pk]), {"text": "edit me", "image": img})
+            p3.refresh_from_db()
+            self.assertNotEqual(p3.image.name, old)
+            self.assertFalse(default_storage.exists(old))
+
+            # тот же файл загрузили снова после delete(), но до collect(): не удаляем
+            name = default_storage.save("posts/x.bin", ContentFile(b"shared"))
+            prefix = name.rsplit(".", 1)[0]
+            stamp = default_storage.uploaded_at(prefix)
+            time.sleep(0.05)  # mtime файловой системы грубее time.time()
+            default_storage.save("posts/y.bin", ContentFile(b"shared"))
+            self.assertEqual(default_storage.collect(prefix, since=stamp), 0)
+            self.assertTrue(default_storage.exists(name))
+            self.assertEqual(default_storage.collect(prefix), 1)
+
+            orphan = default_storage.save("posts/orphan.bin", ContentFile(b"lost"))
+            out = io.StringIO()
+            call_command("cleanup_media", "--min-age=0", stdout=out)
+            self.assertFalse(default_storage.exists(orphan))
+            self.assertIn("удалено: 1", out.getvalue())
+
+    def test_post_card_fragment_cache(self):
+        from network import fragments
+
+        post = Post.objects.create(author=self.u1, text="кэшируемый текст")
+        fragments.prefetch("post", [post])
+        version = post._fragment_version
+
+        # общая часть карточки из кэша, кнопки автора — свои у каждого зрителя
+        resp = self.client.get(reverse("home"))
+        self.assertContains(resp, "кэшируемый текст")
+        self.assertContains(resp, reverse("post_edit", args=[post.pk]))
+
+        self.client.logout()
+        self.client.login(username="bob", password="pass123")
+        resp = self.client.get(reverse("home"))
+        self.assertContains(resp, "кэшируемый текст")
+        self.assertNotContains(resp, reverse("post_edit", args=[post.pk]))
+
+        # UPDATE мимо save() кэш не видит, правка через save() — видит
+        Post.objects.filter(pk=post.pk).update(text="мимо кэша")
+        self.assertContains(self.client.get(reverse("home")), "кэшируемый текст")
+        post.refresh_from_db()
+        post.text = "новый текст"
+        post.save()
+        self.assertNotEqual(fragments.version("post", Post.objects.get(pk=post.pk)), version)
+        resp = self.client.get(reverse("home"))
+        self.assertContains(resp, "новый текст")
+
+        # лайк фрагмент не сбрасывает, но счётчик рядом свежий
+        self.client.post(reverse("toggle_like_ajax", args=[post.pk]))
+        resp = self.client.get(reverse("home"))
+        self.assertContains(resp, '<span data-like-count>1</span>', html=False)
+
+        # профиль и поиск рендерят карточки тем же партиалом — тоже из кэша
+        Post.objects.filter(pk=post.pk).update(text="новый мимо кэша")
+        self.assertContains(self.client.get(reverse("profile", args=[self.u1.username])), "новый текст")
+        self.assertContains(self.client.get(reverse("search"), {"q": "новый"}), "новый текст")
@@ -0,0 +1,150 @@
+# network/timeline.py
+"""
+Лента «Подписки»: гибрид push/pull.
+
+Push (fan-out on write): пост обычного автора при публикации раскладывается
+в TimelineEntry всех его подписчиков, и чтение — один диапазонный проход по
+индексу (user, created_at DESC, post DESC).
+
+Pull (fan-out on read): авторы, у которых подписчиков не меньше
+FEED_FANOUT_FOLLOWER_THRESHOLD, в ленты не раскладываются — их посты
+дочитываются при открытии ленты по индексу (author, created_at, id) и
+сливаются с push-потоком k-way merge'ем на куче.
+
+Если автор опустился ниже порога, посты «pull-периода» в ленты задним
+числом не попадают — остаются только новые.
+"""
+import heapq
+
+from django.conf import settings
+
+from accounts.models import Follow, User
+from .models import Post, TimelineEntry
+from .pagination import after_cursor, decode_cursor, encode_cursor
+
+
+def _batch_size():
+    return getattr(settings, "TIMELINE_FANOUT_BATCH", 1000)
+
+
+def fanout_threshold():
+    """Порог подписчиков, начиная с которого автор читается через pull (None — только push)."""
+    return getattr(settings, "FEED_FANOUT_FOLLOWER_THRESHOLD", None)
+
+
+def is_pulled(author_id):
+    threshold = fanout_threshold()
+    if threshold is None:
+        return False
+    return User.objects.filter(pk=author_id, followers_count__gte=threshold).exists()
+
+
+def fan_out(post):
+    """
+    Кладёт новый пост в ленты всех подписчиков автора (пачками).
+    Возвращает число записанных строк (0 — автор в pull-режиме).
+    """
+    if is_pulled(post.author_id):
+        return 0
+    follower_ids = Follow.objects.filter(following_id=post.author_id).values_list(
+        "follower_id", flat=True
+    )
+    written, batch = 0, []
+    for follower_id in follower_ids.iterator(chunk_size=_batch_size()):
+        batch.append(
+            TimelineEntry(
+                user_id=follower_id,
+                post_id=post.pk,
+                author_id=post.author_id,
+                created_at=post.created_at,
+            )
+        )
+        if len(batch) >= _batch_size():
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            written, batch = written + len(batch), []
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        written += len(batch)
+    return written
+
+
+def backfill(follower_id, author_id, limit=None):
+    """После подписки докладывает в ленту последние посты автора (кроме pull-авторов)."""
+    if is_pulled(author_id):
+        return
+    limit = limit or getattr(settings, "TIMELINE_BACKFILL_LIMIT", 200)
+    posts = (
+        Post.objects.filter(author_id=author_id)
+        .order_by("-created_at", "-id")
+        .values_list("id", "created_at")[:limit]
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=follower_id, post_id=pk, author_id=author_id, created_at=created_at
+            )
+            for pk, created_at in posts
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def prune(follower_id, author_id):
+    """После отписки убирает посты автора из ленты подписчика."""
+    TimelineEntry.objects.filter(user_id=follower_id, author_id=author_id).delete()
+
+
+def _pulled_author_ids(user):
+    threshold = fanout_threshold()
+    if threshold is None:
+        return []
+    return list(
+        Follow.objects.filter(
+            follower=user, following__followers_count__gte=threshold
+        ).values_list("following_id", flat=True)
+    )
+
+
+def timeline_page(user, cursor, size):
+    """
+    Страница ленты «Подписки»: (posts, next_cursor) — тот же курсор, что и в общей ленте.
+
+    Каждый поток (своя лента + по одному на pull-автора) отдаёт не больше
+    size + 1 строк после курсора, heapq.merge сливает их по (created_at, id).
+    """
+    position = decode_cursor(cursor)
+    streams = [
+        [
+            e.post
+            for e in after_cursor(
+                TimelineEntry.objects.filter(user=user).select_related("post__author"),
+                position,
+                pk_field="post_id",
+            )[: size + 1]
+        ]
+    ]
+    for author_id in _pulled_author_ids(user):
+        streams.append(
+            list(
+                after_cursor(
+                    Post.objects.filter(author_id=author_id).select_related("author"),
+                    position,
+                )[: size + 1]
+            )
+        )
+
+    posts, seen = [], set()
+    merged = heapq.merge(*streams, key=lambda p: (p.created_at, p.id), reverse=True)
+    for post in merged:
+        if post.id in seen:  # пост мог попасть в ленту до того, как автор стал pull
+            continue
+        seen.add(post.id)
+        posts.append(post)
+        if len(posts) > size:
+            break
+
+    next_cursor = None
+    if len(posts) > size:
+        posts = posts[:size]
+        next_cursor = encode_cursor(posts[-1].created_at, posts[-1].id)
+    return posts, next_cursor
@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path('', views.home, name='home'),
+    path('feed/more/', views.feed_more, name='feed_more'),
 
     # посты
     path('post/create/', views.post_create, name='post_create'),
@@ -16,6 +17,8 @@ urlpatterns = [
     path('comment/<int:pk>/edit/', views.comment_edit, name='comment_edit'),
     path('comment/<int:pk>/delete/', views.comment_delete, name='comment_delete'),
     path('comment/<int:parent_id>/reply/', views.add_reply, name='add_reply'),
+    path('post/<int:pk>/comments/', views.post_comments, name='post_comments'),
+    path('comment/<int:pk>/replies/', views.comment_replies, name='comment_replies'),
     path('post/<int:pk>/like-ajax/', views.toggle_like_ajax, name='toggle_like_ajax'),
     # поиск
     path('search/', views.search, name='search'),
@@ -1,7 +1,10 @@
 # network/views.py
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
@@ -10,66 +13,198 @@ from django.views.decorators.http import require_POST
 
 from .forms import CommentForm, PostForm
 from .models import Comment, Like, Post
+from . import fragments, hot, likebuffer, likedset
+from . import search as search_index
+from .pagination import get_page_size, keyset_page
+from .timeline import timeline_page
 
-from accounts.models import Follow, User
-from notify.models import Notification
+from accounts.models import User
+from outbox import events
 
 
-def home(request):
-    feed = request.GET.get("feed")  # None | 'sub'
+def _bump_counters(post_id, **deltas):
+    """
+    Атомарно сдвигает денормализованные счётчики поста (UPDATE … SET x = x + d)
+    и пересчитывает по ним hot_score.
+    """
+    Post.objects.filter(pk=post_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    hot.touch(post_id)
 
-    if request.user.is_authenticated and feed == "sub":
-        following_ids = Follow.objects.filter(
-            follower=request.user
-        ).values_list("following_id", flat=True)
-
-        posts = (
-            Post.objects.filter(author_id__in=following_ids)
-            .select_related("author")
-            .prefetch_related("likes", "comments__author")
+
+def _comment_branch(post_id, parent, after, size):
+    """
+    Следующие `size` ответов на `parent` (None — корневые комментарии) после
+    пути `after` вместе с их поддеревьями, свёрнутыми до
+    COMMENT_INLINE_DEPTH уровней и COMMENT_REPLIES_SHOWN ответов на узел.
+
+    Потомки страницы лежат в одном диапазоне путей, поэтому выбираются
+    одним запросом (ORDER BY path) и собираются за один проход. У узла
+    проставляются .children, .more_replies (сколько ответов свёрнуто) и
+    .children_after (курсор для «Показать ещё»).
+    Возвращает (узлы, курсор следующей страницы или None).
+    """
+    shown = getattr(settings, "COMMENT_REPLIES_SHOWN", 3)
+    inline_depth = getattr(settings, "COMMENT_INLINE_DEPTH", 2)
+
+    heads_qs = Comment.objects.filter(post_id=post_id, parent=parent)
+    if after:
+        heads_qs = heads_qs.filter(path__gt=after)
+    heads = list(heads_qs.select_related("author").order_by("path")[: size + 1])
+    next_after = None
+    if len(heads) > size:
+        heads = heads[:size]
+        next_after = heads[-1].path
+    if not heads:
+        return [], None
+
+    base_depth = heads[0].depth
+    descendants = (
+        Comment.objects.filter(
+            post_id=post_id,
+            path__gt=heads[0].path,
+            path__lt=heads[-1].path + "~",  # "~" больше любой цифры
+            depth__gt=base_depth,
+            depth__lte=base_depth + inline_depth,
         )
+        .annotate(
+            sibling_rank=Window(
+                RowNumber(), partition_by=[F("parent_id")], order_by=F("path").asc()
+            )
+        )
+        .filter(sibling_rank__lte=shown)
+        .select_related("author")
+        .order_by("path")
+    )
+
+    by_id = {}
+    for c in heads:
+        if parent is not None:
+            Comment.parent.field.set_cached_value(c, parent)
+        c.children = []
+        by_id[c.pk] = c
+    for c in descendants:
+        owner = by_id.get(c.parent_id)
+        if owner is None:  # родитель сам свёрнут
+            continue
+        Comment.parent.field.set_cached_value(c, owner)
+        c.children = []
+        owner.children.append(c)
+        by_id[c.pk] = c
+
+    for c in by_id.values():
+        c.more_replies = c.replies_count - len(c.children)
+        c.children_after = c.children[-1].path if c.children else ""
+    fragments.prefetch("comment", by_id.values())
+    return heads, next_after
+
+
+def _toggle_like(user, post):
+    """
+    Ставит/снимает лайк, двигает likes_count и пишет событие в outbox
+    в одной транзакции.
+    Возвращает True, если лайк поставлен.
+    """
+    with transaction.atomic():
+        like, created = Like.objects.get_or_create(user=user, post=post)
+        if created:
+            _bump_counters(post.pk, likes_count=1)
+            if post.author_id != user.id:
+                # уведомление автору — из outbox (outbox/events.py), не в запросе
+                events.record("like", author=post.author_id, post=post.pk, actors=[user.id])
+        elif Like.objects.filter(pk=like.pk).delete()[0]:
+            _bump_counters(post.pk, likes_count=-1)
+    return created
+
+
+def _feed_page(request):
+    """
+    Одна страница ленты (общей или «Подписки») по курсору из ?cursor=.
+    Возвращает (feed, posts, next_cursor, liked_post_ids).
+    """
+    feed = request.GET.get("feed")  # None | 'sub' | 'hot'
+
+    cursor, size = request.GET.get("cursor"), get_page_size(request)
+    if request.user.is_authenticated and feed == "sub":
+        # материализованная лента: диапазон по индексу (user, created_at, post)
+        posts, next_cursor = timeline_page(request.user, cursor, size)
+    elif feed == "hot":
+        # top-K в памяти процесса, хвост — по частичному индексу post_hot_idx
+        posts, next_cursor = hot.hot_page(cursor, size)
     else:
-        posts = (
-            Post.objects.select_related("author")
-            .prefetch_related("likes", "comments__author")
+        posts, next_cursor = keyset_page(
+            Post.objects.select_related("author"), cursor, size
         )
 
     # набор id постов, которые лайкнул текущий пользователь (для красного сердечка)
-    if request.user.is_authenticated:
-        liked_post_ids = set(
-            Like.objects.filter(user=request.user, post_id__in=posts.values("id"))
-            .values_list("post_id", flat=True)
-        )
-    else:
-        liked_post_ids = set()
+    liked_post_ids = likedset.for_page(request.user, posts)
+    # версии для кэша фрагментов карточек — одним запросом к кэшу
+    fragments.prefetch("post", posts)
+
+    return feed, posts, next_cursor, liked_post_ids
 
+
+def home(request):
+    feed, posts, next_cursor, liked_post_ids = _feed_page(request)
     form = PostForm() if request.user.is_authenticated else None
     return render(
         request,
         "home.html",
-        {"posts": posts, "form": form, "feed": feed, "liked_post_ids": liked_post_ids},
+        {
+            "posts": posts,
+            "form": form,
+            "feed": feed,
+            "liked_post_ids": liked_post_ids,
+            "next_cursor": next_cursor,
+        },
     )
 
 
+def feed_more(request):
+    """
+    «Загрузить ещё» для ленты.
+    JSON { rendered_html, next_cursor } — карточки следующей страницы.
+    """
+    feed, posts, next_cursor, liked_post_ids = _feed_page(request)
+    next_url = reverse("home") + (f"?feed={feed}" if feed in ("sub", "hot") else "")
+    html = render_to_string(
+        "partials/post_list.html",
+        {"posts": posts, "liked_post_ids": liked_post_ids, "next_url": next_url},
+        request=request,
+    )
+    return JsonResponse({"rendered_html": html, "next_cursor": next_cursor})
+
+
 def search(request):
     q = request.GET.get("q", "").strip()
+    try:
+        page = max(1, int(request.GET.get("page", 1)))
+    except ValueError:
+        page = 1
+    size = search_index.page_size()
+    offset = (page - 1) * size
+
     users = posts = []
+    has_next = False
     if q:
-        users = (
-            User.objects.filter(
-                Q(username__icontains=q)
-                | Q(first_name__icontains=q)
-                | Q(last_name__icontains=q)
-                | Q(city__icontains=q)
-            )
-            .order_by("username")[:50]
-        )
-        posts = (
-            Post.objects.filter(Q(text__icontains=q) | Q(author__username__icontains=q))
-            .select_related("author")
-            .order_by("-created_at")[:50]
-        )
-    return render(request, "search.html", {"q": q, "users": users, "posts": posts})
+        users, more_users = search_index.search_users(q, offset, size)
+        posts, more_posts = search_index.search_posts(q, offset, size)
+        has_next = more_users or more_posts
+    liked_post_ids = likedset.for_page(request.user, posts)
+    fragments.prefetch("post", posts)
+    return render(
+        request,
+        "search.html",
+        {
+            "q": q,
+            "users": users,
+            "posts": posts,
+            "liked_post_ids": liked_post_ids,
+            "page": page,
+            "has_next": has_next,
+        },
+    )
 
 
 @login_required
@@ -89,27 +224,59 @@ def post_create(request):
 
 def post_detail(request, pk):
     post = get_object_or_404(Post.objects.select_related("author"), pk=pk)
-    comments = (
-        post.comments.select_related("author", "parent")
-        .prefetch_related("replies__author", "replies__replies__author")
-        .all()
+    comments, comments_after = _comment_branch(
+        post.pk, None, None, getattr(settings, "COMMENTS_PAGE_SIZE", 20)
     )
     comment_form = CommentForm() if request.user.is_authenticated else None
-    user_liked = request.user.is_authenticated and post.likes.filter(
-        user=request.user
-    ).exists()
+    user_liked = post.pk in likedset.for_page(request.user, [post])
     return render(
         request,
         "post_detail.html",
         {
             "post": post,
             "comments": comments,
+            "comments_after": comments_after,
             "comment_form": comment_form,
             "user_liked": user_liked,
         },
     )
 
 
+def _render_branch(request, nodes, next_after):
+    html = "".join(
+        render_to_string("partials/comment_item.html", {"c": c}, request=request)
+        for c in nodes
+    )
+    return JsonResponse({"rendered_html": html, "next_after": next_after})
+
+
+def post_comments(request, pk):
+    """
+    Следующая страница корневых комментариев: ?after=<path последнего>.
+    JSON { rendered_html, next_after }.
+    """
+    post = get_object_or_404(Post, pk=pk)
+    nodes, next_after = _comment_branch(
+        post.pk, None, request.GET.get("after"), getattr(settings, "COMMENTS_PAGE_SIZE", 20)
+    )
+    return _render_branch(request, nodes, next_after)
+
+
+def comment_replies(request, pk):
+    """
+    Свёрнутые ответы на комментарий: ?after=<path последнего показанного>.
+    JSON { rendered_html, next_after }.
+    """
+    parent = get_object_or_404(Comment.objects.select_related("author"), pk=pk)
+    nodes, next_after = _comment_branch(
+        parent.post_id,
+        parent,
+        request.GET.get("after"),
+        getattr(settings, "COMMENT_REPLIES_PAGE_SIZE", 20),
+    )
+    return _render_branch(request, nodes, next_after)
+
+
 @login_required
 def post_edit(request, pk):
     post = get_object_or_404(Post, pk=pk, author=request.user)
@@ -140,27 +307,22 @@ def post_delete(request, pk):
 @require_POST
 def toggle_like(request, pk):
     post = get_object_or_404(Post, pk=pk)
-    like, created = Like.objects.get_or_create(user=request.user, post=post)
+    if likebuffer.enabled():
+        # запись (и уведомление) уйдут в БД при сбросе буфера
+        created, _ = likebuffer.get_buffer().toggle(request.user.id, post.pk)
+        if created:
+            messages.success(request, "Пост понравился.")
+        else:
+            messages.info(request, "Лайк убран.")
+        return redirect(request.POST.get("next") or "post_detail", pk=pk)
+    created = _toggle_like(request.user, post)
 
     if not created:
         # снятие лайка
-        like.delete()
         messages.info(request, "Лайк убран.")
     else:
         # поставили лайк
         messages.success(request, "Пост понравился.")
-        # уведомляем автора, если лайк не на свой пост
-        if post.author_id != request.user.id:
-            try:
-                Notification.objects.create(
-                    to_user=post.author,
-                    verb="like",
-                    actor=request.user,
-                    post_id=post.id,
-                )
-            except Exception:
-                # не ломаем поток, если notify недоступен
-                pass
 
     return redirect(request.POST.get("next") or "post_detail", pk=pk)
 
@@ -169,25 +331,14 @@ def toggle_like(request, pk):
 @require_POST
 def toggle_like_ajax(request, pk):
     post = get_object_or_404(Post, pk=pk)
-    like, created = Like.objects.get_or_create(user=request.user, post=post)
-    liked = True
-    if not created:
-        like.delete()
-        liked = False
-    else:
-        # уведомляем автора поста о новом лайке
-        if post.author_id != request.user.id:
-            try:
-                Notification.objects.create(
-                    to_user=post.author,
-                    verb="like",
-                    actor=request.user,
-                    post_id=post.id,
-                )
-            except Exception:
-                pass
+    if likebuffer.enabled():
+        liked, likes_count = likebuffer.get_buffer().toggle(request.user.id, post.pk)
+        return JsonResponse({"liked": liked, "likes_count": likes_count})
 
-    return JsonResponse({"liked": liked, "likes_count": post.likes.count()})
+    liked = _toggle_like(request.user, post)
+    # сохранённый счётчик вместо COUNT(*) по лайкам
+    post.refresh_from_db(fields=["likes_count"])
+    return JsonResponse({"liked": liked, "likes_count": post.likes_count})
 
 
 @login_required
@@ -206,16 +357,12 @@ def add_comment(request, pk):
             return JsonResponse({"error": "empty"}, status=400)
         return redirect("post_detail", pk=pk)
 
-    c = Comment.objects.create(author=request.user, post=post, text=text)
-
-    # уведомление автору поста (если коммент не свой)
-    if post.author_id != request.user.id:
-        try:
-            Notification.objects.create(
-                to_user=post.author, verb="comment", actor=request.user, post_id=post.id
-            )
-        except Exception:
-            pass
+    with transaction.atomic():
+        c = Comment.objects.create(author=request.user, post=post, text=text)
+        _bump_counters(post.pk, comments_count=1)
+        # уведомление автору поста (если коммент не свой) — из outbox
+        if post.author_id != request.user.id:
+            events.record("comment", author=post.author_id, post=post.pk, actors=[request.user.id])
 
     if is_ajax:
         html = render_to_string("partials/comment_item.html", {"c": c}, request=request)
@@ -255,7 +402,14 @@ def comment_delete(request, pk):
     comment = get_object_or_404(Comment, pk=pk, author=request.user)
     post_pk = comment.post_id
     if request.method == "POST":
-        comment.delete()
+        with transaction.atomic():
+            removed = comment.subtree().count()  # ответы удаляются каскадом
+            comment.delete()
+            _bump_counters(post_pk, comments_count=-removed)
+            if comment.parent_id:
+                Comment.objects.filter(pk=comment.parent_id).update(
+                    replies_count=F("replies_count") - 1
+                )
         messages.success(request, "Комментарий удалён.")
     return redirect(request.POST.get("next") or "post_detail", pk=post_pk)
 
@@ -264,10 +418,12 @@ def comment_delete(request, pk):
 @require_POST
 def add_reply(request, parent_id):
     """
-    Добавление ответа на комментарий (1-й уровень).
+    Добавление ответа на комментарий любого уровня вложенности.
     AJAX: JSON { rendered_html }, иначе — redirect.
     """
-    parent = get_object_or_404(Comment, pk=parent_id)
+    parent = get_object_or_404(
+        Comment.objects.select_related("author", "post__author"), pk=parent_id
+    )
     text = (request.POST.get("text") or "").strip()
     is_ajax = request.headers.get("X-Requested-With", "").lower() == "xmlhttprequest"
 
@@ -276,21 +432,21 @@ def add_reply(request, parent_id):
             return JsonResponse({"error": "empty"}, status=400)
         return redirect("post_detail", pk=parent.post_id)
 
-    r = Comment.objects.create(
-        author=request.user, post=parent.post, parent=parent, text=text
-    )
+    if parent.depth >= Comment.MAX_DEPTH:
+        # глубже path не вместит: ответ встаёт рядом, под тем же предком
+        parent = Comment.objects.select_related("author", "post__author").get(pk=parent.parent_id)
 
-    # уведомление автору поста (если ответ не свой)
-    if parent.post.author_id != request.user.id:
-        try:
-            Notification.objects.create(
-                to_user=parent.post.author,
-                verb="comment",
-                actor=request.user,
-                post_id=parent.post_id,
+    with transaction.atomic():
+        r = Comment.objects.create(
+            author=request.user, post=parent.post, parent=parent, text=text
+        )
+        _bump_counters(parent.post_id, comments_count=1)
+        Comment.objects.filter(pk=parent.pk).update(replies_count=F("replies_count") + 1)
+        # уведомление автору поста (если ответ не свой) — из outbox
+        if parent.post.author_id != request.user.id:
+            events.record(
+                "comment", author=parent.post.author_id, post=parent.post_id, actors=[request.user.id]
             )
-        except Exception:
-            pass
 
     if is_ajax:
         html = render_to_string("partials/comment_item.html", {"c": r}, request=request)
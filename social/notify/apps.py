@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class NotifyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notify'
+
+    def ready(self):
+        from . import handlers, signals  # noqa: F401  (регистрация обработчиков)
@@ -0,0 +1,100 @@
+# notify/coalesce.py
+"""
+Склейка уведомлений при записи.
+
+Вместо строки на каждое событие — одна группа на (получатель, verb, пост):
+пока группа не прочитана (в т. ч. знаком «прочитать всё», notify/inbox.py)
+и её последнее событие моложе
+NOTIFY_GROUP_WINDOW секунд, новые события обновляют её (count,
+выборка актёров, updated_at), а не добавляют строки. Популярный пост
+даёт автору одно «N человек поставили лайк», а список уведомлений
+рендерится за постоянное время на группу.
+
+count считает разных людей: кто уже в группе, хранится в
+NotificationActor (вся история, а не только выборка), и повтор от
+того же актёра (лайк → снял → снова лайк, повтор события outbox)
+группу только поднимает наверх.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .inbox import read_before
+from .models import Notification, NotificationActor
+
+
+def _window():
+    return timedelta(seconds=getattr(settings, "NOTIFY_GROUP_WINDOW", 24 * 3600))
+
+
+def _sample_size():
+    return getattr(settings, "NOTIFY_ACTOR_SAMPLE", 3)
+
+
+def notify(to_user_id, verb, actor_ids, post_id=None):
+    """
+    Записать события `actor_ids` (по порядку, последний — самый свежий)
+    в открытую группу или завести новую. Возвращает группу.
+    """
+    actor_ids = [a for a in actor_ids if a is not None and a != to_user_id]
+    if not actor_ids:
+        return None
+    now = timezone.now()
+    sample = _sample_size()
+    since = now - _window()
+    marker = read_before(to_user_id)
+    if marker is not None and marker > since:
+        since = marker  # группы за знаком «прочитать всё» закрыты, как прочитанные
+    with transaction.atomic():
+        group = (
+            Notification.objects.select_for_update()
+            .filter(
+                to_user_id=to_user_id,
+                verb=verb,
+                post_id=post_id,
+                is_read=False,
+                updated_at__gt=since,
+            )
+            .order_by("-updated_at")
+            .first()
+        )
+        if group is None:
+            group = Notification(to_user_id=to_user_id, verb=verb, post_id=post_id, count=0, actor_ids=[])
+            seen = set()
+        else:
+            seen = set(
+                NotificationActor.objects.filter(group=group, user_id__in=actor_ids)
+                .values_list("user_id", flat=True)
+            )
+        ids, fresh = list(group.actor_ids), []
+        for actor_id in actor_ids:
+            if actor_id not in seen:
+                seen.add(actor_id)
+                fresh.append(actor_id)
+            ids = [actor_id] + [a for a in ids if a != actor_id]
+        group.count = max(group.count + len(fresh), 1)
+        group.actor_ids = ids[:sample]
+        group.actor_id = actor_ids[-1]
+        group.updated_at = now
+        if group.pk is None:
+            group.save()
+        else:
+            group.save(update_fields=["count", "actor_ids", "actor", "updated_at"])
+        NotificationActor.objects.bulk_create(
+            [NotificationActor(group=group, user_id=a) for a in fresh], ignore_conflicts=True
+        )
+    return group
+
+
+def actors_for(groups):
+    """Проставить группам .actors — пользователей выборки одним запросом."""
+    from accounts.models import User
+
+    groups = list(groups)
+    users = User.objects.in_bulk({a for g in groups for a in g.actor_ids})
+    for g in groups:
+        g.actors = [users[a] for a in g.actor_ids if a in users]
+        g.others = max(0, g.count - len(g.actors))
+    return groups
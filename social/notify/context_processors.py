@@ -1,6 +1,12 @@
+from social import badges
+from .inbox import count_unread
+
+
 def unread_notifications(request):
     if not request.user.is_authenticated:
         return {}
+    user_id = request.user.id
+    # лениво и из кэша (social/badges.py)
     return {
-        'notify_unread': request.user.notifications.filter(is_read=False).count()
-    }
\ No newline at end of file
+        'notify_unread': badges.lazy("notify", user_id, lambda: count_unread(user_id))
+    }
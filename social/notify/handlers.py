@@ -0,0 +1,28 @@
+# notify/handlers.py
+"""
+Уведомления из outbox (outbox/events.py): события пишут views и сброс
+буфера лайков, группы заводит `manage.py outbox_worker`.
+
+Повтор события безопасен: актёр, который уже есть в выборке группы,
+count не увеличивает (notify/coalesce.py).
+"""
+from outbox.events import handler
+from .coalesce import notify
+
+
+@handler("like")
+def post_liked(payload):
+    """payload: author — автор поста, post, actors — кто лайкнул (по порядку)."""
+    notify(payload["author"], "like", payload["actors"], post_id=payload["post"])
+
+
+@handler("comment")
+def post_commented(payload):
+    """payload: author — автор поста, post, actors — автор комментария."""
+    notify(payload["author"], "comment", payload["actors"], post_id=payload["post"])
+
+
+@handler("follow")
+def new_follower(payload):
+    """payload: user — на кого подписались, actors — подписчики."""
+    notify(payload["user"], "follow", payload["actors"])
@@ -0,0 +1,76 @@
+# notify/inbox.py
+"""
+Чтение уведомлений: что непрочитано, страницы списка, «прочитать всё»
+и чистка старых.
+
+«Прочитать всё» — не UPDATE по каждой строке, а знак ReadMarker: всё,
+что обновлялось не позже read_before, считается прочитанным. Поэтому
+«непрочитанное» — это is_read=False И updated_at > знака (индекс
+notify_unread_idx), и склейка (notify/coalesce.py) не дописывает в
+группы, оставшиеся за знаком.
+"""
+from django.db.models import F, Q
+from django.utils import timezone
+
+from network.pagination import keyset_page
+from .models import Notification, ReadMarker
+
+
+def read_before(user_id):
+    """Знак «прочитать всё» пользователя или None."""
+    return ReadMarker.objects.filter(user_id=user_id).values_list("read_before", flat=True).first()
+
+
+def unread(user_id, marker=None):
+    qs = Notification.objects.filter(to_user_id=user_id, is_read=False)
+    marker = marker if marker is not None else read_before(user_id)
+    if marker is not None:
+        qs = qs.filter(updated_at__gt=marker)
+    return qs
+
+
+def count_unread(user_id):
+    return unread(user_id).count()
+
+
+def mark_all_read(user_id):
+    """Один upsert знака вместо записи в каждую строку."""
+    ReadMarker.objects.update_or_create(user_id=user_id, defaults={"read_before": timezone.now()})
+
+
+def page(user_id, cursor, size):
+    """
+    Страница списка по курсору (updated_at, id) — диапазон по notify_inbox_idx.
+    У групп проставлено .unread. Возвращает (items, next_cursor).
+    """
+    items, next_cursor = keyset_page(
+        Notification.objects.filter(to_user_id=user_id), cursor, size, time_field="updated_at"
+    )
+    marker = read_before(user_id)
+    for n in items:
+        n.unread = not n.is_read and (marker is None or n.updated_at > marker)
+    return items, next_cursor
+
+
+def prune(older_than, batch_size=1000, dry_run=False):
+    """
+    Удалить прочитанные уведомления, не обновлявшиеся дольше `older_than`
+    (timedelta). Идём по id с курсором: берём следующие `batch_size`
+    подходящих id и удаляем только их — каждое DELETE короткое, а пустые
+    промежутки id не стоят ни одного запроса. Возвращает число строк.
+    """
+    cutoff = timezone.now() - older_than
+    read = Q(is_read=True) | Q(updated_at__lte=F("to_user__notify_marker__read_before"))
+    stale = Notification.objects.filter(read, updated_at__lt=cutoff)
+
+    removed, last_pk = 0, 0
+    while True:
+        ids = list(stale.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return removed
+        if dry_run:
+            removed += len(ids)
+        else:
+            _, per_model = Notification.objects.filter(pk__in=ids).delete()
+            removed += per_model.get(Notification._meta.label, 0)  # без строк NotificationActor
+        last_pk = ids[-1]
@@ -0,0 +1,52 @@
+# notify/live.py
+"""
+Живые уведомления: события в канал пользователя (social/pubsub.py) и
+их превращение в SSE для потока notify_events.
+
+Публикуется только факт (новое уведомление / что-то прочитано);
+число непрочитанных поток считает сам при отправке — через кэш значков
+(social/badges.py), то есть платит только тот, у кого открыта вкладка.
+"""
+from asgiref.sync import sync_to_async
+
+from social import badges, pubsub
+from .inbox import count_unread
+
+
+def channel(user_id):
+    return f"notify:{user_id}"
+
+
+def notification_created(n):
+    pubsub.publish(
+        channel(n.to_user_id),
+        {
+            "type": "notification",
+            "id": n.pk,
+            "verb": n.verb,
+            "actor_id": n.actor_id,
+            "post_id": n.post_id,
+            "count": n.count,
+        },
+    )
+
+
+def badge_changed(user_id):
+    pubsub.publish(channel(user_id), {"type": "badge"})
+
+
+def _unread(user_id):
+    return badges.count("notify", user_id, lambda: count_unread(user_id))
+
+
+def events_for(user_id):
+    """initial/render для pubsub.stream: значок сразу и после каждого события."""
+
+    async def badge():
+        return [("badge", {"unread": await sync_to_async(_unread)(user_id)})]
+
+    async def render(message):
+        events = [] if message["type"] == "badge" else [(message["type"], message)]
+        return events + await badge()
+
+    return {"initial": badge, "render": render}
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notify import inbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет прочитанные уведомления (в т. ч. «прочитать всё»), которые не "
+        "обновлялись дольше --days дней, пачками по --batch-size. Запускать по cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=getattr(settings, "NOTIFY_RETENTION_DAYS", 90)
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Только посчитать.")
+
+    def handle(self, *args, days, batch_size, dry_run, **options):
+        removed = inbox.prune(timedelta(days=days), batch_size=batch_size, dry_run=dry_run)
+        verb = "к удалению" if dry_run else "удалено"
+        self.stdout.write(self.style.SUCCESS(f"Уведомлений {verb}: {removed}"))
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:55
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_groups(apps, schema_editor):
+    """Старые строки — группы из одного события."""
+    Notification = apps.get_model('notify', 'Notification')
+    Notification.objects.update(updated_at=F('created_at'))
+    for n in Notification.objects.filter(actor__isnull=False).only('pk', 'actor_id').iterator():
+        Notification.objects.filter(pk=n.pk).update(actor_ids=[n.actor_id])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notify', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='notification',
+            options={'ordering': ['-updated_at']},
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='actor_ids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_groups, reverse_code=migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['to_user', 'verb', 'post_id', '-updated_at'], name='notify_group_idx'),
+        ),
+    ]
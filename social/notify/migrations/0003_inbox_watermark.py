@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_user_avatar_variants'),
+        ('notify', '0002_notification_groups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadMarker',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notify_marker', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('read_before', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['to_user', 'is_read', 'updated_at'], name='notify_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['to_user', '-updated_at', '-id'], name='notify_inbox_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_actors(apps, schema_editor):
+    # для старых групп известна только выборка actor_ids (и actor у одиночных)
+    Notification = apps.get_model("notify", "Notification")
+    NotificationActor = apps.get_model("notify", "NotificationActor")
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    existing = set(User.objects.values_list("pk", flat=True))
+    rows = []
+    for pk, actor_ids, actor_id in Notification.objects.values_list("pk", "actor_ids", "actor_id").iterator():
+        ids = set(actor_ids or []) | ({actor_id} if actor_id else set())
+        rows.extend(NotificationActor(group_id=pk, user_id=u) for u in ids & existing)
+    NotificationActor.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notify', '0003_inbox_watermark'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationActor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='actor_rows', to='notify.notification')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('group', 'user'), name='unique_notification_actor')],
+            },
+        ),
+        migrations.RunPython(fill_actors, reverse_code=migrations.RunPython.noop),
+    ]
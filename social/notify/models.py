@@ -1,14 +1,62 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class Notification(models.Model):
+    """
+    Уведомление — группа однотипных событий: (получатель, verb, пост) в
+    пределах окна NOTIFY_GROUP_WINDOW, пока группа не прочитана
+    (notify/coalesce.py). actor — последний, actor_ids — выборка последних
+    актёров (не больше NOTIFY_ACTOR_SAMPLE), count — сколько всего
+    разных актёров (их список — NotificationActor).
+
+    Прочитано: is_read (отмечено по одному) или updated_at не позже
+    знака ReadMarker получателя («прочитать всё») — см. notify/inbox.py.
+    """
     to_user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications')
     verb = models.CharField(max_length=50)  # 'comment', 'follow'
     actor = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='actor_notifications')
     post_id = models.IntegerField(null=True, blank=True)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # последнее событие группы — порядок списка и окно склейки
+    updated_at = models.DateTimeField(default=timezone.now)
+    count = models.PositiveIntegerField(default=1)
+    actor_ids = models.JSONField(default=list, blank=True)
 
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-updated_at']
+        indexes = [
+            # поиск открытой группы при записи
+            models.Index(fields=['to_user', 'verb', 'post_id', '-updated_at'], name='notify_group_idx'),
+            # непрочитанные после знака — значок в навбаре
+            models.Index(fields=['to_user', 'is_read', 'updated_at'], name='notify_unread_idx'),
+            # страницы списка по курсору (updated_at, id)
+            models.Index(fields=['to_user', '-updated_at', '-id'], name='notify_inbox_idx'),
+        ]
+
+
+class NotificationActor(models.Model):
+    """
+    Кто уже есть в группе — все различные актёры, а не только выборка
+    actor_ids: count группы считает людей, и повтор от актёра, выпавшего
+    из выборки, его не увеличивает (notify/coalesce.py).
+    """
+    group = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='actor_rows')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['group', 'user'], name='unique_notification_actor'),
+        ]
+
+
+class ReadMarker(models.Model):
+    """«Прочитать всё»: всё, что обновлялось не позже read_before, прочитано."""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='notify_marker'
+    )
+    read_before = models.DateTimeField()
 
+    def __str__(self):
+        return f"{self.user}: прочитано до {self.read_before:%d.%m.%Y %H:%M}"
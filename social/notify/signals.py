@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from social import badges
+from . import live
+from .models import Notification
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def notification_badge(sender, instance, **kwargs):
+    badges.forget("notify", [instance.to_user_id])
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def notification_live(sender, instance, created=False, update_fields=None, **kwargs):
+    # после notification_badge: к публикации (после коммита) кэш значка уже сброшен
+    if created or (update_fields and "updated_at" in update_fields):  # новая группа или новое событие в ней
+        live.notification_created(instance)
+    else:
+        live.badge_changed(instance.to_user_id)
@@ -1,4 +1,9 @@
-from django.test import TestCase
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from network.models import Post, Comment
@@ -17,6 +22,8 @@ class NotificationTests(TestCase):
         self.client.login(username="alice", password="pass123")
         url = reverse("toggle_like_ajax", args=[self.post.pk])
         self.client.post(url, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertIsNone(Notification.objects.filter(to_user=self.b).first())  # ещё в outbox
+        call_command("outbox_worker", "--once", "--workers=0", stdout=StringIO())
         n = Notification.objects.filter(to_user=self.b, verb="like", post_id=self.post.id).first()
         self.assertIsNotNone(n)
         self.assertEqual(n.actor, self.a)
@@ -25,6 +32,132 @@ class NotificationTests(TestCase):
         self.client.login(username="alice", password="pass123")
         url = reverse("add_comment", args=[self.post.pk])
         self.client.post(url, {"text": "nice"}, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        call_command("outbox_worker", "--once", "--workers=0", stdout=StringIO())
         n = Notification.objects.filter(to_user=self.b, verb="comment", post_id=self.post.id).first()
         self.assertIsNotNone(n)
         self.assertEqual(n.actor, self.a)
+
+    async def test_events_stream_badge(self):
+        from asgiref.sync import sync_to_async
+        from social import badges
+
+        await sync_to_async(badges.forget)("notify", [self.b.pk])  # id переживают откат теста
+        await self.async_client.aforce_login(self.b)
+        resp = await self.async_client.get(reverse("notify_events"))
+        self.assertEqual(resp["Content-Type"], "text/event-stream")
+        events = aiter(resp.streaming_content)
+        await anext(events)  # retry:
+        self.assertIn('"unread": 0', (await anext(events)).decode())
+
+        def notify():
+            with self.captureOnCommitCallbacks(execute=True):
+                return Notification.objects.create(to_user=self.b, verb="follow", actor=self.a)
+
+        n = await sync_to_async(notify)()
+        chunk = (await anext(events)).decode()
+        self.assertIn("event: notification", chunk)
+        self.assertIn(f'"id": {n.pk}', chunk)
+        self.assertIn('"unread": 1', (await anext(events)).decode())
+
+        def read():
+            with self.captureOnCommitCallbacks(execute=True):
+                n.is_read = True
+                n.save(update_fields=["is_read"])
+
+        await sync_to_async(read)()
+        self.assertIn('"unread": 0', (await anext(events)).decode())
+        await events.aclose()
+
+    async def test_slow_subscriber_gets_resync(self):
+        import asyncio
+        from social import pubsub
+
+        broker = pubsub.LocalBroker()
+        with broker.subscribe(["notify:1"], maxsize=2) as sub:
+            for i in range(3):  # очередь на двоих: третий не влезает
+                broker.publish("notify:1", {"type": "badge", "i": i})
+            await asyncio.sleep(0)  # доставка идёт через call_soon_threadsafe
+            self.assertTrue(sub.overflowed)
+            self.assertEqual((await sub.get(timeout=0.1))[1]["i"], 0)
+        self.assertEqual(broker.publish("notify:1", {"type": "badge"}), 0)  # отписан
+
+    def test_likes_coalesce_into_one_group(self):
+        from notify.coalesce import notify
+
+        fans = [User.objects.create_user(username=f"fan{i}", password="pass123") for i in range(5)]
+        for fan in fans:
+            notify(self.b.id, "like", [fan.id], post_id=self.post.id)
+        notify(self.b.id, "like", [fans[-1].id], post_id=self.post.id)  # повтор того же актёра
+
+        group = Notification.objects.get(to_user=self.b, verb="like")
+        self.assertEqual(group.count, 5)
+        self.assertEqual(group.actor_ids, [fans[4].id, fans[3].id, fans[2].id])
+        self.assertEqual(group.actor, fans[4])
+
+        self.client.login(username="bob", password="pass123")
+        resp = self.client.get(reverse("notify_inbox"))
+        self.assertContains(resp, "@fan4")
+        self.assertContains(resp, "и ещё 2")
+        self.assertNotContains(resp, "@fan0")
+
+        # повтор от актёра, выпавшего из выборки, людей не прибавляет
+        notify(self.b.id, "like", [fans[0].id], post_id=self.post.id)
+        group.refresh_from_db()
+        self.assertEqual(group.count, 5)
+        self.assertEqual(group.actor_ids, [fans[0].id, fans[4].id, fans[3].id])
+
+        # прочитанная группа закрыта: следующий лайк — новая
+        self.client.get(reverse("notify_read", args=[group.pk]))
+        notify(self.b.id, "like", [self.a.id], post_id=self.post.id)
+        self.assertEqual(Notification.objects.filter(to_user=self.b, verb="like").count(), 2)
+
+    @override_settings(NOTIFY_PAGE_SIZE=2)
+    def test_inbox_pages_read_all_and_prune(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+        from notify.context_processors import count_unread
+
+        posts = [Post.objects.create(author=self.b, text=f"p{i}") for i in range(5)]
+        for p in posts:
+            Notification.objects.create(to_user=self.b, verb="like", actor=self.a, post_id=p.id, actor_ids=[self.a.id])
+        self.client.login(username="bob", password="pass123")
+
+        resp = self.client.get(reverse("notify_inbox"))
+        self.assertEqual(len(resp.context["items"]), 2)
+        seen, cursor = 2, resp.context["next_cursor"]
+        while cursor:
+            resp = self.client.get(reverse("notify_inbox"), {"cursor": cursor})
+            seen += len(resp.context["items"])
+            cursor = resp.context["next_cursor"]
+        self.assertEqual(seen, 5)
+
+        self.assertEqual(count_unread(self.b.id), 5)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(reverse("notify_read_all"))
+        # только upsert знака — строки уведомлений не трогаем
+        self.assertFalse([q for q in ctx.captured_queries if "notify_notification" in q["sql"]])
+        self.assertEqual(count_unread(self.b.id), 0)
+        self.assertFalse(any(n.unread for n in self.client.get(reverse("notify_inbox")).context["items"]))
+
+        # новое событие после знака — непрочитанное и в новой группе
+        from notify.coalesce import notify
+        fresh = notify(self.b.id, "like", [self.a.id], post_id=posts[0].id)
+        self.assertEqual(count_unread(self.b.id), 1)
+
+        # прочитанные знаком и давно не обновлявшиеся — удаляются пачками, свежая группа остаётся
+        Notification.objects.exclude(pk=fresh.pk).update(updated_at=timezone.now() - timedelta(days=100))
+        out = StringIO()
+        call_command("prune_notifications", "--days=90", "--batch-size=2", stdout=out)
+        self.assertIn("удалено: 5", out.getvalue())
+        self.assertEqual(list(Notification.objects.filter(to_user=self.b)), [fresh])
+
+        # редкие id не стоят запросов на каждый пустой промежуток
+        from notify import inbox
+        Notification.objects.create(
+            pk=10**9, to_user=self.b, verb="follow", actor=self.a, actor_ids=[self.a.id], is_read=True
+        )
+        Notification.objects.filter(pk=10**9).update(updated_at=timezone.now() - timedelta(days=100))
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(inbox.prune(timedelta(days=90), batch_size=2), 1)
+        self.assertLess(len(ctx.captured_queries), 10)
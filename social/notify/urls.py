@@ -4,4 +4,6 @@ from . import views
 urlpatterns = [
     path('', views.inbox, name='notify_inbox'),
     path('read/<int:pk>/', views.mark_read, name='notify_read'),
+    path('read-all/', views.mark_all_read, name='notify_read_all'),
+    path('events/', views.events, name='notify_events'),
 ]
\ No newline at end of file
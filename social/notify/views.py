@@ -1,11 +1,24 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, render, redirect
+from django.views.decorators.http import require_POST
+
+from network.pagination import get_page_size
+from social import badges, pubsub
+from . import inbox as notify_inbox, live
+from .coalesce import actors_for
 from .models import Notification
 
 @login_required
 def inbox(request):
-    qs = Notification.objects.filter(to_user=request.user).select_related('actor')
-    return render(request, 'notify/inbox.html', {'items': qs})
+    size = get_page_size(request, getattr(settings, 'NOTIFY_PAGE_SIZE', 20))
+    items, next_cursor = notify_inbox.page(request.user.id, request.GET.get('cursor'), size)
+    # группы: выборка актёров всех строк страницы — одним запросом
+    return render(
+        request,
+        'notify/inbox.html',
+        {'items': actors_for(items), 'next_cursor': next_cursor},
+    )
 
 @login_required
 def mark_read(request, pk):
@@ -13,3 +26,23 @@ def mark_read(request, pk):
     n.is_read = True
     n.save(update_fields=['is_read'])
     return redirect('notify_inbox')
+
+
+@login_required
+@require_POST
+def mark_all_read(request):
+    notify_inbox.mark_all_read(request.user.id)
+    badges.forget("notify", [request.user.id])
+    live.badge_changed(request.user.id)
+    return redirect('notify_inbox')
+
+
+@login_required
+async def events(request):
+    """
+    SSE-поток уведомлений вкладки: `notification` (новое), `badge`
+    ({unread} — сразу при подключении и после каждого события), `resync`.
+    Одно долгое соединение вместо перезагрузок страницы ради значка.
+    """
+    user = await request.auser()
+    return pubsub.event_stream_response(request, [live.channel(user.pk)], **live.events_for(user.pk))
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import OutboxEvent
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'attempts', 'available_at', 'updated_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('created_at', 'updated_at')
@@ -0,0 +1,179 @@
+# outbox/events.py
+"""
+Транзакционный outbox: побочные эффекты действий — после коммита, с повтором.
+
+View записывает доменное событие (лайк, комментарий, подписка,
+сообщение) одной вставкой в той же транзакции, что и само действие
+(record), — событие есть ровно тогда, когда закоммичено действие.
+Обработчики (уведомления, счётчики диалогов и т. п.) регистрируются
+декоратором @handler(kind) в ready() своих приложений и выполняются
+после коммита — в процессе запроса или в `manage.py outbox_worker`,
+который забирает события пачкой и раздаёт пулу потоков.
+
+Доставка «хотя бы один раз»: упавший обработчик повторяется (до
+OUTBOX_MAX_ATTEMPTS, с паузой OUTBOX_RETRY_DELAY·2^(попытка−1) сек), а
+событие, зависшее в processing (воркер упал), через OUTBOX_TIMEOUT
+возвращается в очередь. Поэтому обработчик должен спокойно переносить
+повтор. Отработавшие обработчики запоминаются в handled и при повторе
+события пропускаются.
+
+OUTBOX_ASYNC=True — в запросе только вставка события, всё разбирает
+воркер. Это требует общего PUBSUB_BROKER и BADGE_CACHE (см. check_shared),
+а в стандартной конфигурации они в памяти процесса: публикация из воркера
+не дошла бы до SSE-потоков веб-процесса. Поэтому по умолчанию
+OUTBOX_ASYNC=False: событие разбирается сразу после коммита в процессе
+запроса (ответ ждёт обработчиков), воркер только повторяет неудавшиеся.
+Сбой разбора после коммита ответ не роняет — событие остаётся воркеру.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+log = logging.getLogger(__name__)
+
+_handlers = defaultdict(list)  # kind -> [функция(payload)]
+
+
+def handler(kind):
+    """Декоратор: функция(payload) обрабатывает события вида `kind`."""
+    def register(func):
+        if func not in _handlers[kind]:
+            _handlers[kind].append(func)
+        return func
+    return register
+
+
+def handlers_for(kind):
+    return list(_handlers.get(kind, ()))
+
+
+def _name(func):
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+def is_async():
+    return getattr(settings, "OUTBOX_ASYNC", False)
+
+
+def record(kind, **payload):
+    """
+    Записать событие в текущей транзакции. Возвращает событие.
+    Вид без обработчиков — ValueError: опечатка или забытый @handler.
+    """
+    if not _handlers.get(kind):
+        raise ValueError(f"нет обработчиков для событий {kind!r}")
+    event = OutboxEvent.objects.create(kind=kind, payload=payload)
+    if not is_async():
+        transaction.on_commit(lambda: dispatch_now(event.pk))
+    return event
+
+
+def dispatch_now(event_id):
+    """
+    Разобрать одно событие прямо здесь (OUTBOX_ASYNC=False). Действие уже
+    закоммичено, поэтому ошибка только пишется в лог: событие остаётся в
+    pending (или вернётся из processing через OUTBOX_TIMEOUT) — для воркера.
+    """
+    try:
+        if _take(event_id):
+            deliver(OutboxEvent.objects.get(pk=event_id))
+    except Exception:
+        log.exception("событие %s не разобрано после коммита, остаётся воркеру", event_id)
+
+
+# ---------- воркер ----------
+
+def check_shared():
+    """
+    Причины, по которым отдельный процесс-воркер не донесёт побочные
+    эффекты до веб-процессов: брокер и кэш значков в памяти процесса.
+    """
+    from django.core.cache import caches
+    from django.core.cache.backends.locmem import LocMemCache
+
+    from social import pubsub
+
+    problems = []
+    if isinstance(pubsub.get_broker(), pubsub.LocalBroker):
+        problems.append("PUBSUB_BROKER — LocalBroker (события в пределах процесса)")
+    if isinstance(caches[getattr(settings, "BADGE_CACHE", "default")], LocMemCache):
+        problems.append("BADGE_CACHE — LocMemCache (кэш в памяти процесса)")
+    return problems
+
+
+def requeue_stale():
+    """Вернуть в очередь события, зависшие в processing (воркер упал)."""
+    timeout = getattr(settings, "OUTBOX_TIMEOUT", 60)
+    return OutboxEvent.objects.filter(
+        status=OutboxEvent.Status.PROCESSING,
+        updated_at__lt=timezone.now() - timedelta(seconds=timeout),
+    ).update(status=OutboxEvent.Status.PENDING, updated_at=timezone.now())
+
+
+def _take(event_id):
+    """Условный UPDATE … WHERE status='pending': событие берёт только один воркер."""
+    return OutboxEvent.objects.filter(pk=event_id, status=OutboxEvent.Status.PENDING).update(
+        status=OutboxEvent.Status.PROCESSING,
+        attempts=F("attempts") + 1,
+        updated_at=timezone.now(),
+    )
+
+
+def claim(limit):
+    """Забрать до `limit` событий, чья пауза перед повтором истекла."""
+    pending = OutboxEvent.objects.filter(
+        status=OutboxEvent.Status.PENDING, available_at__lte=timezone.now()
+    ).order_by("id")
+    claimed = [pk for pk in pending.values_list("id", flat=True)[:limit] if _take(pk)]
+    return list(OutboxEvent.objects.filter(pk__in=claimed).order_by("id"))
+
+
+def _finish(event, status, handled, error="", available_at=None):
+    event.status, event.handled, event.error = status, handled, error
+    fields = ["status", "handled", "error", "updated_at"]
+    if available_at is not None:
+        event.available_at = available_at
+        fields.append("available_at")
+    event.save(update_fields=fields)
+
+
+def deliver(event):
+    """
+    Выполнить ещё не отработавшие обработчики события. True — все
+    отработали (done); иначе событие уходит на повтор или в failed.
+    """
+    handled = list(event.handled)
+    try:
+        for func in handlers_for(event.kind):
+            name = _name(func)
+            if name not in handled:
+                func(event.payload)
+                handled.append(name)
+    except Exception as exc:
+        log.warning("событие %s (%s) не обработано: %r", event.pk, event.kind, exc)
+        if event.attempts >= getattr(settings, "OUTBOX_MAX_ATTEMPTS", 5):
+            _finish(event, OutboxEvent.Status.FAILED, handled, repr(exc))
+        else:
+            delay = getattr(settings, "OUTBOX_RETRY_DELAY", 5) * 2 ** (event.attempts - 1)
+            _finish(
+                event, OutboxEvent.Status.PENDING, handled, repr(exc),
+                available_at=timezone.now() + timedelta(seconds=delay),
+            )
+        return False
+    _finish(event, OutboxEvent.Status.DONE, handled)
+    return True
+
+
+def prune(older_than):
+    """Удалить разобранные события старше `older_than` (timedelta). Возвращает число."""
+    deleted, _ = OutboxEvent.objects.filter(
+        status=OutboxEvent.Status.DONE, updated_at__lt=timezone.now() - older_than
+    ).delete()
+    return deleted
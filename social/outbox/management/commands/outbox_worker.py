@@ -0,0 +1,74 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from outbox import events
+
+
+def _deliver(event):
+    # у каждого потока пула своё соединение с БД: закрываем, если пора
+    try:
+        return events.deliver(event)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = (
+        "Разбирает outbox (OutboxEvent): уведомления и прочие побочные эффекты "
+        "лайков, комментариев, подписок, сообщений — в пуле потоков, с повтором при сбое."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=getattr(settings, "OUTBOX_WORKER_THREADS", 4),
+            help="Потоков в пуле; 0 — обрабатывать в этом же потоке.",
+        )
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--poll", type=float, default=0.5, help="Пауза при пустой очереди, сек.")
+        parser.add_argument("--once", action="store_true", help="Разобрать очередь и выйти.")
+
+    def handle(self, *args, workers, batch_size, poll, once, **options):
+        problems = events.check_shared()
+        if problems and events.is_async():
+            raise CommandError(
+                "OUTBOX_ASYNC=True требует общего брокера и кэша: " + "; ".join(problems)
+                + ". Иначе живые уведомления и значки не дойдут до веб-процессов."
+            )
+        if problems:
+            # события разбираются в веб-процессах; здесь — только повторы
+            self.stdout.write("OUTBOX_ASYNC=False: воркер только повторяет неудавшиеся события.")
+        if connection.vendor == "sqlite" and workers > 1:
+            # у SQLite один писатель: параллельные транзакции падают с
+            # "database is locked" и уходят на повтор — потоков нет смысла держать больше одного
+            self.stdout.write("SQLite: обработка в одном потоке.")
+            workers = 1
+        pool = ThreadPoolExecutor(workers) if workers > 0 else None
+        keep = timedelta(hours=getattr(settings, "OUTBOX_RETENTION_HOURS", 24))
+        done = failed = 0
+        try:
+            while True:
+                events.requeue_stale()
+                batch = events.claim(batch_size)
+                if not batch:
+                    events.prune(keep)
+                    if once:
+                        break
+                    time.sleep(poll)
+                    continue
+                if pool is None:
+                    results = [events.deliver(event) for event in batch]
+                else:
+                    results = list(pool.map(_deliver, batch))
+                done += sum(results)
+                failed += len(results) - sum(results)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        self.stdout.write(self.style.SUCCESS(f"Обработано: {done}, с ошибкой: {failed}"))
@@ -0,0 +1,37 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxEvent(models.Model):
+    """
+    Доменное событие (лайк, комментарий, подписка, сообщение), записанное
+    в той же транзакции, что и само действие, — очередь в БД для
+    `manage.py outbox_worker` (outbox/events.py).
+
+    handled — обработчики, которые уже отработали: при повторе после
+    сбоя они пропускаются. available_at — не раньше этого момента
+    (пауза перед повтором).
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        PROCESSING = 'processing', 'Обрабатывается'
+        DONE = 'done', 'Готово'
+        FAILED = 'failed', 'Ошибка'
+
+    kind = models.CharField(max_length=30)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    handled = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at', 'id'], name='outbox_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}#{self.pk} [{self.status}]"
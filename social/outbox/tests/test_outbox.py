@@ -0,0 +1,175 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from notify.models import Notification
+from outbox import events
+from outbox.models import OutboxEvent
+
+User = get_user_model()
+
+
+def run_worker():
+    call_command("outbox_worker", "--once", "--workers=0", stdout=StringIO())
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.a = User.objects.create_user(username="alice", password="pass123")
+        self.b = User.objects.create_user(username="bob", password="pass123")
+        self.calls = []
+
+    def tearDown(self):
+        events._handlers.pop("test", None)
+
+    def test_follow_records_event_and_worker_notifies_once(self):
+        self.client.login(username="alice", password="pass123")
+        self.client.post(reverse("toggle_follow", args=[self.b.username]))
+        event = OutboxEvent.objects.get(kind="follow")
+        self.assertEqual(event.payload, {"user": self.b.id, "actors": [self.a.id]})
+        self.assertFalse(Notification.objects.exists())
+
+        run_worker()
+        event.refresh_from_db()
+        self.assertEqual(event.status, OutboxEvent.Status.DONE)
+        n = Notification.objects.get(to_user=self.b, verb="follow")
+        self.assertEqual((n.actor, n.count), (self.a, 1))
+
+        # повторная доставка (воркер упал до отметки done) уведомление не дублирует
+        event.status = OutboxEvent.Status.PENDING
+        event.handled = []
+        event.save()
+        run_worker()
+        n.refresh_from_db()
+        self.assertEqual(n.count, 1)
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_failed_handler_is_retried_alone_with_backoff(self):
+        @events.handler("test")
+        def first(payload):
+            self.calls.append("first")
+
+        @events.handler("test")
+        def flaky(payload):
+            self.calls.append("flaky")
+            if self.calls.count("flaky") == 1:
+                raise RuntimeError("сбой")
+
+        event = events.record("test", x=1)
+        with self.assertLogs("outbox.events", "WARNING"):
+            run_worker()
+        event.refresh_from_db()
+        self.assertEqual(event.status, OutboxEvent.Status.PENDING)
+        self.assertEqual(event.attempts, 1)
+        self.assertIn("сбой", event.error)
+        self.assertGreater(event.available_at, timezone.now())
+        self.assertEqual(self.calls, ["first", "flaky"])
+
+        run_worker()  # пауза перед повтором не вышла
+        self.assertEqual(len(self.calls), 2)
+
+        OutboxEvent.objects.filter(pk=event.pk).update(available_at=timezone.now())
+        run_worker()
+        event.refresh_from_db()
+        self.assertEqual(event.status, OutboxEvent.Status.DONE)
+        self.assertEqual(self.calls, ["first", "flaky", "flaky"])  # first не повторялся
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=2, OUTBOX_RETRY_DELAY=0)
+    def test_gives_up_after_max_attempts(self):
+        @events.handler("test")
+        def broken(payload):
+            raise RuntimeError("всегда")
+
+        event = events.record("test")
+        with self.assertLogs("outbox.events", "WARNING") as logs:
+            run_worker()  # две попытки подряд: пауза нулевая
+        self.assertEqual(len(logs.output), 2)
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.attempts), (OutboxEvent.Status.FAILED, 2))
+
+    def test_stale_processing_is_requeued(self):
+        event = events.record("follow", user=self.b.id, actors=[self.a.id])
+        OutboxEvent.objects.filter(pk=event.pk).update(status=OutboxEvent.Status.PROCESSING)
+        self.assertEqual(events.requeue_stale(), 0)  # ещё не истёк OUTBOX_TIMEOUT
+        with override_settings(OUTBOX_TIMEOUT=0):
+            self.assertEqual(events.requeue_stale(), 1)
+        run_worker()
+        self.assertTrue(Notification.objects.filter(to_user=self.b, verb="follow").exists())
+
+    @override_settings(OUTBOX_ASYNC=False)
+    def test_sync_mode_dispatches_on_commit(self):
+        from network.models import Post
+
+        post = Post.objects.create(author=self.b, text="hello")
+        self.client.login(username="alice", password="pass123")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("toggle_like_ajax", args=[post.pk]), HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertTrue(Notification.objects.filter(to_user=self.b, verb="like", post_id=post.pk).exists())
+        self.assertEqual(OutboxEvent.objects.get().status, OutboxEvent.Status.DONE)
+
+    @override_settings(OUTBOX_ASYNC=False)
+    def test_dispatch_failure_after_commit_leaves_event_to_worker(self):
+        from unittest import mock
+
+        self.client.login(username="alice", password="pass123")
+        with mock.patch("outbox.events.deliver", side_effect=RuntimeError("нет БД")):
+            with self.assertLogs("outbox.events", "ERROR"):
+                with self.captureOnCommitCallbacks(execute=True):
+                    resp = self.client.post(reverse("toggle_follow", args=[self.b.username]))
+        self.assertEqual(resp.status_code, 302)  # подписка закоммичена — ответ не 500
+        self.assertEqual(OutboxEvent.objects.get().status, OutboxEvent.Status.PROCESSING)
+
+        with override_settings(OUTBOX_TIMEOUT=0):
+            events.requeue_stale()
+        run_worker()
+        self.assertTrue(Notification.objects.filter(to_user=self.b, verb="follow").exists())
+
+    def test_kind_without_handlers_is_an_error(self):
+        with self.assertRaises(ValueError):
+            events.record("nosuch", user=self.a.id)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    @override_settings(OUTBOX_ASYNC=True)
+    def test_async_worker_refuses_process_local_broker(self):
+        from django.core.management.base import CommandError
+
+        with self.assertRaisesMessage(CommandError, "LocalBroker"):
+            run_worker()
+
+    async def test_like_from_worker_reaches_notify_stream(self):
+        from asgiref.sync import sync_to_async
+        from network.models import Post
+        from social import badges
+
+        await sync_to_async(badges.forget)("notify", [self.b.pk])
+        post = await Post.objects.acreate(author=self.b, text="hello")
+        await self.async_client.aforce_login(self.b)
+        resp = await self.async_client.get(reverse("notify_events"))
+        stream = aiter(resp.streaming_content)
+        await anext(stream)  # retry:
+        self.assertIn('"unread": 0', (await anext(stream)).decode())
+
+        def like_and_dispatch():
+            events.record("like", author=self.b.id, post=post.pk, actors=[self.a.id])
+            with self.captureOnCommitCallbacks(execute=True):  # публикация — после коммита
+                run_worker()
+
+        await sync_to_async(like_and_dispatch)()
+        chunk = (await anext(stream)).decode()
+        self.assertIn("event: notification", chunk)
+        self.assertIn(f'"post_id": {post.pk}', chunk)
+        self.assertIn('"unread": 1', (await anext(stream)).decode())
+        await stream.aclose()
+
+    def test_prune_keeps_pending(self):
+        done = events.record("follow", user=self.b.id, actors=[self.a.id])
+        pending = events.record("follow", user=self.a.id, actors=[self.b.id])
+        OutboxEvent.objects.filter(pk=done.pk).update(status=OutboxEvent.Status.DONE)
+        OutboxEvent.objects.update(updated_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(events.prune(timedelta(hours=24)), 1)
+        self.assertEqual(list(OutboxEvent.objects.values_list("pk", flat=True)), [pending.pk])
@@ -0,0 +1,51 @@
+# social/badges.py
+"""
+Счётчики для значков в навбаре (непрочитанные сообщения, уведомления).
+
+Значение лежит в кэше (алиас BADGE_CACHE) под ключом badge:<вид>:<user_id>
+и считается запросом только при промахе. Любая запись, меняющая счётчик
+(новое сообщение/уведомление, прочтение), вызывает forget(): ключ
+удаляется сразу и ещё раз после коммита — иначе соседний запрос мог бы
+успеть положить в кэш значение, посчитанное до коммита. BADGE_CACHE_TTL
+ограничивает расхождение, если кэш локальный для процесса.
+
+Контекст-процессоры отдают lazy(): запрос (или чтение кэша) случится,
+только если шаблон действительно выводит значок, — JSON-ответы и
+партиалы через render_to_string за него не платят.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.functional import SimpleLazyObject
+
+
+def _cache():
+    return caches[getattr(settings, "BADGE_CACHE", "default")]
+
+
+def _key(kind, user_id):
+    return f"badge:{kind}:{user_id}"
+
+
+def count(kind, user_id, compute):
+    """Значение счётчика: из кэша или compute() с записью в кэш."""
+    cache = _cache()
+    value = cache.get(_key(kind, user_id))
+    if value is None:
+        value = compute()
+        cache.set(_key(kind, user_id), value, getattr(settings, "BADGE_CACHE_TTL", 300))
+    return value
+
+
+def lazy(kind, user_id, compute):
+    """Счётчик, который посчитается при первом обращении из шаблона."""
+    return SimpleLazyObject(lambda: count(kind, user_id, compute))
+
+
+def forget(kind, user_ids):
+    keys = [_key(kind, uid) for uid in set(user_ids)]
+    if not keys:
+        return
+    cache = _cache()
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,169 @@
+# social/media.py
+"""
+Раздача MEDIA_ROOT — и в разработке, и в проде (вместо static() под DEBUG).
+
+- ETag / Last-Modified и ответ 304 на условные запросы. У файлов с
+  именем по содержимому (social/storage.py) ETag — их sha256, и кэш
+  разрешён навсегда: Cache-Control: immutable на год. Остальным (и
+  копиям для srcset, которые перезаписываются на месте) —
+  MEDIA_CACHE_MAX_AGE секунд.
+- Range: один диапазон байт → 206 (докачка, перемотка видео); If-Range
+  с чужим ETag — целиком.
+- MEDIA_SENDFILE = "x-accel" (nginx) или "x-sendfile" (Apache, lighttpd):
+  Django проверяет доступ и ставит заголовки, байты отдаёт прокси.
+  Для nginx нужен internal-location с префиксом MEDIA_ACCEL_PREFIX.
+- Приватные файлы — под префиксами MEDIA_PRIVATE_PREFIXES: их пропускает
+  только хук MEDIA_ACCESS_HOOK ("модуль.функция", вызов hook(request, name)
+  → bool), и кэшируются они только в браузере.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from email.utils import formatdate
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.utils.module_loading import import_string
+from django.views.decorators.http import require_safe
+
+from . import storage as media_storage
+
+YEAR = 365 * 24 * 3600
+CHUNK = 64 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def is_private(name):
+    return any(name.startswith(p) for p in getattr(settings, "MEDIA_PRIVATE_PREFIXES", ()))
+
+
+def can_access(request, name):
+    """Публичные файлы — всем; приватные — кого пустит хук (без хука — никому)."""
+    if not is_private(name):
+        return True
+    hook = getattr(settings, "MEDIA_ACCESS_HOOK", None)
+    return bool(hook) and bool(import_string(hook)(request, name))
+
+
+def _etag(name, stat):
+    parsed = media_storage.parse(name)
+    if parsed is not None and not media_storage.is_derived(name):
+        return quote_etag(parsed[1])
+    return quote_etag(f"{int(stat.st_mtime):x}-{stat.st_size:x}")
+
+
+def _cache_control(name, private):
+    if private:
+        return "private, max-age=0, must-revalidate"
+    if media_storage.parse(name) is not None and not media_storage.is_derived(name):
+        # имя по содержимому: по этому адресу всегда те же байты
+        # (копии .wNNN.* перезаписываются на месте — им обычный max-age)
+        return f"public, max-age={YEAR}, immutable"
+    return f"public, max-age={getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600)}"
+
+
+def _byte_range(header, size):
+    """(start, end) включительно для одиночного диапазона, None — отдать целиком, False — 416."""
+    m = _RANGE_RE.match(header.replace(" ", ""))
+    if not m or size == 0:
+        return None  # несколько диапазонов и прочее — отдаём файл целиком (это допустимо)
+    first, last = m.groups()
+    if not first and not last:
+        return None
+    if not first:  # bytes=-N — последние N байт
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def _read(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _sendfile(response, name, path):
+    # старые загрузки бывают с пробелами и кириллицей в имени: в заголовке —
+    # только ASCII, прокси раскодирует %XX сам
+    mode = getattr(settings, "MEDIA_SENDFILE", None)
+    if mode == "x-accel":
+        prefix = getattr(settings, "MEDIA_ACCEL_PREFIX", "/protected-media/")
+        response["X-Accel-Redirect"] = quote(posixpath.join(prefix, name), safe="/")
+    elif mode == "x-sendfile":
+        response["X-Sendfile"] = quote(path, safe="/")
+    else:
+        return False
+    return True
+
+
+@require_safe
+def serve(request, path):
+    name = posixpath.normpath(path).lstrip("/")
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:  # выход за MEDIA_ROOT
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    private = is_private(name)
+    if not can_access(request, name):
+        raise Http404  # не выдаём, что файл существует
+
+    stat = os.stat(full_path)
+    etag, last_modified = _etag(name, stat), int(stat.st_mtime)
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or "application/octet-stream"
+
+    def headers(response):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        response["Cache-Control"] = _cache_control(name, private)
+        response["Accept-Ranges"] = "bytes"
+        return response
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return headers(not_modified)
+
+    response = HttpResponse(content_type=content_type)
+    if _sendfile(response, name, full_path):
+        return headers(response)  # Range, HEAD и сами байты — забота прокси
+
+    size = stat.st_size
+    byte_range = None
+    if "HTTP_RANGE" in request.META:
+        if_range = request.META.get("HTTP_IF_RANGE")
+        if not if_range or if_range == etag or if_range == formatdate(last_modified, usegmt=True):
+            byte_range = _byte_range(request.META["HTTP_RANGE"], size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return headers(response)
+    if byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read(full_path, start, end - start + 1), status=206, content_type=content_type
+        )
+        response["Content-Length"] = str(end - start + 1)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    else:
+        response = FileResponse(open(full_path, "rb"), content_type=content_type)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    return headers(response)
@@ -0,0 +1,180 @@
+# social/pubsub.py
+"""
+Публикация событий для открытых соединений (SSE-потоки переписки и уведомлений).
+
+Брокер раздаёт сообщения подписчикам каналов (например, "thread:42").
+Подписчик — asyncio-очередь в цикле событий ASGI-воркера; publish()
+можно звать из синхронного кода (вьюхи, сигналы, потоки): доставка идёт
+через loop.call_soon_threadsafe.
+
+LocalBroker работает в пределах одного процесса — этого хватает для
+одного узла с одним ASGI-воркером. Для нескольких процессов/узлов
+PUBSUB_BROKER указывает на класс с тем же интерфейсом
+(publish(channel, message) и subscribe(channels, maxsize) → Subscription),
+который, например, пересылает publish через Redis PUBLISH и раздаёт
+полученное локальным подписчикам.
+
+Очередь подписчика ограничена (PUBSUB_QUEUE_SIZE): медленный клиент не
+копит память, а получает overflowed=True — поток шлёт ему "resync", и
+клиент дочитывает пропущенное обычным запросом.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    def __init__(self, broker, channels, maxsize):
+        self.broker = broker
+        self.channels = tuple(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def push(self, channel, message):
+        """Из любого потока."""
+        try:
+            self.loop.call_soon_threadsafe(self._deliver, channel, message)
+        except RuntimeError:  # цикл уже закрыт — подписчик ушёл
+            self.close()
+
+    def _deliver(self, channel, message):
+        try:
+            self.queue.put_nowait((channel, message))
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout=None):
+        """(канал, сообщение) или None, если за timeout секунд ничего не пришло."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LocalBroker:
+    """Брокер в памяти процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, channels, maxsize=None):
+        if maxsize is None:
+            maxsize = getattr(settings, "PUBSUB_QUEUE_SIZE", 100)
+        sub = Subscription(self, channels, maxsize)
+        with self._lock:
+            for channel in sub.channels:
+                self._subscribers[channel].add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            for channel in sub.channels:
+                subs = self._subscribers.get(channel)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subscribers[channel]
+
+    def publish(self, channel, message):
+        with self._lock:
+            subs = list(self._subscribers.get(channel, ()))
+        for sub in subs:
+            sub.push(channel, message)
+        return len(subs)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(
+                    getattr(settings, "PUBSUB_BROKER", "social.pubsub.LocalBroker")
+                )()
+    return _broker
+
+
+def publish(channel, message):
+    """Опубликовать после коммита: подписчик не должен увидеть то, чего нет в БД."""
+    transaction.on_commit(lambda: get_broker().publish(channel, message))
+
+
+# ---------- Server-Sent Events ----------
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _as_events(message):
+    return [(message.get("type", "message"), message)]
+
+
+async def stream(channels, heartbeat=None, initial=None, render=None):
+    """
+    Тело SSE-ответа по каналам `channels`: события как `event: <type>`,
+    комментарий ": ping" раз в `heartbeat` секунд тишины (держит
+    соединение через прокси и замечает отвалившихся клиентов).
+    Переполнение очереди — "resync" и конец потока.
+
+    initial() → [(event, data)] — что отправить сразу после подписки
+    (например, текущее значение счётчика); render(message) → [(event, data)]
+    — во что превратить опубликованное сообщение. Обе — корутины.
+
+    Подписка оформляется при первом чтении — в том цикле событий, который
+    отдаёт ответ, — и снимается, когда клиент отключился.
+    """
+    if heartbeat is None:
+        heartbeat = getattr(settings, "SSE_HEARTBEAT_SECONDS", 15)
+    render = render or _as_events
+    with get_broker().subscribe(channels) as subscription:
+        yield f"retry: {getattr(settings, 'SSE_RETRY_MS', 3000)}\n\n"
+        if initial is not None:
+            for event, data in await initial():
+                yield sse(event, data)
+        while True:
+            item = await subscription.get(timeout=heartbeat)
+            if subscription.overflowed:
+                yield sse("resync", {})
+                return
+            if item is None:
+                yield ": ping\n\n"
+                continue
+            for event, data in await render(item[1]):
+                yield sse(event, data)
+
+
+def event_stream_response(request, channels, **options):
+    """
+    StreamingHttpResponse с SSE-потоком. Только под ASGI: WSGI-сервер
+    буферизовал бы бесконечный поток целиком, поэтому там — 204, после
+    которого EventSource не переподключается, а клиент опрашивает сервер.
+    """
+    from django.core.handlers.asgi import ASGIRequest
+    from django.http import HttpResponse, StreamingHttpResponse
+
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(stream(channels, **options), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: не копить поток
+    return response
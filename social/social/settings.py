@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     'network',
     'messaging',
     'notify',
+    'outbox',
 ]
 
 MIDDLEWARE = [
@@ -136,4 +137,147 @@ AUTH_USER_MODEL = 'accounts.User'
 # Куда редиректить после логина/логаута — временно на главную
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
-LOGIN_URL = 'login'
\ No newline at end of file
+LOGIN_URL = 'login'
+
+# Лента: размер страницы (keyset-пагинация) и верхняя граница для ?limit=
+FEED_PAGE_SIZE = 20
+FEED_MAX_PAGE_SIZE = 100
+# Материализованная лента «Подписки»: сколько последних постов автора
+# докладывать при подписке и размер пачки при раскладке нового поста
+TIMELINE_BACKFILL_LIMIT = 200
+TIMELINE_FANOUT_BATCH = 1000
+
+# Гибридная лента: посты авторов, у которых подписчиков не меньше порога,
+# не раскладываются по лентам, а дочитываются при открытии (pull).
+# None — только fan-out on write. Замеры: benchmarks/bench_feed.py
+FEED_FANOUT_FOLLOWER_THRESHOLD = 5000
+
+# Поиск: результатов на страницу (на SQLite — FTS5, см. network/search.py)
+SEARCH_PAGE_SIZE = 20
+
+# Подсказки пользователей (accounts/autocomplete.py): индекс в памяти процесса
+# перечитывается целиком не реже, чем раз в N секунд
+AUTOCOMPLETE_REFRESH_SECONDS = 300
+
+# Комментарии: корневых на страницу, сколько ответов на узел и уровней
+# вложенности показывать сразу (остальное — «Показать ещё» через AJAX)
+COMMENTS_PAGE_SIZE = 20
+COMMENT_REPLIES_SHOWN = 3
+COMMENT_INLINE_DEPTH = 2
+COMMENT_REPLIES_PAGE_SIZE = 20
+
+# Переписка: сколько последних сообщений показывать при открытии диалога
+# (более ранние — подгрузкой по курсору)
+MESSAGES_PAGE_SIZE = 30
+
+# События в реальном времени (social/pubsub.py, SSE — только под ASGI:
+# uvicorn social.asgi:application). LocalBroker — в пределах процесса; для
+# нескольких процессов — класс с тем же интерфейсом поверх общего брокера.
+# Очередь на подписчика, пинг при тишине (сек), пауза переподключения (мс).
+PUBSUB_BROKER = "social.pubsub.LocalBroker"
+PUBSUB_QUEUE_SIZE = 100
+SSE_HEARTBEAT_SECONDS = 15
+SSE_RETRY_MS = 3000
+
+# Лайки с отложенной записью (network/likebuffer.py): клики копятся в памяти
+# процесса и сбрасываются пачкой раз в INTERVAL секунд или по достижении MAX пар.
+# Замеры: benchmarks/bench_likes.py
+LIKES_WRITE_BEHIND = False
+LIKES_BUFFER_MAX = 500
+LIKES_BUFFER_INTERVAL = 1.0
+
+# Кэш «что я лайкнул» (network/likedset.py): алиас из CACHES и срок жизни
+# массива в секундах. С локальным кэшем (LocMem по умолчанию) TTL ограничивает
+# расхождение между процессами; с общим кэшем (Redis, Memcached) его нет.
+LIKED_SET_CACHE = "default"
+LIKED_SET_TTL = 300
+
+# Кэш отрисованных карточек постов и комментариев (network/fragments.py):
+# алиас из CACHES и срок жизни фрагмента в секундах (0 — без кэша). С локальным
+# кэшем правка поста видна другим процессам не позже чем через TTL.
+FRAGMENT_CACHE = "default"
+FRAGMENT_CACHE_TTL = 600
+
+# Значки непрочитанного в навбаре (social/badges.py): алиас из CACHES и срок
+# жизни счётчика в секундах; сбрасываются при записи сообщений/уведомлений.
+BADGE_CACHE = "default"
+BADGE_CACHE_TTL = 300
+
+# Склейка уведомлений (notify/coalesce.py): события одного вида по одному посту
+# копятся в непрочитанной группе, пока между ними меньше N секунд; в группе
+# помним последних NOTIFY_ACTOR_SAMPLE актёров
+NOTIFY_GROUP_WINDOW = 24 * 3600
+NOTIFY_ACTOR_SAMPLE = 3
+# Список уведомлений: групп на страницу; прочитанные старше N дней удаляет
+# `manage.py prune_notifications` (запускать по cron)
+NOTIFY_PAGE_SIZE = 20
+NOTIFY_RETENTION_DAYS = 90
+
+# Лента «Горячее» (network/hot.py): кандидаты — посты за последние N дней
+# (старше обнуляет `manage.py compact_hot_feed`, запускать по cron),
+# top-K кандидатов держится в памяти и перечитывается раз в N секунд.
+# Вес комментария в реакциях и шкала времени: HOT_SCORE_TIME_SCALE секунд
+# свежести равны десятикратному росту реакций.
+HOT_FEED_WINDOW_DAYS = 7
+HOT_FEED_CANDIDATES = 1000
+HOT_FEED_REFRESH_SECONDS = 60
+HOT_COMMENT_WEIGHT = 2
+HOT_SCORE_TIME_SCALE = 45000
+
+# Уменьшенные копии картинок для srcset (social/thumbnails.py): ширины в px
+# по видам картинок, качество JPEG/WebP. Уже загруженное — `manage.py generate_thumbnails`
+THUMBNAIL_WIDTHS = {
+    "posts": (320, 640, 1080),
+    "avatars": (64, 160, 320),
+}
+THUMBNAIL_QUALITY = 82
+
+# Обработка загруженных картинок (network/imagejobs.py): True — в очереди
+# ImageJob, которую разбирает `manage.py image_worker` (пул процессов);
+# False — синхронно в запросе. Зависшая в processing задача возвращается
+# в очередь через TIMEOUT секунд, после MAX_ATTEMPTS неудач — failed.
+IMAGE_PROCESSING_ASYNC = True
+IMAGE_WORKER_PROCESSES = 2
+IMAGE_JOB_TIMEOUT = 300
+IMAGE_JOB_MAX_ATTEMPTS = 3
+
+# Побочные эффекты действий (outbox/events.py): лайк, комментарий, подписка,
+# сообщение пишут событие в той же транзакции. True — в запросе только эта
+# вставка, всё разбирает воркер (пул из WORKER_THREADS потоков; на SQLite —
+# один); он не запустится без общего PUBSUB_BROKER и BADGE_CACHE (Redis и т. п.).
+# Здесь они в памяти процесса, поэтому False: событие разбирается сразу после
+# коммита в процессе запроса (ответ ждёт обработчиков, зато живые уведомления
+# и значки доходят), сбой разбора остаётся воркеру, который только повторяет.
+# Упавший обработчик повторяется через RETRY_DELAY·2^(попытка−1) сек, после
+# MAX_ATTEMPTS — failed; зависшее в processing возвращается через TIMEOUT сек,
+# разобранные события удаляются через RETENTION_HOURS.
+OUTBOX_ASYNC = False
+OUTBOX_WORKER_THREADS = 4
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_DELAY = 5
+OUTBOX_TIMEOUT = 60
+OUTBOX_RETENTION_HOURS = 24
+
+# Медиа по содержимому (social/storage.py): имя файла — sha256, два уровня
+# каталогов, одинаковые загрузки хранятся один раз. Файл удаляется, когда на
+# него не ссылается ни одна строка из MEDIA_REFERENCES; остальных сирот
+# подбирает `manage.py cleanup_media`.
+STORAGES = {
+    "default": {"BACKEND": "social.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+MEDIA_REFERENCES = [
+    ("network.Post", "image"),
+    ("accounts.User", "avatar"),
+]
+
+# Раздача медиа (social/media.py). MEDIA_SENDFILE: None — байты отдаёт Django,
+# "x-accel" — nginx (internal location с префиксом MEDIA_ACCEL_PREFIX, alias на
+# MEDIA_ROOT), "x-sendfile" — Apache/lighttpd. Файлы под MEDIA_PRIVATE_PREFIXES
+# отдаются только если MEDIA_ACCESS_HOOK ("модуль.функция"(request, name)) вернул True.
+MEDIA_SERVE = True
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_PREFIX = "/protected-media/"
+MEDIA_CACHE_MAX_AGE = 3600
+MEDIA_PRIVATE_PREFIXES = ()
+MEDIA_ACCESS_HOOK = None
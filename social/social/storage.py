@@ -0,0 +1,165 @@
+# social/storage.py
+"""
+Хранилище медиа с адресацией по содержимому.
+
+Загруженный файл posts/Скриншот.jpg сохраняется как
+
+    posts/3f/a1/3fa1…(sha256 — 64 hex).jpg
+
+Одинаковые загрузки получают одно имя и пишутся на диск один раз, а два
+уровня каталогов по 256 штук держат листинги короткими и при миллионах
+файлов. Производные файлы (копии для srcset из social/thumbnails.py)
+называются от того же хэша — 3fa1….w320.webp — и лежат рядом.
+
+Один файл может быть у нескольких постов/аватаров, поэтому delete()
+не удаляет сразу: после коммита транзакции считаем ссылки — строки
+моделей из MEDIA_REFERENCES, чьё поле указывает на этот хэш, — и, если
+их не осталось, удаляем оригинал вместе со всеми производными. Загрузка
+того же содержимого обновляет mtime оригинала: если это случилось после
+delete(), файл мог достаться ещё не закоммиченной строке, и collect()
+его не трогает (сирот потом подберёт cleanup_media). Ссылки
+перепроверяются прямо перед каждым удалением файла.
+Всё, что пропустили (сбой между записью файла и строки, старые файлы),
+подбирает `manage.py cleanup_media`.
+"""
+import hashlib
+import os
+import posixpath
+import re
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+# <каталог>/aa/bb/<sha256><.хвост> — хвост пустой, расширение (оригинал)
+# или .w320.webp и т. п. (производный файл)
+HASHED_RE = re.compile(
+    r"^(?P<dir>(?:.+/)?)(?P<a>[0-9a-f]{2})/(?P<b>[0-9a-f]{2})/(?P<hash>(?P=a)(?P=b)[0-9a-f]{60})"
+    r"(?P<tail>(?:\.[\w]+)*)$"
+)
+
+_EXT_RE = re.compile(r"^\.[A-Za-z0-9]{1,8}$")
+# копия для srcset у оригинала со старым именем (foo.w320.webp) — тоже производный файл
+VARIANT_RE = re.compile(r"\.w\d+\.[A-Za-z0-9]+$")
+
+
+def parse(name):
+    """(каталог, хэш, хвост) для имени из хранилища или None — имя не по содержимому."""
+    m = HASHED_RE.match(name or "")
+    if not m:
+        return None
+    return m["dir"].rstrip("/"), m["hash"], m["tail"]
+
+
+def is_derived(name):
+    """Производный файл (копия для srcset): пишется под своим именем, без хэширования."""
+    parsed = parse(name)
+    if parsed is not None:
+        return parsed[2].count(".") > 1
+    return bool(VARIANT_RE.search(name))
+
+
+def references():
+    """[(модель, поле)] из MEDIA_REFERENCES — где искать ссылки на файлы."""
+    refs = getattr(settings, "MEDIA_REFERENCES", [])
+    return [(apps.get_model(label), field) for label, field in refs]
+
+
+def is_referenced(hash_prefix):
+    """Ссылается ли хоть одна строка на файл `<каталог>/aa/bb/<хэш>…`."""
+    return any(
+        model._default_manager.filter(**{f"{field}__startswith": hash_prefix}).exists()
+        for model, field in references()
+    )
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def __init__(self, *args, **kwargs):
+        # производные файлы перезаписываются на месте (смена качества, --force)
+        kwargs.setdefault("allow_overwrite", True)
+        super().__init__(*args, **kwargs)
+
+    def get_available_name(self, name, max_length=None):
+        # одинаковое имя = одинаковое содержимое, суффиксы не нужны
+        return name
+
+    def _hashed_name(self, name, content):
+        parsed = parse(name)
+        if parsed is not None:
+            directory, _, tail = parsed
+            ext = tail
+        else:
+            directory = posixpath.dirname(name)
+            ext = os.path.splitext(name)[1]
+        ext = ext.lower() if _EXT_RE.match(ext) else ""
+
+        digest = hashlib.sha256()
+        if hasattr(content, "seek"):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        h = digest.hexdigest()
+        return posixpath.join(directory, h[:2], h[2:4], h + ext)
+
+    def _save(self, name, content):
+        if is_derived(name):
+            return super()._save(name, content)
+        name = self._hashed_name(name, content)
+        if self.exists(name):
+            # такой файл уже есть — дедупликация; свежий mtime бережёт его от отложенного collect()
+            os.utime(self.path(name))
+            return name
+        try:
+            return super()._save(name, content)
+        except FileExistsError:  # параллельная загрузка того же файла
+            return name
+
+    def delete(self, name):
+        parsed = parse(name)
+        if parsed is None:
+            # старые файлы с обычными именами не разделяются — только ждём коммита
+            transaction.on_commit(lambda: FileSystemStorage.delete(self, name))
+            return
+        directory, h, _ = parsed
+        prefix = posixpath.join(directory, h[:2], h[2:4], h)
+        stamp = self.uploaded_at(prefix)
+        transaction.on_commit(lambda: self.collect(prefix, since=stamp))
+
+    def _names(self, prefix):
+        shard, stem = posixpath.split(prefix)
+        try:
+            _, files = self.listdir(shard)
+        except FileNotFoundError:
+            return []
+        return [posixpath.join(shard, f) for f in files if f.startswith(stem)]
+
+    def uploaded_at(self, prefix):
+        """mtime (нс) оригинала с этим хэшем — меняется при каждой повторной загрузке."""
+        stamps = [0]
+        for name in self._names(prefix):
+            if not is_derived(name):
+                try:
+                    stamps.append(os.stat(self.path(name)).st_mtime_ns)
+                except FileNotFoundError:
+                    pass
+        return max(stamps)
+
+    def collect(self, prefix, since=None):
+        """
+        Удалить оригинал и производные с этим хэшем, если ссылок не
+        осталось. since — uploaded_at() на момент delete(): если файл с тех
+        пор загрузили снова, он остаётся.
+        """
+        if is_referenced(prefix):
+            return 0
+        if since is not None and self.uploaded_at(prefix) > since:
+            return 0
+        names = self._names(prefix)
+        removed = 0
+        for name in names:
+            if is_referenced(prefix):  # строка могла появиться, пока удаляли
+                break
+            super().delete(name)
+            removed += 1
+        return removed
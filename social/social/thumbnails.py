@@ -0,0 +1,304 @@
+# social/thumbnails.py
+"""
+Уменьшенные копии картинок (посты, аватары) для srcset.
+
+Для оригинала posts/foo.jpg рядом кладутся posts/foo.w320.jpg,
+posts/foo.w320.webp, … — по одной паре на каждую ширину из
+THUMBNAIL_WIDTHS, которая меньше оригинала. Что получилось, хранится в
+JSON-поле модели (Post.image_variants, User.avatar_variants):
+
+    {"src": "posts/foo.jpg", "width": 1920, "height": 1080,
+     "sizes": {"320": {"jpg": "posts/foo.w320.jpg", "webp": "posts/foo.w320.webp"}, …}}
+
+"src" — имя оригинала, по которому нарезано: если он не совпадает с
+текущим файлом, копии устарели (картинку заменили) и режутся заново.
+Заодно оригинал проверяется и пересохраняется без EXIF.
+
+Тяжёлая часть — render(): байты на входе, байты на выходе, без Django,
+поэтому её можно отдать пулу процессов (network/imagejobs.py,
+`manage.py image_worker`). Пока задача в очереди, в *_variants лежит
+{"pending": имя}, и шаблон показывает заглушку. Синхронно (refresh) —
+при IMAGE_PROCESSING_ASYNC=False и в `manage.py generate_thumbnails`.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+DEFAULT_WIDTHS = {"posts": (320, 640, 1080), "avatars": (64, 160, 320)}
+
+
+def widths_for(kind):
+    return tuple(getattr(settings, "THUMBNAIL_WIDTHS", DEFAULT_WIDTHS).get(kind, ()))
+
+
+def image_quality():
+    return getattr(settings, "THUMBNAIL_QUALITY", 82)
+
+
+def is_stale(fieldfile, variants):
+    """Нужно ли (пере)нарезать копии для текущего файла поля."""
+    return bool(fieldfile) and (variants or {}).get("src") != fieldfile.name
+
+
+def thumb_name(name, variants):
+    """
+    Имя самой мелкой копии файла `name` (или сам `name`, если копий нет;
+    "" — файл ещё в очереди на обработку).
+    """
+    variants = variants or {}
+    if name and variants.get("pending") == name:
+        return ""
+    if not name or variants.get("src") != name or not variants.get("sizes"):
+        return name
+    files = variants["sizes"][min(variants["sizes"], key=int)]
+    return files.get("jpg") or files.get("png")
+
+
+def _variant_name(name, width, ext):
+    root, _ = os.path.splitext(name)
+    return f"{root}.w{width}.{ext}"
+
+
+def _encode(image, fmt, **params):
+    buf = BytesIO()
+    image.save(buf, fmt, **params)
+    return buf.getvalue()
+
+
+def _write(storage, name, data):
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(data))
+
+
+def delete_variants(storage, variants):
+    for files in (variants or {}).get("sizes", {}).values():
+        for name in files.values():
+            storage.delete(name)
+
+
+def render(data, widths, quality=82):
+    """
+    Байты загруженного файла → байты результата. Чистая функция без Django
+    (её выполняет пул процессов image_worker): проверка, поворот по EXIF,
+    перекодирование оригинала без метаданных и копии по ширинам `widths`.
+
+    Возвращает {"original": (ext, bytes) | None, "width", "height",
+    "sizes": {"320": {"jpg": bytes, "webp": bytes}, …}}; original=None —
+    файл оставляем как есть (анимация). Не картинка — ValueError.
+    """
+    try:
+        image = Image.open(BytesIO(data))
+        image.load()
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as exc:
+        raise ValueError(f"не удалось прочитать картинку: {exc}") from exc
+
+    animated = getattr(image, "is_animated", False)
+    source_format = image.format
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    if has_alpha:
+        ext, fmt, params = "png", "PNG", {"optimize": True}
+    else:
+        ext, fmt, params = "jpg", "JPEG", {"quality": quality, "optimize": True, "progressive": True}
+
+    # пересохранение без exif= / pnginfo= выбрасывает EXIF (в т. ч. GPS) и прочие метаданные
+    if animated:
+        original = None
+    elif source_format == "WEBP":
+        original = ("webp", _encode(image, "WEBP", quality=quality))
+    else:
+        original = (ext, _encode(image, fmt, **params))
+
+    sizes = {}
+    for width in sorted(set(widths)):
+        if width >= image.width:
+            break
+        height = round(image.height * width / image.width)
+        resized = image.resize((width, height), Image.LANCZOS)
+        sizes[str(width)] = {
+            ext: _encode(resized, fmt, **params),
+            "webp": _encode(resized, "WEBP", quality=quality),
+        }
+    return {"original": original, "width": image.width, "height": image.height, "sizes": sizes}
+
+
+_SAME_EXT = {"jpg": {".jpg", ".jpeg"}, "png": {".png"}, "webp": {".webp"}}
+
+
+def store(fieldfile, rendered):
+    """
+    Записать результат render() рядом с оригиналом. Оригинал заменяется
+    очищенным (при смене формата — с новым расширением).
+    Возвращает (имя оригинала, словарь для *_variants).
+    """
+    storage, name = fieldfile.storage, fieldfile.name
+    if rendered["original"] is not None:
+        ext, data = rendered["original"]
+        root, old_ext = os.path.splitext(name)
+        storage.delete(name)
+        name = storage.save(
+            name if old_ext.lower() in _SAME_EXT[ext] else f"{root}.{ext}", ContentFile(data)
+        )
+    sizes = {
+        width: {
+            ext: _write(storage, _variant_name(name, width, ext), data)
+            for ext, data in files.items()
+        }
+        for width, files in rendered["sizes"].items()
+    }
+    variants = {"src": name, "width": rendered["width"], "height": rendered["height"], "sizes": sizes}
+    return name, variants
+
+
+def apply(instance, field, variants_field, name, variants):
+    """Записать имя файла и *_variants через UPDATE (без повторного post_save)."""
+    type(instance)._default_manager.filter(pk=instance.pk).update(
+        **{field: name, variants_field: variants}
+    )
+    getattr(instance, field).name = name or None
+    setattr(instance, variants_field, variants)
+
+
+def discard(instance, field, variants_field):
+    """Файл не картинка: удалить его и очистить поле."""
+    fieldfile = getattr(instance, field)
+    if fieldfile:
+        fieldfile.storage.delete(fieldfile.name)
+    apply(instance, field, variants_field, "", {})
+
+
+def release(instance, field, variants_field):
+    """Объект удалён (post_delete): убрать файл и его копии."""
+    fieldfile = getattr(instance, field)
+    if fieldfile:
+        delete_variants(fieldfile.storage, getattr(instance, variants_field))
+        fieldfile.storage.delete(fieldfile.name)
+
+
+def mark_pending(instance, field, variants_field):
+    """Копии ещё режутся: шаблон покажет заглушку вместо необработанного файла."""
+    variants = {"pending": getattr(instance, field).name}
+    type(instance)._default_manager.filter(pk=instance.pk).update(**{variants_field: variants})
+    setattr(instance, variants_field, variants)
+
+
+def refresh(instance, field, variants_field, kind):
+    """
+    Обработать файл поля прямо сейчас, если он сменился (без очереди:
+    IMAGE_PROCESSING_ASYNC=False, generate_thumbnails). Возвращает True,
+    если что-то сделали.
+    """
+    fieldfile = getattr(instance, field)
+    old = getattr(instance, variants_field) or {}
+    if not fieldfile:
+        if not old:
+            return False
+        delete_variants(fieldfile.storage, old)
+        apply(instance, field, variants_field, "", {})
+        return True
+    if not is_stale(fieldfile, old):
+        return False
+
+    with fieldfile.storage.open(fieldfile.name, "rb") as f:
+        data = f.read()
+    # файлы и строка меняются вместе: хранилище по содержимому удаляет
+    # файлы только после коммита, когда на них уже никто не ссылается
+    with transaction.atomic():
+        delete_variants(fieldfile.storage, old)
+        try:
+            rendered = render(data, widths_for(kind), image_quality())
+        except ValueError:
+            discard(instance, field, variants_field)
+            return True
+        apply(instance, field, variants_field, *store(fieldfile, rendered))
+    return True
+
+
+class Responsive:
+    """То, что нужно шаблону partials/picture.html: src, srcset, webp_srcset, размеры."""
+
+    def __init__(self, fieldfile, variants):
+        self.file = fieldfile
+        self.variants_raw = variants or {}
+        self.variants = variants if fieldfile and not is_stale(fieldfile, variants) else {}
+        self.sizes = sorted(
+            ((int(w), files) for w, files in self.variants.get("sizes", {}).items()),
+            key=lambda item: item[0],
+        )
+
+    def __bool__(self):
+        return bool(self.file)
+
+    @property
+    def pending(self):
+        """Файл ждёт обработки в очереди (network/imagejobs.py)."""
+        return bool(self.file) and self.variants_raw.get("pending") == self.file.name
+
+    @property
+    def width(self):
+        return self.variants.get("width")
+
+    @property
+    def height(self):
+        return self.variants.get("height")
+
+    def _url(self, name):
+        return self.file.storage.url(name)
+
+    @property
+    def src(self):
+        """
+        Самая крупная копия (или оригинал, если копий нет) — для <img src>;
+        "" — файл в очереди: необработанный оригинал (с EXIF) не отдаём.
+        """
+        if self.pending:
+            return ""
+        if not self.sizes:
+            return self.file.url
+        files = self.sizes[-1][1]
+        return self._url(files.get("jpg") or files.get("png"))
+
+    @property
+    def thumb(self):
+        """Самая мелкая копия (или оригинал; "" — файл в очереди, как thumb_name)."""
+        if self.pending:
+            return ""
+        if not self.sizes:
+            return self.file.url
+        files = self.sizes[0][1]
+        return self._url(files.get("jpg") or files.get("png"))
+
+    @property
+    def srcset(self):
+        if not self.sizes:
+            return ""
+        parts = [f"{self._url(files.get('jpg') or files.get('png'))} {w}w" for w, files in self.sizes]
+        parts.append(f"{self.file.url} {self.width}w")
+        return ", ".join(parts)
+
+    @property
+    def webp_srcset(self):
+        return ", ".join(f"{self._url(files['webp'])} {w}w" for w, files in self.sizes)
+
+
+class ResponsiveImage:
+    """
+    Дескриптор модели: post.image_responsive → Responsive(post.image, post.image_variants).
+
+        image_responsive = ResponsiveImage("image", "image_variants")
+    """
+
+    def __init__(self, field, variants_field):
+        self.field = field
+        self.variants_field = variants_field
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return Responsive(getattr(instance, self.field), getattr(instance, self.variants_field))
@@ -1,7 +1,8 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
+
+from .media import serve as serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -12,5 +13,6 @@ urlpatterns = [
     path('notify/', include('notify.urls')), # уведомления
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# медиа: условные запросы, Range, immutable-кэш, X-Accel-Redirect/X-Sendfile (social/media.py)
+if getattr(settings, "MEDIA_SERVE", True):
+    urlpatterns += [path(settings.MEDIA_URL.lstrip('/') + '<path:path>', serve_media, name='media')]
\ No newline at end of file
@@ -140,4 +140,257 @@ document.addEventListener('submit', async (e) => {
   } finally {
     if (btn) btn.disabled = false;
   }
-});
\ No newline at end of file
+});
+
+// ===== Лента: «Загрузить ещё» (keyset-курсор) =====
+document.addEventListener('click', async (e) => {
+  const btn = e.target.closest('[data-feed-more]');
+  if (!btn) return;
+
+  e.preventDefault();
+  if (btn.disabled) return;
+  btn.disabled = true;
+
+  const params = new URLSearchParams({ cursor: btn.dataset.cursor || '' });
+  if (btn.dataset.feed) params.set('feed', btn.dataset.feed);
+
+  try {
+    const data = await fetchJsonOrReload(`${btn.dataset.url}?${params}`, {
+      headers: { 'X-Requested-With': 'XMLHttpRequest' },
+    });
+
+    const list = document.querySelector('[data-feed]');
+    if (list && data.rendered_html) {
+      list.insertAdjacentHTML('beforeend', data.rendered_html);
+    }
+    if (data.next_cursor) {
+      btn.dataset.cursor = data.next_cursor;
+      btn.disabled = false;
+    } else {
+      btn.remove();
+    }
+  } catch (err) {
+    console.error('Feed error:', err);
+    btn.disabled = false;
+  }
+});
+
+
+// ===== Подсказки пользователей: поиск в навбаре и @упоминания =====
+const suggestUrl = document.body.dataset.userAutocompleteUrl;
+let suggestBox = null;
+let suggestTimer = null;
+
+function hideSuggest() {
+  if (suggestBox) suggestBox.remove();
+  suggestBox = null;
+}
+
+function showSuggest(input, items, onPick) {
+  hideSuggest();
+  if (!items.length) return;
+  const rect = input.getBoundingClientRect();
+  suggestBox = document.createElement('div');
+  suggestBox.className = 'list-group user-suggest';
+  suggestBox.style.left = `${rect.left + window.scrollX}px`;
+  suggestBox.style.top = `${rect.bottom + window.scrollY}px`;
+  suggestBox.style.minWidth = `${rect.width}px`;
+  for (const item of items) {
+    const a = document.createElement('a');
+    a.href = item.url;
+    a.className = 'list-group-item list-group-item-action py-1';
+    a.textContent = `@${item.username}`;
+    if (item.name) {
+      const name = document.createElement('small');
+      name.className = 'text-muted ms-2';
+      name.textContent = item.name;
+      a.appendChild(name);
+    }
+    a.addEventListener('mousedown', (e) => {
+      e.preventDefault();
+      onPick(item);
+      hideSuggest();
+    });
+    suggestBox.appendChild(a);
+  }
+  document.body.appendChild(suggestBox);
+}
+
+function requestSuggest(input, prefix, onPick) {
+  clearTimeout(suggestTimer);
+  if (!suggestUrl || !prefix) return hideSuggest();
+  suggestTimer = setTimeout(async () => {
+    try {
+      const data = await fetchJsonOrReload(`${suggestUrl}?${new URLSearchParams({ q: prefix })}`, {
+        headers: { 'X-Requested-With': 'XMLHttpRequest' },
+      });
+      showSuggest(input, data.results || [], onPick);
+    } catch (err) {
+      console.error('Suggest error:', err);
+    }
+  }, 120);
+}
+
+document.addEventListener('input', (e) => {
+  const search = e.target.closest('[data-user-suggest]');
+  if (search) {
+    requestSuggest(search, search.value.trim(), (item) => {
+      window.location.href = item.url;
+    });
+    return;
+  }
+
+  const area = e.target.closest('[data-mention]');
+  if (!area) return;
+  const before = area.value.slice(0, area.selectionStart);
+  const m = before.match(/@([\w.@+-]+)$/);
+  if (!m) return hideSuggest();
+  requestSuggest(area, m[1], (item) => {
+    const start = before.length - m[0].length;
+    area.value = `${area.value.slice(0, start)}@${item.username} ${area.value.slice(area.selectionStart)}`;
+    const caret = start + item.username.length + 2;
+    area.setSelectionRange(caret, caret);
+    area.focus();
+  });
+});
+
+document.addEventListener('focusout', (e) => {
+  if (e.target.closest('[data-user-suggest], [data-mention]')) hideSuggest();
+});
+
+
+// ===== Комментарии: «Показать ещё» (корни и свёрнутые ответы) =====
+document.addEventListener('click', async (e) => {
+  const btn = e.target.closest('[data-more-comments]');
+  if (!btn) return;
+
+  e.preventDefault();
+  if (btn.disabled) return;
+  btn.disabled = true;
+
+  const params = new URLSearchParams({ after: btn.dataset.after || '' });
+  try {
+    const data = await fetchJsonOrReload(`${btn.dataset.url}?${params}`, {
+      headers: { 'X-Requested-With': 'XMLHttpRequest' },
+    });
+
+    const block = document.querySelector(btn.dataset.target);
+    if (block && data.rendered_html) {
+      block.insertAdjacentHTML('beforeend', data.rendered_html);
+    }
+    if (data.next_after) {
+      btn.dataset.after = data.next_after;
+      btn.disabled = false;
+    } else {
+      btn.remove();
+    }
+  } catch (err) {
+    console.error('Comments error:', err);
+    btn.disabled = false;
+  }
+});
+
+
+// ===== Переписка: более ранние сообщения (курсор) и новые (после id) =====
+document.addEventListener('click', async (e) => {
+  const btn = e.target.closest('[data-older-messages]');
+  if (!btn) return;
+
+  e.preventDefault();
+  if (btn.disabled) return;
+  btn.disabled = true;
+
+  const params = new URLSearchParams({ cursor: btn.dataset.cursor || '' });
+  try {
+    const data = await fetchJsonOrReload(`${btn.dataset.url}?${params}`, {
+      headers: { 'X-Requested-With': 'XMLHttpRequest' },
+    });
+
+    const list = document.querySelector('[data-messages]');
+    if (list && data.rendered_html) {
+      // вставка сверху не должна сдвигать то, что пользователь читает
+      const fromBottom = document.documentElement.scrollHeight - window.scrollY;
+      list.insertAdjacentHTML('afterbegin', data.rendered_html);
+      window.scrollTo(0, document.documentElement.scrollHeight - fromBottom);
+    }
+    if (data.next_cursor) {
+      btn.dataset.cursor = data.next_cursor;
+      btn.disabled = false;
+    } else {
+      btn.remove();
+    }
+  } catch (err) {
+    console.error('Messages error:', err);
+    btn.disabled = false;
+  }
+});
+
+function applyReceipts(list, readUpTo) {
+  list.querySelectorAll('[data-message-id] [data-receipt]').forEach((el) => {
+    const id = Number(el.closest('[data-message-id]').dataset.messageId);
+    if (id <= readUpTo) el.textContent = '✔✔';
+  });
+}
+
+async function fetchNewerMessages(list) {
+  const params = new URLSearchParams({ after: list.dataset.after || '0' });
+  const data = await fetchJsonOrReload(`${list.dataset.newerUrl}?${params}`, {
+    headers: { 'X-Requested-With': 'XMLHttpRequest' },
+  });
+  if (data.rendered_html) {
+    list.querySelector('[data-messages-empty]')?.remove();
+    list.insertAdjacentHTML('beforeend', data.rendered_html);
+  }
+  list.dataset.after = data.last_id;
+  applyReceipts(list, data.read_up_to);
+}
+
+// новые сообщения и квитанции — по SSE (thread_events); если поток
+// недоступен (WSGI отвечает 204, сеть), — опрос thread_newer
+(function liveMessages() {
+  const list = document.querySelector('[data-messages][data-newer-url]');
+  if (!list) return;
+
+  const refresh = () =>
+    fetchNewerMessages(list).catch((err) => console.error('Messages error:', err));
+
+  let pollTimer = null;
+  const startPolling = () => {
+    if (pollTimer) return;
+    const interval = Number(list.dataset.pollMs || 10000);
+    pollTimer = setInterval(() => { if (!document.hidden) refresh(); }, interval);
+  };
+
+  if (!window.EventSource || !list.dataset.eventsUrl) {
+    startPolling();
+    return;
+  }
+  const source = new EventSource(list.dataset.eventsUrl);
+  source.addEventListener('message', refresh);
+  source.addEventListener('resync', refresh);
+  source.addEventListener('read', (e) => {
+    const data = JSON.parse(e.data);
+    if (String(data.user_id) !== document.body.dataset.userId) applyReceipts(list, data.up_to);
+  });
+  source.addEventListener('error', () => {
+    if (source.readyState === EventSource.CLOSED) startPolling();
+  });
+  // после переподключения могли пропустить события — дочитываем
+  source.addEventListener('open', refresh);
+})();
+
+
+// ===== Уведомления: значок в навбаре по SSE (notify_events) =====
+(function liveNotifyBadge() {
+  const url = document.body.dataset.notifyEventsUrl;
+  const badge = document.querySelector('[data-notify-badge]');
+  if (!url || !badge || !window.EventSource) return;
+
+  const source = new EventSource(url);
+  source.addEventListener('badge', (e) => {
+    const { unread } = JSON.parse(e.data);
+    badge.textContent = unread;
+    badge.classList.toggle('d-none', !unread);
+  });
+  // resync: сервер закрыл поток, EventSource переподключится и получит свежий badge
+})();